@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import simulate
+from Lattice import GridLattice
+from Resource import dynamic_load_balancing
+
+DEFAULT_SIZES = [100, 300, 1000]
+DEFAULT_PARTITIONS = [8, 64, 256]
+STAGES = ['partition_lattice', 'dynamic_load_balancing', 'process_queue', 'combine_partitions_parallel', 'combine_partitions_incremental']
+# Entry points whose startup is timed, and the heavy dependencies they must only load when drawing or decoding with them
+STARTUP_MODULES = ['simulate', 'Experiments', 'Tuner', 'Service']
+DEFERRED_MODULES = ['matplotlib', 'networkx']
+# Allowed median import time of every entry point, in seconds
+STARTUP_BUDGET = 0.4
+STARTUP_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'import': time.perf_counter() - start, 'loaded': [name for name in {deferred!r} if name in sys.modules]}}))
+'''
+
+def stage_runners(size, num_partitions, merge_pool, seed):
+    """
+    Build a (setup, run) pair for every benchmarked stage of the pipeline at one configuration.
+
+    ``setup`` prepares fresh inputs outside the timed region and ``run`` does the timed work.
+    """
+    lattice = GridLattice(size, size)
+    args = simulate.parse_arguments(['--size', str(size), str(size), '--partitions', str(num_partitions)])
+    partitions = simulate.partition_lattice(lattice, num_partitions, rng=seed)
+    subgraphs = [subgraph for subgraph, _, _ in partitions]
+
+    def scheduled_resources():
+        high_complexity_resources, low_complexity_resources = simulate.create_resources(args)
+        return dynamic_load_balancing(list(partitions), high_complexity_resources, low_complexity_resources)
+
+    def process_all(resources):
+        for resource in resources:
+            resource.process_queue()
+
+    return {
+        'partition_lattice': (lambda: None, lambda _: simulate.partition_lattice(lattice, num_partitions, rng=seed)),
+        'dynamic_load_balancing': (lambda: simulate.create_resources(args),
+                                   lambda resources: dynamic_load_balancing(list(partitions), *resources)),
+        'process_queue': (scheduled_resources, process_all),
+        'combine_partitions_parallel': (lambda: None, lambda _: simulate.combine_partitions_parallel(list(subgraphs), lattice, merge_pool=merge_pool)),
+        'combine_partitions_incremental': (lambda: None, lambda _: simulate.combine_partitions_incremental(list(subgraphs), lattice)),
+    }
+
+def time_stage(setup, run, repeats):
+    times = []
+    for _ in range(repeats):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    return times
+
+def peak_memory(setup, run):
+    """Peak Python/NumPy heap allocation of one run, in bytes. Pool workers are not included."""
+    state = setup()
+    tracemalloc.start()
+    try:
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def run_benchmarks(sizes, partition_counts, stages, repeats=5, seed=0):
+    results = []
+    with simulate.MergePool() as merge_pool:
+        for size in sizes:
+            for num_partitions in partition_counts:
+                runners = stage_runners(size, num_partitions, merge_pool, seed)
+                for stage in stages:
+                    setup, run = runners[stage]
+                    times = time_stage(setup, run, repeats)
+                    record = {
+                        'stage': stage,
+                        'size': size,
+                        'partitions': num_partitions,
+                        'median': statistics.median(times),
+                        'min': min(times),
+                        'peak_memory': peak_memory(setup, run),
+                    }
+                    results.append(record)
+                    print(f"{stage:32s} size={size:<6d} partitions={num_partitions:<6d} "
+                          f"median={record['median']:.6f}s min={record['min']:.6f}s peak={record['peak_memory'] / 2**20:.1f} MiB")
+    return results
+
+def measure_startup(module, repeats=5, deferred=DEFERRED_MODULES):
+    """
+    Time importing ``module`` in fresh interpreters, as a CLI run or a spawned pool worker does.
+
+    Returns:
+        dict: Median ``import`` time of the module alone and ``process`` time of the whole
+        interpreter run, in seconds, and the ``deferred`` modules the import ``loaded``.
+    """
+    script = STARTUP_SCRIPT.format(module=module, deferred=list(deferred))
+    import_times, process_times = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        process_times.append(time.perf_counter() - start)
+        measured = json.loads(output.splitlines()[-1])
+        import_times.append(measured['import'])
+    return {'module': module, 'import': statistics.median(import_times), 'process': statistics.median(process_times),
+            'loaded': measured['loaded']}
+
+def check_startup(modules, budget, repeats=5):
+    """
+    Measure the startup of ``modules`` and list the ones that break the budget: an import slower
+    than ``budget`` seconds, or one that loads a module of ``DEFERRED_MODULES``.
+    """
+    failures = []
+    for module in modules:
+        record = measure_startup(module, repeats)
+        flag = ''
+        if record['import'] > budget:
+            failures.append((module, f"import took {record['import']:.3f}s, budget {budget:.3f}s"))
+            flag += ' SLOW'
+        if record['loaded']:
+            failures.append((module, f"import loaded {', '.join(record['loaded'])}"))
+            flag += ' EAGER'
+        print(f"{module:12s} import={record['import']:.3f}s process={record['process']:.3f}s{flag}")
+    return failures
+
+def write_results(path, results, repeats, seed):
+    payload = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'repeats': repeats,
+        'seed': seed,
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+def result_key(record):
+    return (record['stage'], record['size'], record['partitions'])
+
+def compare_results(baseline, current, time_threshold, memory_threshold, min_seconds=0.0):
+    """
+    Compare two result files entry by entry.
+
+    Time changes of stages whose medians both stay below ``min_seconds`` are reported but not
+    flagged, since they are dominated by timer noise.
+
+    Returns:
+        list: (key, metric, baseline value, current value, relative change) for every regression
+        beyond its threshold.
+    """
+    baseline_records = {result_key(record): record for record in baseline['results']}
+    regressions = []
+    print(f"{'stage':32s} {'size':>6s} {'parts':>6s} {'time':>9s} {'memory':>9s}")
+    for record in current['results']:
+        key = result_key(record)
+        base = baseline_records.get(key)
+        if base is None:
+            continue
+        time_change = record['median'] / base['median'] - 1 if base['median'] > 0 else 0.0
+        memory_change = record['peak_memory'] / base['peak_memory'] - 1 if base['peak_memory'] > 0 else 0.0
+        flag = ''
+        if time_change > time_threshold and max(base['median'], record['median']) >= min_seconds:
+            regressions.append((key, 'median', base['median'], record['median'], time_change))
+            flag += ' TIME'
+        if memory_change > memory_threshold:
+            regressions.append((key, 'peak_memory', base['peak_memory'], record['peak_memory'], memory_change))
+            flag += ' MEMORY'
+        print(f"{key[0]:32s} {key[1]:6d} {key[2]:6d} {time_change:+9.1%} {memory_change:+9.1%}{flag}")
+    return regressions
+
+def parse_arguments(args_list=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the partitioning, scheduling, processing and merging stages.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Run the benchmark matrix and write JSON results")
+    run_parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES, help="Lattice side lengths to benchmark")
+    run_parser.add_argument("--partitions", type=int, nargs='+', default=DEFAULT_PARTITIONS, help="Partition counts to benchmark")
+    run_parser.add_argument("--stages", nargs='+', choices=STAGES, default=STAGES, help="Stages to benchmark")
+    run_parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per stage")
+    run_parser.add_argument("--seed", type=int, default=0, help="Seed for syndrome sampling")
+    run_parser.add_argument("--output", default='benchmark.json', help="Path of the JSON results file")
+
+    compare_parser = subparsers.add_parser('compare', help="Compare JSON results against a saved baseline")
+    compare_parser.add_argument("baseline", help="Path of the baseline results file")
+    compare_parser.add_argument("current", help="Path of the current results file")
+    compare_parser.add_argument("--time_threshold", type=float, default=0.10, help="Allowed relative increase of the median time")
+    compare_parser.add_argument("--memory_threshold", type=float, default=0.20, help="Allowed relative increase of the peak memory")
+    compare_parser.add_argument("--min_seconds", type=float, default=0.001, help="Median time below which time changes are not flagged")
+
+    startup_parser = subparsers.add_parser('startup', help="Check the import time of the entry points against a budget")
+    startup_parser.add_argument("--modules", nargs='+', default=STARTUP_MODULES, help="Modules whose import is timed")
+    startup_parser.add_argument("--budget", type=float, default=STARTUP_BUDGET, help="Allowed median import time of every module, in seconds")
+    startup_parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per module")
+
+    return parser.parse_args(args_list)
+
+def main(args_list=None):
+    args = parse_arguments(args_list)
+    if args.command == 'startup':
+        failures = check_startup(args.modules, args.budget, args.repeats)
+        if failures:
+            print(f"\n{len(failures)} startup budget violation(s):")
+            for module, reason in failures:
+                print(f"  {module}: {reason}")
+            return 1
+        print("\nAll imports within the startup budget.")
+        return 0
+    if args.command == 'run':
+        results = run_benchmarks(args.sizes, args.partitions, args.stages, args.repeats, args.seed)
+        write_results(args.output, results, args.repeats, args.seed)
+        print(f"Results written to {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare_results(baseline, current, args.time_threshold, args.memory_threshold, args.min_seconds)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond the thresholds:")
+        for key, metric, base_value, value, change in regressions:
+            print(f"  {key[0]} size={key[1]} partitions={key[2]} {metric}: {base_value:.6g} -> {value:.6g} ({change:+.1%})")
+        return 1
+    print("\nNo regressions beyond the thresholds.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
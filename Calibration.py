@@ -0,0 +1,140 @@
+import argparse
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import simulate
+from CostModel import CostProfile, fit_cost_model
+from Decoders import MWPMDecoder, UnionFindDecoder
+from Lattice import GridLattice, LatticeRegion
+
+DEFAULT_DEFECT_COUNTS = [0, 2, 4, 8, 16, 24, 32, 48, 64]
+DEFAULT_MERGE_SIZES = [10, 20, 50, 100, 200, 400]
+
+# Decoder backend and default polynomial degree of each resource type
+RESOURCE_DECODERS = {
+    'high': (MWPMDecoder, 3),
+    'low': (UnionFindDecoder, 1),
+}
+
+def patch_index(patch_size):
+    """
+    A ``patch_size`` x ``patch_size`` partition in the middle of a lattice three times as wide,
+    so that it has a cut boundary on every side like an interior partition.
+    """
+    lattice = GridLattice(3 * patch_size, 3 * patch_size)
+    rows, cols = np.meshgrid(np.arange(patch_size, 2 * patch_size), np.arange(patch_size, 2 * patch_size), indexing='ij')
+    return lattice, np.sort((rows * lattice.cols + cols).ravel())
+
+def time_decoder(decoder, defect_counts, patch_size, repeats, rng):
+    """
+    Median decode time of ``decoder`` for every defect count, on random defect sets of one patch.
+
+    Returns:
+        tuple: (complexities, times), with complexity = defects + 1 as in ``simulate.partition_lattice``.
+    """
+    lattice, index = patch_index(patch_size)
+    complexities, times = [], []
+    for num_defects in defect_counts:
+        samples = []
+        for _ in range(repeats):
+            defects = np.sort(rng.choice(index, size=min(num_defects, len(index)), replace=False))
+            samples.append(decoder.decode(lattice, index, defects).decode_time)
+        complexities.append(num_defects + 1)
+        times.append(statistics.median(samples))
+    return complexities, times
+
+def time_merge(merge_sizes, repeats):
+    """
+    Median time of ``simulate.combine_partitions`` on two adjacent square blocks of every size.
+
+    Returns:
+        tuple: (boundary_nodes, times), where ``boundary_nodes`` is the total number of boundary
+        nodes of the two blocks, the size the merge cost model is a function of.
+    """
+    boundary_nodes, times = [], []
+    for size in merge_sizes:
+        lattice = GridLattice(size, 2 * size)
+        rows, cols = np.divmod(np.arange(lattice.num_nodes), lattice.cols)
+        left = LatticeRegion(lattice, np.flatnonzero(cols < size))
+        right = LatticeRegion(lattice, np.flatnonzero(cols >= size))
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            simulate.combine_partitions(left, right, lattice)
+            samples.append(time.perf_counter() - start)
+        # One column of boundary nodes on each side of the cut
+        boundary_nodes.append(2 * size)
+        times.append(statistics.median(samples))
+    return boundary_nodes, times
+
+def calibrate(defect_counts=DEFAULT_DEFECT_COUNTS, merge_sizes=DEFAULT_MERGE_SIZES, kind='polynomial',
+              patch_size=32, repeats=5, seed=0):
+    """
+    Microbenchmark decoding and merging on this machine and fit a CostProfile.
+
+    Args:
+        defect_counts (list): Defect counts the decoders are timed at.
+        merge_sizes (list): Block side lengths the merge is timed at.
+        kind (str): 'polynomial' or 'piecewise' cost curves.
+        patch_size (int): Side length of the partition the decoders run on.
+        repeats (int): Timed repetitions per point; the median is fitted.
+        seed (int): Seed for the random defect sets.
+
+    Returns:
+        CostProfile: The fitted profile, with the raw samples in its metadata.
+    """
+    rng = np.random.default_rng(seed)
+    decode_models = {}
+    samples = {}
+    for resource_type, (decoder_class, degree) in RESOURCE_DECODERS.items():
+        complexities, times = time_decoder(decoder_class(), defect_counts, patch_size, repeats, rng)
+        decode_models[resource_type] = fit_cost_model(complexities, times, kind, degree=degree)
+        samples[resource_type] = {'sizes': complexities, 'times': times}
+        print(f"{resource_type:5s} ({decoder_class.name}): " +
+              ", ".join(f"{c}:{t * 1e3:.3f}ms" for c, t in zip(complexities, times)))
+
+    boundary_nodes, times = time_merge(merge_sizes, repeats)
+    merge_model = fit_cost_model(boundary_nodes, times, kind, degree=1)
+    samples['merge'] = {'sizes': boundary_nodes, 'times': times}
+    print("merge: " + ", ".join(f"{n}:{t * 1e3:.3f}ms" for n, t in zip(boundary_nodes, times)))
+
+    metadata = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'kind': kind,
+        'patch_size': patch_size,
+        'repeats': repeats,
+        'seed': seed,
+        'samples': samples,
+    }
+    return CostProfile(decode_models, merge_model, metadata)
+
+def parse_arguments(args_list=None):
+    parser = argparse.ArgumentParser(description="Fit decode and merge cost curves on this machine for simulate.py --cost_profile.")
+    parser.add_argument("--defect_counts", type=int, nargs='+', default=DEFAULT_DEFECT_COUNTS, help="Defect counts to time the decoders at")
+    parser.add_argument("--merge_sizes", type=int, nargs='+', default=DEFAULT_MERGE_SIZES, help="Block side lengths to time the merge at")
+    parser.add_argument("--kind", choices=['polynomial', 'piecewise'], default='polynomial', help="Shape of the fitted cost curves")
+    parser.add_argument("--patch_size", type=int, default=32, help="Side length of the partition the decoders run on")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per point")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random defect sets")
+    parser.add_argument("--output", default='cost_profile.json', help="Path of the cost profile file")
+    return parser.parse_args(args_list)
+
+def main(args_list=None):
+    args = parse_arguments(args_list)
+    profile = calibrate(args.defect_counts, args.merge_sizes, args.kind, args.patch_size, args.repeats, args.seed)
+    profile.save(args.output)
+    print(f"Cost profile written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
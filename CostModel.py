@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+
+class CostModel:
+    """
+    Fitted cost curve mapping a work size (complexity or boundary node count) to seconds.
+
+    ``kind`` is either 'polynomial', with ``coefficients`` in ``np.polyval`` order, or
+    'piecewise', a piecewise-linear curve through (``breakpoints``, ``values``) that is
+    extended linearly past the last breakpoint.
+    """
+    def __init__(self, kind, coefficients=None, breakpoints=None, values=None):
+        self.kind = kind
+        self.coefficients = coefficients
+        self.breakpoints = breakpoints
+        self.values = values
+
+    def __call__(self, size):
+        """Cost of one size, or an array of costs for an array of sizes."""
+        sizes = np.asarray(size, dtype=float)
+        if self.kind == 'polynomial':
+            cost = np.polyval(self.coefficients, sizes)
+        else:
+            cost = np.interp(sizes, self.breakpoints, self.values)
+            if len(self.breakpoints) >= 2:
+                slope = (self.values[-1] - self.values[-2]) / (self.breakpoints[-1] - self.breakpoints[-2])
+                cost = np.where(sizes > self.breakpoints[-1], self.values[-1] + slope * (sizes - self.breakpoints[-1]), cost)
+        # A fitted curve can dip below zero at small sizes
+        cost = np.maximum(cost, 0.0)
+        return float(cost) if cost.ndim == 0 else cost
+
+    def to_dict(self):
+        if self.kind == 'polynomial':
+            return {'kind': self.kind, 'coefficients': list(self.coefficients)}
+        return {'kind': self.kind, 'breakpoints': list(self.breakpoints), 'values': list(self.values)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['kind'], data.get('coefficients'), data.get('breakpoints'), data.get('values'))
+
+def fit_cost_model(sizes, times, kind='polynomial', degree=1, num_breakpoints=8):
+    """
+    Fit a CostModel to measured (size, time) samples.
+
+    Args:
+        sizes (array-like): Work sizes of the samples.
+        times (array-like): Measured times in seconds.
+        kind (str): 'polynomial' or 'piecewise'.
+        degree (int): Degree of the polynomial fit.
+        num_breakpoints (int): Number of breakpoints of the piecewise fit, placed at size quantiles.
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    times = np.asarray(times, dtype=float)
+    if kind == 'polynomial':
+        return CostModel(kind, coefficients=np.polyfit(sizes, times, degree).tolist())
+
+    breakpoints = np.unique(np.quantile(sizes, np.linspace(0, 1, num_breakpoints)))
+    values = [float(np.median(times[np.abs(sizes - b) == np.abs(sizes - b).min()])) for b in breakpoints]
+    return CostModel(kind, breakpoints=breakpoints.tolist(), values=values)
+
+class CostProfile:
+    """Per-resource-type decode cost curves and the merge cost curve of one machine."""
+    def __init__(self, decode, merge, metadata=None):
+        self.decode = decode  # resource type ('high'/'low') -> CostModel over partition complexity
+        self.merge = merge  # CostModel over the total boundary nodes of a pairwise merge
+        self.metadata = metadata or {}
+
+    def save(self, path):
+        payload = {
+            'decode': {resource_type: model.to_dict() for resource_type, model in self.decode.items()},
+            'merge': self.merge.to_dict(),
+            'metadata': self.metadata,
+        }
+        with open(path, 'w') as f:
+            json.dump(payload, f, indent=2)
+
+def load_cost_profile(path):
+    with open(path) as f:
+        payload = json.load(f)
+    decode = {resource_type: CostModel.from_dict(model) for resource_type, model in payload['decode'].items()}
+    return CostProfile(decode, CostModel.from_dict(payload['merge']), payload.get('metadata'))
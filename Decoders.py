@@ -0,0 +1,326 @@
+import time
+
+import numpy as np
+
+from Lattice import region_boundary
+
+# networkx, imported by MWPMDecoder.prepare so that processes that never run MWPM do not load it
+nx = None
+
+# Boundaries a defect can be matched to: the left and right lattice boundaries, and the cut
+# between the partition and the rest of the lattice, which is resolved later by the merge
+LEFT = 'left'
+RIGHT = 'right'
+CUT = 'cut'
+
+class DecodeResult:
+    """Measured outcome of decoding one partition."""
+    __slots__ = ('decode_time', 'logical_error', 'left_matches')
+
+    def __init__(self, decode_time, logical_error, left_matches):
+        self.decode_time = decode_time
+        self.logical_error = logical_error
+        self.left_matches = left_matches
+
+class Decoder:
+    """
+    Base class of the decoder backends run by a Resource.
+
+    ``decode`` times ``match`` on a partition's real defect set. A logical error is counted
+    when the residual of error plus correction crosses the left boundary an odd number of
+    times, i.e. when the flipped left-boundary edges and the defects matched to the left
+    boundary have odd total parity.
+    """
+    name = None
+
+    def decode(self, lattice, index, defects, left_flips=0):
+        self.prepare()
+        start = time.perf_counter()
+        left_matches = self.match(lattice, index, defects)
+        decode_time = time.perf_counter() - start
+        logical_error = (left_flips + left_matches) % 2 == 1
+        return DecodeResult(decode_time, logical_error, left_matches)
+
+    def prepare(self):
+        """Load what ``match`` needs. Called before the timer starts, so it is not billed to a decode."""
+
+    def match(self, lattice, index, defects):
+        """Return the number of defects matched to the left lattice boundary."""
+        raise NotImplementedError
+
+def boundary_distances(lattice, index, defects):
+    """
+    Distance of every defect to the left, right and cut boundaries of its partition.
+
+    Returns:
+        tuple: (distances, kinds) where ``distances[i]`` is the distance to the nearest
+        boundary of defect ``i`` and ``kinds[i]`` is LEFT, RIGHT or CUT.
+    """
+    rows, cols = np.divmod(defects, lattice.cols)
+    candidates = [cols + 1.0, lattice.cols - cols.astype(float)]
+    kinds = [LEFT, RIGHT]
+
+    cut = region_boundary(lattice, index)
+    if len(cut):
+        cut_rows, cut_cols = np.divmod(cut, lattice.cols)
+        cut_distance = np.abs(rows[:, None] - cut_rows[None, :]) + np.abs(cols[:, None] - cut_cols[None, :])
+        candidates.append(cut_distance.min(axis=1) + 1.0)
+        kinds.append(CUT)
+
+    candidates = np.stack(candidates)
+    nearest = candidates.argmin(axis=0)
+    return candidates[nearest, np.arange(len(defects))], [kinds[k] for k in nearest]
+
+class MWPMDecoder(Decoder):
+    """
+    Minimum-weight perfect matching decoder for high-complexity resources.
+
+    Defects are matched to each other at Manhattan distance or to their nearest boundary,
+    using networkx's blossom matching on the standard graph with one boundary copy per defect.
+    """
+    name = 'mwpm'
+
+    def prepare(self):
+        global nx
+        if nx is None:
+            import networkx
+            nx = networkx
+
+    def match(self, lattice, index, defects):
+        if len(defects) == 0:
+            return 0
+        # A no-op once decode has prepared the decoder; needed when match is called directly
+        self.prepare()
+        rows, cols = np.divmod(defects, lattice.cols)
+        distances, kinds = boundary_distances(lattice, index, defects)
+        pair_distance = np.abs(rows[:, None] - rows[None, :]) + np.abs(cols[:, None] - cols[None, :])
+
+        num_defects = len(defects)
+        max_weight = float(max(pair_distance.max(), distances.max())) + 1
+        graph = nx.Graph()
+        for i in range(num_defects):
+            # Boundary copies pair up with each other for free
+            graph.add_edge(('d', i), ('b', i), weight=max_weight - distances[i])
+            for j in range(i + 1, num_defects):
+                graph.add_edge(('d', i), ('d', j), weight=max_weight - pair_distance[i, j])
+                graph.add_edge(('b', i), ('b', j), weight=max_weight)
+
+        matching = nx.max_weight_matching(graph, maxcardinality=True)
+        left_matches = 0
+        for u, v in matching:
+            if u[0] != v[0] and kinds[u[1]] == LEFT:
+                left_matches += 1
+        return left_matches
+
+class UnionFindDecoder(Decoder):
+    """
+    Union-Find decoder for low-complexity resources.
+
+    Every defect starts an odd cluster. Odd clusters that have not reached a boundary grow by
+    one edge per round with whole-array shifts over the partition's bounding box, and clusters
+    that meet are merged with a union-find. A cluster stops when it becomes even or touches a
+    boundary; odd clusters on the left boundary are corrected through it.
+    """
+    name = 'union_find'
+
+    def match(self, lattice, index, defects):
+        if len(defects) == 0:
+            return 0
+        node_rows, node_cols = np.divmod(index, lattice.cols)
+        row_min, col_min = int(node_rows.min()), int(node_cols.min())
+        shape = (int(node_rows.max()) - row_min + 1, int(node_cols.max()) - col_min + 1)
+
+        in_patch = np.zeros(shape, dtype=bool)
+        in_patch[node_rows - row_min, node_cols - col_min] = True
+        boundary = np.full(shape, None, dtype=object)
+        cut_rows, cut_cols = np.divmod(region_boundary(lattice, index), lattice.cols)
+        boundary[cut_rows - row_min, cut_cols - col_min] = CUT
+        if col_min + shape[1] == lattice.cols:
+            boundary[:, -1][in_patch[:, -1]] = RIGHT
+        if col_min == 0:
+            boundary[:, 0][in_patch[:, 0]] = LEFT
+
+        num_defects = len(defects)
+        parent = list(range(num_defects))
+        parity = [1] * num_defects
+        touched = [None] * num_defects
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i, j):
+            i, j = find(i), find(j)
+            if i != j:
+                parent[j] = i
+                parity[i] = (parity[i] + parity[j]) % 2
+                touched[i] = touched[i] or touched[j]
+
+        labels = np.full(shape, -1, dtype=np.int64)
+        defect_rows, defect_cols = np.divmod(defects, lattice.cols)
+        labels[defect_rows - row_min, defect_cols - col_min] = np.arange(num_defects)
+        for i in range(num_defects):
+            touched[i] = boundary[defect_rows[i] - row_min, defect_cols[i] - col_min]
+
+        for _ in range(shape[0] + shape[1]):
+            roots = np.array([find(i) for i in range(num_defects)])
+            active_roots = np.array([parity[r] == 1 and touched[r] is None for r in roots])
+            if not active_roots.any():
+                break
+            occupied = labels >= 0
+            root_labels = np.where(occupied, roots[np.maximum(labels, 0)], -1)
+            active = occupied & active_roots[np.maximum(labels, 0)]
+
+            claims = np.full(shape, -1, dtype=np.int64)
+            for d_row, d_col in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                src = (slice(max(-d_row, 0), shape[0] - max(d_row, 0)), slice(max(-d_col, 0), shape[1] - max(d_col, 0)))
+                dst = (slice(max(d_row, 0), shape[0] - max(-d_row, 0)), slice(max(d_col, 0), shape[1] - max(-d_col, 0)))
+                growing = active[src] & in_patch[dst]
+                src_roots = root_labels[src][growing]
+                dst_roots = root_labels[dst][growing]
+
+                # Growing into another cluster merges the two
+                meets = dst_roots >= 0
+                for i, j in set(zip(src_roots[meets].tolist(), dst_roots[meets].tolist())):
+                    union(i, j)
+
+                # Growing into an empty cell claims it; two clusters claiming one cell merge
+                dst_claims = claims[dst]
+                empty = ~occupied[dst] & growing
+                contested = empty & (dst_claims >= 0) & (dst_claims != root_labels[src])
+                for i, j in set(zip(dst_claims[contested].tolist(), root_labels[src][contested].tolist())):
+                    union(i, j)
+                dst_claims[empty] = root_labels[src][empty]
+
+            new_rows, new_cols = np.nonzero(claims >= 0)
+            if len(new_rows) == 0:
+                break
+            labels[new_rows, new_cols] = claims[new_rows, new_cols]
+            for r, c, label in zip(new_rows.tolist(), new_cols.tolist(), claims[new_rows, new_cols].tolist()):
+                root = find(label)
+                if touched[root] is None and boundary[r, c] is not None:
+                    touched[root] = boundary[r, c]
+
+        left_matches = 0
+        for i in range(num_defects):
+            if find(i) == i and parity[i] == 1 and touched[i] == LEFT:
+                left_matches += 1
+        return left_matches
+
+def _l1_transform_1d(field, axis):
+    """Exact 1D L1 distance transform, d[i] = min_j field[j] + |i - j|, along ``axis``."""
+    position = np.arange(field.shape[axis], dtype=float).reshape([-1 if a == axis else 1 for a in range(field.ndim)])
+    forward = np.minimum.accumulate(field - position, axis=axis) + position
+    backward = np.flip(np.minimum.accumulate(np.flip(field + position, axis=axis), axis=axis), axis=axis) - position
+    return np.minimum(forward, backward)
+
+def nearest_boundary(lattice, index):
+    """
+    ``boundary_distances`` of every node of a partition, without a nodes x cut distance matrix.
+
+    The Manhattan distance to the cut is a separable L1 distance transform over the
+    partition's bounding box, which holds every cut node.
+
+    Returns:
+        tuple: (distances, left) arrays aligned with ``index``, where ``left`` marks the nodes
+        whose nearest boundary is the left lattice boundary.
+    """
+    rows, cols = np.divmod(index, lattice.cols)
+    candidates = [cols + 1.0, lattice.cols - cols.astype(float)]
+    cut = region_boundary(lattice, index)
+    if len(cut):
+        row_min, col_min = int(rows.min()), int(cols.min())
+        field = np.full((int(rows.max()) - row_min + 1, int(cols.max()) - col_min + 1), np.inf)
+        cut_rows, cut_cols = np.divmod(cut, lattice.cols)
+        field[cut_rows - row_min, cut_cols - col_min] = 0.0
+        field = _l1_transform_1d(_l1_transform_1d(field, 0), 1)
+        candidates.append(field[rows - row_min, cols - col_min] + 1.0)
+    candidates = np.stack(candidates)
+    nearest = candidates.argmin(axis=0)
+    return candidates[nearest, np.arange(len(index))], nearest == 0
+
+# Largest defect set the batch matcher decodes; partitions with more defects are decoded one at a time
+BATCH_MAX_DEFECTS = 2
+
+class BatchMatcher:
+    """
+    Vectorized minimum-weight matching of many small defect sets at once.
+
+    With at most two defects a partition has only two matchings: both defects to their nearest
+    boundaries, or to each other, so a whole batch is decoded with a few array operations on
+    defect arrays padded to ``BATCH_MAX_DEFECTS`` columns. The nearest boundary of every node
+    of every partition is computed once; entries are sorted by (partition, node) key so the
+    defects of a batch are looked up with one ``searchsorted``. The same partitions can be
+    decoded across any number of shots.
+    """
+    name = 'batch_matching'
+
+    def __init__(self, lattice, partitions):
+        """
+        Args:
+            lattice (GridLattice): The lattice the partitions belong to.
+            partitions (list): (subgraph, complexity, partition_index) tuples with LatticeRegion subgraphs.
+        """
+        self.lattice = lattice
+        keys = []
+        distances = []
+        left = []
+        for subgraph, _, partition_index in partitions:
+            distance, is_left = nearest_boundary(lattice, subgraph.index)
+            keys.append(partition_index * lattice.num_nodes + subgraph.index)
+            distances.append(distance)
+            left.append(is_left)
+        keys = np.concatenate(keys)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.distances = np.concatenate(distances)[order]
+        self.left = np.concatenate(left)[order]
+
+    def can_decode(self, task):
+        return task.defects is not None and len(task.defects) <= BATCH_MAX_DEFECTS
+
+    def match(self, partition_indices, defects):
+        """
+        Args:
+            partition_indices (np.ndarray): Partition index of every batch entry, shape (batch,).
+            defects (np.ndarray): Flat defect indices padded with -1, shape (batch, BATCH_MAX_DEFECTS).
+
+        Returns:
+            np.ndarray: The number of defects matched to the left boundary in every entry.
+        """
+        valid = defects >= 0
+        keys = partition_indices[:, None] * self.lattice.num_nodes + np.where(valid, defects, 0)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        distances = np.where(valid, self.distances[positions], 0.0)
+        left = valid & self.left[positions]
+
+        rows, cols = np.divmod(defects, self.lattice.cols)
+        pair_distance = np.abs(rows[:, 0] - rows[:, 1]) + np.abs(cols[:, 0] - cols[:, 1])
+        paired = valid.all(axis=1) & (pair_distance < distances.sum(axis=1))
+        return np.where(paired, 0, left.sum(axis=1))
+
+    def decode_tasks(self, tasks, batch_size):
+        """
+        Decode tasks in batches of ``batch_size``, setting each task's ``logical_error`` and its
+        ``decode_time`` to its share of the batch's wall-clock time.
+        """
+        for start in range(0, len(tasks), batch_size):
+            batch = tasks[start:start + batch_size]
+            begin = time.perf_counter()
+            defects = np.full((len(batch), BATCH_MAX_DEFECTS), -1, dtype=np.int64)
+            for row, task in enumerate(batch):
+                defects[row, :len(task.defects)] = task.defects
+            partition_indices = np.fromiter((task.partition_index for task in batch), dtype=np.int64, count=len(batch))
+            left_flips = np.fromiter((task.left_flips for task in batch), dtype=np.int64, count=len(batch))
+            logical_errors = (left_flips + self.match(partition_indices, defects)) % 2 == 1
+            decode_time = (time.perf_counter() - begin) / len(batch)
+            for task, logical_error in zip(batch, logical_errors.tolist()):
+                task.logical_error = logical_error
+                task.decode_time = decode_time
+
+DECODERS = {
+    MWPMDecoder.name: MWPMDecoder,
+    UnionFindDecoder.name: UnionFindDecoder,
+}
@@ -0,0 +1,248 @@
+import heapq
+from collections import deque
+
+import numpy as np
+
+# Event kinds, ordered so that simultaneous events resolve arrivals first
+ARRIVAL = 0
+DECODE_COMPLETE = 1
+MERGE_COMPLETE = 2
+
+class Timeline:
+    """Result of a discrete-event simulation of decoding and merging."""
+    def __init__(self, makespan, critical_path, decode_times, merge_times, busy_time, idle_time, finish_time, dropped, num_events):
+        self.makespan = makespan
+        self.critical_path = critical_path  # ('decode', partition_index, resource_id, start, end) or ('merge', merge_id, start, end)
+        self.decode_times = decode_times  # (resource_id, partition_index, start, end) for every decoded partition
+        self.merge_times = merge_times  # (merge_id, start, end) for every merge
+        self.busy_time = busy_time  # resource_id -> total decode time
+        self.idle_time = idle_time  # resource_id -> time not spent decoding before the makespan
+        self.finish_time = finish_time  # resource_id -> end of the last decode on the resource
+        self.dropped = dropped  # partition indices no resource was assigned
+        self.num_events = num_events
+
+def run_events(queues, durations, arrivals, merges, merge_workers=None):
+    """
+    Run the event loop over plain lists.
+
+    Args:
+        queues (list): For every resource, the leaf ids it decodes in queue order.
+        durations (list): Decode duration of every leaf id.
+        arrivals (list): Arrival time of every leaf id.
+        merges (list): (merge_id, left_id, right_id, latency) records. Merge ids follow the leaf ids.
+        merge_workers (int, optional): Number of merges that may run at once. Unlimited if None.
+
+    Returns:
+        tuple: (done, start, owner, pred, busy, num_events) where ``done[node]`` and ``start[node]``
+        are the completion and start times of every leaf and merge, ``owner[leaf]`` is the
+        resource that decoded it and ``pred[node]`` is the node whose completion released it.
+    """
+    num_leaves = len(durations)
+    num_nodes = num_leaves + len(merges)
+    done = [None] * num_nodes
+    start = [None] * num_nodes
+    pred = [None] * num_nodes
+    owner = [None] * num_leaves
+    ready = [False] * num_leaves
+    busy = [0.0] * len(queues)
+    idle = [True] * len(queues)
+    pending_queues = [deque(queue) for queue in queues]
+
+    parent = [None] * num_nodes
+    pending = [0] * num_nodes
+    latency_of = [0.0] * num_nodes
+    for merge_id, left, right, latency in merges:
+        parent[left] = merge_id
+        parent[right] = merge_id
+        pending[merge_id] = 2
+        latency_of[merge_id] = latency
+
+    for r, queue in enumerate(queues):
+        for leaf in queue:
+            owner[leaf] = r
+
+    # Arrivals are known up front, so they are consumed from a sorted list alongside the heap
+    # instead of being pushed through it
+    arrival_order = sorted(range(num_leaves), key=arrivals.__getitem__)
+    next_arrival = 0
+    next_arrival_time = arrivals[arrival_order[0]] if num_leaves else float('inf')
+
+    heap = []
+    seq = 0
+    waiting_merges = deque()
+    free_workers = merge_workers
+    num_events = 0
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+
+    while heap or next_arrival < num_leaves:
+        # Ties resolve arrivals first, matching the ARRIVAL < DECODE_COMPLETE ordering
+        if next_arrival < num_leaves and (not heap or next_arrival_time <= heap[0][0]):
+            t = next_arrival_time
+            kind = ARRIVAL
+            node = arrival_order[next_arrival]
+            next_arrival += 1
+            next_arrival_time = arrivals[arrival_order[next_arrival]] if next_arrival < num_leaves else float('inf')
+        else:
+            t, _, kind, node = heappop(heap)
+        num_events += 1
+
+        if kind == ARRIVAL:
+            ready[node] = True
+            r = owner[node]
+            if r is None:
+                # Nothing decodes this partition, so it is available for merging as it arrives
+                done[node] = t
+                start[node] = t
+            else:
+                queue = pending_queues[r]
+                if not (idle[r] and queue[0] == node):
+                    continue
+                queue.popleft()
+                idle[r] = False
+                start[node] = t
+                duration = durations[node]
+                busy[r] += duration
+                heappush(heap, (t + duration, seq, DECODE_COMPLETE, node))
+                seq += 1
+                continue
+
+        elif kind == DECODE_COMPLETE:
+            done[node] = t
+            r = owner[node]
+            queue = pending_queues[r]
+            if queue and ready[queue[0]]:
+                following = queue.popleft()
+                start[following] = t
+                pred[following] = node
+                duration = durations[following]
+                busy[r] += duration
+                heappush(heap, (t + duration, seq, DECODE_COMPLETE, following))
+                seq += 1
+            else:
+                idle[r] = True
+
+        else:
+            done[node] = t
+            if merge_workers is not None:
+                if waiting_merges:
+                    merge_id = waiting_merges.popleft()
+                    start[merge_id] = t
+                    heappush(heap, (t + latency_of[merge_id], seq, MERGE_COMPLETE, merge_id))
+                    seq += 1
+                else:
+                    free_workers += 1
+
+        # A completed leaf or merge may release its parent merge
+        merge_id = parent[node]
+        if merge_id is not None:
+            pending[merge_id] -= 1
+            if pending[merge_id] == 0:
+                pred[merge_id] = node
+                if merge_workers is None or free_workers > 0:
+                    if merge_workers is not None:
+                        free_workers -= 1
+                    start[merge_id] = t
+                    heappush(heap, (t + latency_of[merge_id], seq, MERGE_COMPLETE, merge_id))
+                    seq += 1
+                else:
+                    waiting_merges.append(merge_id)
+
+    return done, start, owner, pred, busy, num_events
+
+def simulate_timeline(resources, merges=(), leaf_partitions=None, arrival_times=None, merge_workers=None):
+    """
+    Simulate the decode and merge timeline of scheduled resources with an event queue.
+
+    Every resource decodes its tasks in queue order, starting each one once the resource is
+    free and the partition has arrived. Decode-complete events release the merges recorded by
+    ``combine_partitions_parallel``, and each merge starts as soon as both of its inputs are done.
+
+    Args:
+        resources (list): Resources whose ``tasks`` were filled by ``process_queue``.
+        merges (list): (merge_id, left_id, right_id, latency) records from ``combine_partitions_parallel``.
+        leaf_partitions (list, optional): Partition index of every leaf id used in ``merges``.
+            Defaults to leaf id == partition index.
+        arrival_times (dict or list, optional): Arrival time of every partition index. Defaults to 0.
+        merge_workers (int, optional): Number of merges that may run at once. Unlimited if None.
+
+    Returns:
+        Timeline: The makespan, critical path and per-resource busy and idle times.
+    """
+    if leaf_partitions is None:
+        leaf_partitions = sorted({task.partition_index for resource in resources for _, _, task in resource.tasks})
+    leaf_of = {partition_index: leaf for leaf, partition_index in enumerate(leaf_partitions)}
+
+    durations = [0.0] * len(leaf_partitions)
+    queues = []
+    for resource in resources:
+        queue = []
+        for task_start, task_end, task in resource.tasks:
+            leaf = leaf_of[task.partition_index]
+            durations[leaf] = task_end - task_start
+            queue.append(leaf)
+        queues.append(queue)
+
+    if arrival_times is None:
+        arrivals = [0.0] * len(leaf_partitions)
+    else:
+        arrivals = [arrival_times[partition_index] for partition_index in leaf_partitions]
+
+    done, start, owner, pred, busy, num_events = run_events(queues, durations, arrivals, merges, merge_workers)
+
+    num_leaves = len(leaf_partitions)
+    finished = [t for t in done if t is not None]
+    makespan = max(finished) if finished else 0.0
+
+    decode_times = [(resources[owner[leaf]].id, leaf_partitions[leaf], start[leaf], done[leaf])
+                    for leaf in range(num_leaves) if owner[leaf] is not None and done[leaf] is not None]
+    merge_times = [(merge_id, start[merge_id], done[merge_id]) for merge_id, _, _, _ in merges if done[merge_id] is not None]
+    dropped = [leaf_partitions[leaf] for leaf in range(num_leaves) if owner[leaf] is None]
+
+    # Walk back from the last completion along the events that released each node
+    critical_path = []
+    node = max((n for n in range(len(done)) if done[n] is not None), key=lambda n: done[n], default=None)
+    while node is not None:
+        if node < num_leaves:
+            if owner[node] is not None:
+                critical_path.append(('decode', leaf_partitions[node], resources[owner[node]].id, start[node], done[node]))
+        else:
+            critical_path.append(('merge', node, start[node], done[node]))
+        node = pred[node]
+    critical_path.reverse()
+
+    busy_time = {}
+    idle_time = {}
+    finish_time = {}
+    for r, resource in enumerate(resources):
+        busy_time[resource.id] = busy[r]
+        idle_time[resource.id] = makespan - busy[r]
+        ends = [done[leaf] for leaf in queues[r] if done[leaf] is not None]
+        finish_time[resource.id] = max(ends) if ends else 0.0
+
+    return Timeline(makespan, critical_path, decode_times, merge_times, busy_time, idle_time, finish_time, dropped, num_events)
+
+def merge_tree_makespans(leaf_finish, merges=()):
+    """
+    Critical-path makespans of many shots whose decodes all start at time 0.
+
+    Every merge starts as soon as both of its inputs are done, with no limit on concurrent
+    merges, which is what ``simulate_timeline`` computes without arrival times or merge workers.
+    The merge tree is evaluated once for all shots, with one array operation per merge.
+
+    Args:
+        leaf_finish (np.ndarray): Decode finish time of every leaf id, shape (shots, leaves);
+            NaN for partitions no resource decoded, whose merges then never complete.
+        merges (list): (merge_id, left_id, right_id, latency) records. Merge ids follow the leaf ids.
+
+    Returns:
+        np.ndarray: The makespan of every shot: the latest completion of any decode or merge.
+    """
+    num_shots, num_leaves = leaf_finish.shape
+    done = np.full((num_shots, num_leaves + len(merges)), np.nan)
+    done[:, :num_leaves] = leaf_finish
+    for merge_id, left, right, latency in merges:
+        done[:, merge_id] = np.maximum(done[:, left], done[:, right]) + latency
+    if done.shape[1] == 0:
+        return np.zeros(num_shots)
+    return np.nan_to_num(np.fmax.reduce(done, axis=1))
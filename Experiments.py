@@ -1,5 +1,6 @@
-import matplotlib.pyplot as plt
-import simulate
+import MonteCarlo
+import Plots
+import Sweep
 
 def size_change():
     # Set fixed arguments
@@ -9,43 +10,25 @@ def size_change():
     thresh_compl = 2
     time_limit = float('inf')
 
-    # Initialize lists to store data
-    lattice_sizes = []
-    max_times = []
-    net_accuracies = []
-
-    # Loop over different lattice sizes
-    for rows in range(5, 100, 10):
-            size = [rows, rows]
-            lattice_sizes.append(rows * rows)
-            
-            args = simulate.parse_arguments(['--size', str(rows), str(rows), '--partitions', str(partitions), 
-                                    '--num_hr', str(num_hr), '--num_lr', str(num_lr), 
-                                    '--thresh_compl', str(thresh_compl), '--time_limit', str(time_limit)])
-            
-            combined_resources, p, a, max_time_taken, net_accuracy = simulate.main_func(args)  # Run the main function with the current arguments
-            
-            # Collect the maximum time taken by any resource
-            max_times.append(max_time_taken)
-
-            # Collect the net accuracy across all partitions
-            net_accuracies.append(net_accuracy)
+    # Build the grid of lattice sizes and repeat its points across a pool of workers until their intervals are tight
+    grid = [{'size': [rows, rows], 'partitions': partitions, 'num_hr': num_hr, 'num_lr': num_lr,
+             'thresh_compl': thresh_compl, 'time_limit': time_limit} for rows in range(5, 100, 10)]
+    results = MonteCarlo.run_adaptive(grid)
 
-    # Plot the graph
-    plt.plot(lattice_sizes, max_times)
-    plt.xlabel('Lattice Size (in nodes)')
-    plt.ylabel('Maximum Time Taken (seconds)')
-    plt.title('Lattice Size vs Maximum Time Taken')
-    plt.show()
+    # Collect the maximum time taken by any resource and the net accuracy across all partitions
+    lattice_sizes = [params['size'][0] * params['size'][1] for params in grid]
+    max_times = [result['max_time_taken'] for result in results]
+    net_accuracies = [result['net_accuracy'] for result in results]
+    time_errors = [result['makespan']['half_width'] for result in results]
+    accuracy_errors = [result['accuracy']['half_width'] for result in results]
+
+    # Plot the graph with the confidence intervals of the means
+    Plots.plot_series(lattice_sizes, max_times, 'Lattice Size (in nodes)', 'Maximum Time Taken (seconds)',
+                      'Lattice Size vs Maximum Time Taken', yerr=time_errors)
 
     # Plot the graph
-    plt.plot(lattice_sizes, net_accuracies)
-    plt.xlabel('Lattice Size (in nodes)')
-    plt.ylabel('Net Accuracy (%)')
-    ax = plt.gca()
-    #ax.set_ylim([90, 100])
-    plt.title('Lattice Size vs Net Accuracy')
-    plt.show()
+    Plots.plot_series(lattice_sizes, net_accuracies, 'Lattice Size (in nodes)', 'Net Accuracy (%)',
+                      'Lattice Size vs Net Accuracy', yerr=accuracy_errors)
 
 def partition_num_change():
     # Set fixed arguments
@@ -55,42 +38,25 @@ def partition_num_change():
     thresh_compl = 3
     time_limit = float('inf')
 
-    # Initialize lists to store data
-    num_partitions = []
-    net_accuracies = []
-    max_times = []
-
-    # Loop over different numbers of partitions
-    for partitions in range(2, 11):
-        num_partitions.append(partitions)
-        
-        args = simulate.parse_arguments(['--size', str(size[0]), str(size[1]), '--partitions', str(partitions),
-                                '--num_hr', str(num_hr), '--num_lr', str(num_lr), 
-                                '--thresh_compl', str(thresh_compl), '--time_limit', str(time_limit)])
-        
-        combined_resources, p, a, max_time_taken, net_accuracy = simulate.main_func(args)  # Run the main function with the current arguments
-        
-        # Collect the net accuracy across all partitions
-        net_accuracies.append(net_accuracy)
-
-        # Collect the maximum time taken by any resource
-        max_times.append(max_time_taken)
+    # Build the grid of partition counts and repeat its points across a pool of workers until their intervals are tight
+    grid = Sweep.parameter_grid(size=[size], partitions=range(2, 11), num_hr=[num_hr], num_lr=[num_lr],
+                                thresh_compl=[thresh_compl], time_limit=[time_limit])
+    results = MonteCarlo.run_adaptive(grid)
 
-    # Plot the graph
-    plt.plot(num_partitions, net_accuracies)
-    plt.xlabel('Number of Partitions')
-    plt.ylabel('Net Accuracy (%)')
-    ax = plt.gca()
-    #ax.set_ylim([90, 100])
-    plt.title('Number of Partitions vs Net Accuracy')
-    plt.show()
+    # Collect the net accuracy across all partitions and the maximum time taken by any resource
+    num_partitions = [params['partitions'] for params in grid]
+    net_accuracies = [result['net_accuracy'] for result in results]
+    max_times = [result['max_time_taken'] for result in results]
+    accuracy_errors = [result['accuracy']['half_width'] for result in results]
+    time_errors = [result['makespan']['half_width'] for result in results]
+
+    # Plot the graph with the confidence intervals of the means
+    Plots.plot_series(num_partitions, net_accuracies, 'Number of Partitions', 'Net Accuracy (%)',
+                      'Number of Partitions vs Net Accuracy', yerr=accuracy_errors)
 
     # Plot the graph
-    plt.plot(num_partitions, max_times)
-    plt.xlabel('Number of Partitions')
-    plt.ylabel('Maximum Time Taken (seconds)')
-    plt.title('Number of Partitions vs Maximum Time Taken')
-    plt.show()
+    Plots.plot_series(num_partitions, max_times, 'Number of Partitions', 'Maximum Time Taken (seconds)',
+                      'Number of Partitions vs Maximum Time Taken', yerr=time_errors)
 
 def res_num_change():
     # Set fixed arguments
@@ -99,49 +65,25 @@ def res_num_change():
     thresh_compl = 2
     time_limit = float('inf')
 
-    # Initialize lists to store data
-    num_hr_values = []
-    num_lr_values = []
-    max_time = []
-    accuracy = []
-
-    # Loop over different combinations of num_hr and num_lr
-    for num_hr in range(2, 6):
-        for num_lr in range(2, 6):
-            if (num_hr+num_lr >= 5 and num_hr+num_lr <=8 ):
-                num_hr_values.append(num_hr)
-                num_lr_values.append(num_lr)
-
-                args = simulate.parse_arguments(['--size', str(size[0]), str(size[1]), '--partitions', str(partitions),
-                                        '--num_hr', str(num_hr), '--num_lr', str(num_lr),
-                                        '--thresh_compl', str(thresh_compl), '--time_limit', str(time_limit)])
+    # Build the grid of resource combinations and repeat its points across a pool of workers until their intervals are tight
+    grid = [params for params in Sweep.parameter_grid(size=[size], partitions=[partitions], num_hr=range(2, 6), num_lr=range(2, 6),
+                                                       thresh_compl=[thresh_compl], time_limit=[time_limit])
+            if 5 <= params['num_hr'] + params['num_lr'] <= 8]
+    results = MonteCarlo.run_adaptive(grid)
 
-                combined_resources, p, a, max_time_taken, net_accuracy = simulate.main_func(args) # Run the main function with the current arguments
-
-                # Collect the scheduling overhead
-                max_time.append(max_time_taken)
-
-                accuracy.append(net_accuracy)
+    # Collect the maximum time taken and the accuracy of every combination
+    num_hr_values = [params['num_hr'] for params in grid]
+    num_lr_values = [params['num_lr'] for params in grid]
+    max_time = [result['max_time_taken'] for result in results]
+    accuracy = [result['net_accuracy'] for result in results]
 
     # Plot the graph
-    fig, ax = plt.subplots(figsize=(8, 6))
-    scatter = ax.scatter(num_hr_values, num_lr_values, c=max_time, cmap='viridis')
-    ax.set_xlabel('Number of High-Complexity Resources')
-    ax.set_ylabel('Number of Low-Complexity Resources')
-    ax.set_title('Max time taken')
-    cbar = fig.colorbar(scatter)
-    cbar.set_label('Max time taken (seconds)')
-    plt.show()
+    Plots.plot_grid_scatter(num_hr_values, num_lr_values, max_time, 'Number of High-Complexity Resources',
+                            'Number of Low-Complexity Resources', 'Max time taken', 'Max time taken (seconds)', cmap='viridis')
 
     # Plot the graph
-    fig, ax = plt.subplots(figsize=(8, 6))
-    scatter = ax.scatter(num_hr_values, num_lr_values, c=accuracy, cmap='plasma')
-    ax.set_xlabel('Number of High-Complexity Resources')
-    ax.set_ylabel('Number of Low-Complexity Resources')
-    ax.set_title('Accuracy')
-    cbar = fig.colorbar(scatter)
-    cbar.set_label('Accuracy (%)')
-    plt.show()
+    Plots.plot_grid_scatter(num_hr_values, num_lr_values, accuracy, 'Number of High-Complexity Resources',
+                            'Number of Low-Complexity Resources', 'Accuracy', 'Accuracy (%)', cmap='plasma')
 
 def thresh_compl_change():
     # Set fixed arguments
@@ -151,29 +93,19 @@ def thresh_compl_change():
     num_lr = 3
     time_limit = float('inf')
 
-    # Initialize lists to store data
-    thresh_compl_values = []
-    max_times = []
-
-    # Loop over different values of thresh_compl
-    for thresh_compl in range(3, 10):
-        thresh_compl_values.append(thresh_compl)
+    # Build the grid of thresholds and repeat its points across a pool of workers until their intervals are tight
+    grid = Sweep.parameter_grid(size=[size], partitions=[partitions], num_hr=[num_hr], num_lr=[num_lr],
+                                thresh_compl=range(3, 10), time_limit=[time_limit])
+    results = MonteCarlo.run_adaptive(grid)
 
-        args = simulate.parse_arguments(['--size', str(size[0]), str(size[1]), '--partitions', str(partitions),
-                                '--num_hr', str(num_hr), '--num_lr', str(num_lr),
-                                '--thresh_compl', str(thresh_compl), '--time_limit', str(time_limit)])
+    # Collect the maximum time taken at every threshold
+    thresh_compl_values = [params['thresh_compl'] for params in grid]
+    max_times = [result['max_time_taken'] for result in results]
+    time_errors = [result['makespan']['half_width'] for result in results]
 
-        combined_resources, p, a, max_time_taken, net_accuracy = simulate.main_func(args)  # Run the main function with the current arguments
-
-        # Collect the net accuracy across all partitions
-        max_times.append(max_time_taken)
-
-    # Plot the graph
-    plt.plot(thresh_compl_values, max_times)
-    plt.xlabel('Threshold for Low-Complexity Resources')
-    plt.ylabel('Max times (in sec)')
-    plt.title('Threshold for Low-Complexity Resources vs Latency')
-    plt.show()
+    # Plot the graph with the confidence intervals of the means
+    Plots.plot_series(thresh_compl_values, max_times, 'Threshold for Low-Complexity Resources', 'Max times (in sec)',
+                      'Threshold for Low-Complexity Resources vs Latency', yerr=time_errors)
 
 # def time_lim_change():
 #     # Set fixed arguments
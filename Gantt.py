@@ -0,0 +1,238 @@
+import json
+import os
+
+import numpy as np
+
+# matplotlib is imported by the functions that draw, so importing this module (and simulate) does
+# not pay for it: headless runs, HTML timelines and pool workers never load it
+
+# Beyond these counts the chart stops drawing every label and legend entry
+MAX_LABELS = 200
+MAX_LEGEND_ENTRIES = 20
+# A label is only drawn on a bar at least this fraction of the time axis wide
+MIN_LABEL_WIDTH = 0.02
+
+def gantt_bars(resources):
+    """
+    Flatten the task timelines of ``resources`` into arrays.
+
+    Returns:
+        tuple: (rows, starts, ends, partition_indices) arrays with one entry per task, where
+        ``rows`` is the position of the task's resource in ``resources``.
+    """
+    counts = [len(resource.tasks) for resource in resources]
+    rows = np.repeat(np.arange(len(resources)), counts)
+    starts = np.fromiter((start for resource in resources for start, _, _ in resource.tasks), dtype=float, count=len(rows))
+    ends = np.fromiter((end for resource in resources for _, end, _ in resource.tasks), dtype=float, count=len(rows))
+    partition_indices = np.fromiter((task.partition_index for resource in resources for _, _, task in resource.tasks),
+                                    dtype=np.int64, count=len(rows))
+    return rows, starts, ends, partition_indices
+
+def resource_label(resource):
+    return f"Resource {resource.id} ({resource.type})"
+
+def label_positions(starts, ends, max_labels=MAX_LABELS, min_width=MIN_LABEL_WIDTH):
+    """
+    Indices of the bars to label: all of them when there are at most ``max_labels``, otherwise
+    the ``max_labels`` widest of the bars at least ``min_width`` of the time axis wide.
+    """
+    if len(starts) <= max_labels:
+        return np.arange(len(starts))
+    widths = ends - starts
+    span = ends.max() - starts.min()
+    wide = np.flatnonzero(widths >= min_width * span) if span > 0 else np.arange(0)
+    if len(wide) > max_labels:
+        wide = wide[np.argsort(widths[wide])[::-1][:max_labels]]
+    return wide
+
+def draw_gantt(resources, num_partitions, time_limit=float('inf'), max_labels=MAX_LABELS, max_legend=MAX_LEGEND_ENTRIES):
+    """
+    Draw the Gantt chart of ``resources`` on a new figure.
+
+    All bars are one PolyCollection, so drawing cost does not grow with a Python call per
+    task. Partition labels are capped by ``label_positions``; with more than ``max_legend``
+    partitions the per-partition legend is replaced by a colorbar of partition indices.
+
+    Returns:
+        matplotlib.figure.Figure: The figure, which the caller shows, saves or closes.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PolyCollection
+
+    rows, starts, ends, partition_indices = gantt_bars(resources)
+    num_colors = max(num_partitions, 1)
+    cmap = plt.colormaps['rainbow']
+    colors = cmap(np.linspace(0, 1, num_colors))
+
+    fig, ax = plt.subplots(figsize=(12, max(4, min(0.4 * len(resources) + 2, 40))))
+    # One rectangle per task: (start, row - 0.4) to (end, row + 0.4)
+    bottoms = rows - 0.4
+    tops = rows + 0.4
+    verts = np.stack([np.column_stack([starts, bottoms]), np.column_stack([starts, tops]),
+                      np.column_stack([ends, tops]), np.column_stack([ends, bottoms])], axis=1)
+    ax.add_collection(PolyCollection(verts, facecolors=colors[partition_indices % num_colors], linewidths=0))
+
+    for i in label_positions(starts, ends, max_labels):
+        ax.text((starts[i] + ends[i]) / 2, rows[i], f"P{partition_indices[i]}", ha='center', va='center', color='black', fontsize=10)
+
+    if len(starts):
+        ax.set_xlim(min(starts.min(), 0), ends.max() * 1.02 if ends.max() > 0 else 1)
+    ax.set_ylim(-0.5, len(resources) - 0.5)
+    ax.set_yticks(range(len(resources)))
+    ax.set_yticklabels([resource_label(resource) for resource in resources])
+    ax.set_xlabel('Time')
+    ax.set_title('Partition Execution Gantt Chart')
+    ax.grid(True)
+
+    handles = []
+    if num_partitions <= max_legend:
+        handles = [plt.Rectangle((0, 0), 1, 1, color=colors[index], label=f"Partition {index}") for index in range(num_partitions)]
+    else:
+        mappable = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(0, num_partitions - 1))
+        fig.colorbar(mappable, ax=ax, label='Partition')
+
+    # Add vertical line at time limit if not infinity
+    if time_limit != float('inf'):
+        handles.append(ax.axvline(x=time_limit, linestyle='--', color='r', label='Time Limit'))
+    if handles:
+        ax.legend(handles=handles, loc='upper right', title='Partitions' if num_partitions <= max_legend else None, ncol=2)
+
+    fig.tight_layout()
+    return fig
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Partition Execution Gantt Chart</title>
+<style>
+body { margin: 0; font-family: sans-serif; }
+#info { padding: 4px 8px; height: 1.4em; font-size: 13px; }
+canvas { display: block; }
+</style>
+</head>
+<body>
+<div id="info">Scroll to zoom, drag to pan, hover over a bar for details.</div>
+<canvas id="chart"></canvas>
+<script>
+const data = __DATA__;
+const canvas = document.getElementById('chart');
+const ctx = canvas.getContext('2d');
+const info = document.getElementById('info');
+const labelWidth = 180, rowHeight = Math.max(8, Math.min(30, 600 / data.resources.length));
+const n = data.starts.length;
+let t0 = 0, t1 = Math.max(data.end, 1e-30);
+function resize() {
+  canvas.width = window.innerWidth;
+  canvas.height = data.resources.length * rowHeight + 30;
+  draw();
+}
+function x(t) { return labelWidth + (t - t0) / (t1 - t0) * (canvas.width - labelWidth - 10); }
+function color(p) { return 'hsl(' + (270 - 270 * p / Math.max(data.num_partitions - 1, 1)) + ',80%,55%)'; }
+function draw() {
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  ctx.font = '11px sans-serif';
+  ctx.textBaseline = 'middle';
+  data.resources.forEach((name, r) => { ctx.fillStyle = '#000'; ctx.fillText(name, 4, (r + 0.5) * rowHeight); });
+  for (let i = 0; i < n; i++) {
+    if (data.ends[i] < t0 || data.starts[i] > t1) continue;
+    const left = x(data.starts[i]), width = Math.max(x(data.ends[i]) - left, 1);
+    ctx.fillStyle = color(data.partitions[i]);
+    ctx.fillRect(left, data.rows[i] * rowHeight + 2, width, rowHeight - 4);
+    if (width > 30 && rowHeight >= 14) {
+      ctx.fillStyle = '#000';
+      ctx.fillText('P' + data.partitions[i], left + 2, (data.rows[i] + 0.5) * rowHeight);
+    }
+  }
+  if (data.time_limit !== null) {
+    ctx.strokeStyle = 'red';
+    ctx.setLineDash([5, 5]);
+    ctx.beginPath(); ctx.moveTo(x(data.time_limit), 0); ctx.lineTo(x(data.time_limit), canvas.height - 30); ctx.stroke();
+    ctx.setLineDash([]);
+  }
+  ctx.fillStyle = '#000';
+  ctx.fillText(t0.toExponential(3) + ' s', labelWidth, canvas.height - 12);
+  const right = t1.toExponential(3) + ' s';
+  ctx.fillText(right, canvas.width - 10 - ctx.measureText(right).width, canvas.height - 12);
+}
+canvas.addEventListener('wheel', e => {
+  e.preventDefault();
+  const at = t0 + (e.offsetX - labelWidth) / (canvas.width - labelWidth - 10) * (t1 - t0);
+  const scale = e.deltaY > 0 ? 1.25 : 0.8;
+  t0 = at - (at - t0) * scale; t1 = at + (t1 - at) * scale;
+  draw();
+});
+let dragX = null;
+canvas.addEventListener('mousedown', e => { dragX = e.offsetX; });
+window.addEventListener('mouseup', () => { dragX = null; });
+canvas.addEventListener('mousemove', e => {
+  const perPixel = (t1 - t0) / (canvas.width - labelWidth - 10);
+  if (dragX !== null) {
+    const shift = (dragX - e.offsetX) * perPixel;
+    t0 += shift; t1 += shift; dragX = e.offsetX;
+    draw();
+    return;
+  }
+  const row = Math.floor(e.offsetY / rowHeight), t = t0 + (e.offsetX - labelWidth) * perPixel;
+  for (let i = 0; i < n; i++) {
+    if (data.rows[i] === row && data.starts[i] - perPixel <= t && t <= data.ends[i] + perPixel) {
+      info.textContent = data.resources[row] + ': partition ' + data.partitions[i] + ', ' +
+        data.starts[i].toExponential(4) + ' s to ' + data.ends[i].toExponential(4) + ' s';
+      return;
+    }
+  }
+});
+window.addEventListener('resize', resize);
+resize();
+</script>
+</body>
+</html>
+"""
+
+def write_gantt_html(resources, num_partitions, path, time_limit=float('inf')):
+    """
+    Write a self-contained interactive HTML timeline of ``resources`` to ``path``.
+
+    The task arrays are embedded as JSON and drawn on a canvas, with zoom, pan and per-task
+    tooltips, so runs with too many tasks for a static chart can still be inspected. No
+    plotting library or display is needed.
+    """
+    rows, starts, ends, partition_indices = gantt_bars(resources)
+    data = {
+        'resources': [resource_label(resource) for resource in resources],
+        'rows': rows.tolist(),
+        'starts': starts.tolist(),
+        'ends': ends.tolist(),
+        'partitions': partition_indices.tolist(),
+        'num_partitions': num_partitions,
+        'end': float(max(ends.max() if len(ends) else 0.0, time_limit if time_limit != float('inf') else 0.0)),
+        'time_limit': None if time_limit == float('inf') else time_limit,
+    }
+    with open(path, 'w') as f:
+        f.write(HTML_TEMPLATE.replace('__DATA__', json.dumps(data)))
+
+def render_gantt(resources, num_partitions, path=None, time_limit=float('inf')):
+    """
+    Render the Gantt chart of ``resources``.
+
+    Args:
+        resources (list): Resources whose ``tasks`` hold (start, end, task) tuples. Duplicates
+            are drawn once, in order of first appearance.
+        num_partitions (int): Number of partitions, which sets the colors.
+        path (str, optional): Output file. ``.html`` writes an interactive timeline; any other
+            extension (``.png``, ``.svg``, ``.pdf``) is saved by matplotlib without a display.
+            Without a path the chart is shown interactively.
+        time_limit (float): Time limit drawn as a vertical line, if finite.
+    """
+    resources = list(dict.fromkeys(resources))
+    if path is not None and os.path.splitext(path)[1].lower() in ('.html', '.htm'):
+        write_gantt_html(resources, num_partitions, path, time_limit)
+        return
+    import matplotlib.pyplot as plt
+
+    fig = draw_gantt(resources, num_partitions, time_limit)
+    if path is None:
+        plt.show()
+    else:
+        fig.savefig(path)
+    plt.close(fig)
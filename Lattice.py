@@ -0,0 +1,395 @@
+import numpy as np
+
+# Offsets of the four lattice neighbours of a node: up, down, left, right
+NEIGHBOR_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+def sorted_unique(values):
+    """Sort ``values`` and drop duplicates. Cheaper than ``np.unique`` on mostly sorted input."""
+    values = np.sort(values, kind='stable')
+    if len(values) < 2:
+        return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+def union_sorted(index1, index2):
+    """Union of two sorted index arrays."""
+    return sorted_unique(np.concatenate([index1, index2]))
+
+class GridLattice:
+    """
+    Array-backed rows x cols lattice.
+
+    Nodes are identified by their flat row-major index ``row * cols + col``. The
+    class mirrors the small part of the networkx graph API used by the simulation
+    (``nodes`` and ``subgraph``) so it can stand in for ``nx.grid_2d_graph``
+    without materialising any per-node Python objects.
+    """
+    def __init__(self, rows, cols):
+        self.rows = int(rows)
+        self.cols = int(cols)
+        self.num_nodes = self.rows * self.cols
+        self._nodes = None
+
+    def __reduce__(self):
+        return (GridLattice, (self.rows, self.cols))
+
+    @property
+    def shape(self):
+        return (self.rows, self.cols)
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self._nodes = RegionNodes(self, np.arange(self.num_nodes, dtype=np.int64))
+        return self._nodes
+
+    def coordinates(self):
+        """Return the (row, col) coordinate arrays of every node in flat index order."""
+        return np.divmod(np.arange(self.num_nodes, dtype=np.int64), self.cols)
+
+    def to_index(self, nodes):
+        """Convert an iterable of (row, col) tuples or flat indices to a sorted, unique index array."""
+        if isinstance(nodes, np.ndarray):
+            return sorted_unique(nodes.astype(np.int64, copy=False))
+        if isinstance(nodes, RegionNodes):
+            return nodes.index
+        nodes = list(nodes)
+        if not nodes:
+            return np.empty(0, dtype=np.int64)
+        coords = np.asarray(nodes, dtype=np.int64)
+        if coords.ndim == 2:
+            coords = coords[:, 0] * self.cols + coords[:, 1]
+        return sorted_unique(coords)
+
+    def subgraph(self, nodes):
+        return LatticeRegion(self, self.to_index(nodes))
+
+class LatticeRegion:
+    """
+    A subset of a GridLattice, stored as a sorted array of flat node indices.
+
+    ``defects`` optionally holds the flat indices of the region's syndrome defects and
+    ``left_flips`` the number of its flipped edges to the left lattice boundary.
+    """
+    def __init__(self, lattice, index, defects=None, left_flips=0):
+        self.lattice = lattice
+        self.index = index
+        self.defects = defects
+        self.left_flips = left_flips
+        self._nodes = None
+
+    def __reduce__(self):
+        return (LatticeRegion, (self.lattice, self.index, self.defects, self.left_flips))
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self._nodes = RegionNodes(self.lattice, self.index)
+        return self._nodes
+
+    def remove_node(self, node):
+        row, col = node
+        flat = row * self.lattice.cols + col
+        self.index = self.index[self.index != flat]
+        self._nodes = None
+
+    def __len__(self):
+        return len(self.index)
+
+class RegionNodes:
+    """Set-like view over the (row, col) nodes of a region, with O(1) membership tests."""
+    def __init__(self, lattice, index):
+        self.lattice = lattice
+        self.index = index
+        self._mask = None
+
+    def mask(self):
+        if self._mask is None:
+            self._mask = np.zeros(self.lattice.num_nodes, dtype=bool)
+            self._mask[self.index] = True
+        return self._mask
+
+    def __contains__(self, node):
+        row, col = node
+        if not (0 <= row < self.lattice.rows and 0 <= col < self.lattice.cols):
+            return False
+        if len(self.index) == self.lattice.num_nodes:
+            return True
+        return bool(self.mask()[row * self.lattice.cols + col])
+
+    def __call__(self):
+        # Like networkx's NodeView, ``region.nodes()`` and ``region.nodes`` are interchangeable
+        return self
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        rows, cols = np.divmod(self.index, self.lattice.cols)
+        return zip(rows.tolist(), cols.tolist())
+
+def as_grid_lattice(lattice):
+    """Return ``lattice`` as a GridLattice, converting an ``nx.grid_2d_graph`` if needed."""
+    if isinstance(lattice, GridLattice):
+        return lattice
+    rows = max(row for row, _ in lattice.nodes) + 1
+    cols = max(col for _, col in lattice.nodes) + 1
+    return GridLattice(rows, cols)
+
+def spatial_hash_labels(rows, cols, grid_size, lattice_size, num_partitions):
+    """Vectorised ``simulate.spatial_hash`` over coordinate arrays."""
+    grid_x = np.floor_divide(rows, grid_size)
+    grid_y = np.floor_divide(cols, grid_size)
+    return ((grid_x + grid_y * (lattice_size // grid_size)) % num_partitions).astype(np.int64)
+
+def partition_labels(lattice, num_partitions):
+    """
+    Assign every node of the lattice to a partition.
+
+    Args:
+        lattice (GridLattice): The lattice to partition.
+        num_partitions (int): Number of partitions to create.
+
+    Returns:
+        np.ndarray: The partition label of each node, in flat index order.
+    """
+    lattice_size = int(np.sqrt(lattice.num_nodes))
+    grid_size = lattice_size / np.sqrt(num_partitions)
+    rows, cols = lattice.coordinates()
+    return spatial_hash_labels(rows, cols, grid_size, lattice_size, num_partitions)
+
+def cubic_cost(complexity):
+    """Default decode cost of a high-complexity resource, as in ``Resource.estimate_processing_time``."""
+    return (complexity ** 3) * (10 ** -9)
+
+def bisection_labels(lattice, num_partitions, weights, cost=cubic_cost):
+    """
+    Assign every node to a partition by recursive coordinate bisection over weighted nodes.
+
+    A box of the lattice that is to hold ``k`` partitions is cut into two boxes holding
+    ``k1`` and ``k - k1`` of them. The cut is chosen over both axes and every position, and
+    ``k1`` among an even split and splits in proportion to the node counts and to the weights
+    of the two sides, each limited so that every partition keeps at least one node. The
+    choice minimises the larger predicted per-partition cost of the two sides, where a side's
+    complexity is its weight divided by its partition count plus one, and includes the halo
+    line it receives from the other side. Partitions are only left empty when there are more
+    of them than nodes.
+
+    Args:
+        lattice (GridLattice): The lattice to partition.
+        num_partitions (int): Number of partitions to create.
+        weights (np.ndarray): Predicted load of every node, in flat index order, e.g. its
+            sampled defects plus the expected defect density.
+        cost (callable): Vectorised cost curve over complexity, e.g. a CostModel.
+
+    Returns:
+        np.ndarray: The partition label of each node, in flat index order.
+    """
+    grid = np.asarray(weights, dtype=float).reshape(lattice.rows, lattice.cols)
+    labels = np.empty((lattice.rows, lattice.cols), dtype=np.int64)
+
+    # Boxes of (row_start, row_stop, col_start, col_stop, partitions, first label)
+    boxes = [(0, lattice.rows, 0, lattice.cols, num_partitions, 0)]
+    while boxes:
+        row_start, row_stop, col_start, col_stop, k, first = boxes.pop()
+        box = grid[row_start:row_stop, col_start:col_stop]
+        if k == 1:
+            labels[row_start:row_stop, col_start:col_stop] = first
+            continue
+        if box.size <= k:
+            # One node per partition; only more partitions than nodes leaves some empty
+            labels[row_start:row_stop, col_start:col_stop] = first + np.arange(box.size).reshape(box.shape)
+            continue
+
+        total = box.sum()
+        best = None
+        for axis in (0, 1):
+            lines = box.sum(axis=1 - axis)  # Weight of every row (axis 0) or column (axis 1)
+            width = box.shape[1 - axis]
+            # Cut positions i put lines [0, i) on the first side
+            positions = np.arange(1, len(lines))
+            if len(positions) == 0:
+                continue
+            first_nodes = positions * width
+            before = np.cumsum(lines)[positions - 1]
+            after = total - before
+            # Both sides need at least one node per partition
+            low = np.maximum(1, k - (box.size - first_nodes))
+            high = np.minimum(k - 1, first_nodes)
+            weight_share = before / total if total > 0 else first_nodes / box.size
+            candidates = np.stack([
+                np.full(len(positions), k // 2),
+                np.rint(k * first_nodes / box.size),
+                np.rint(k * weight_share),
+            ]).astype(np.int64)
+            k1 = np.clip(candidates, low, high)
+            k2 = k - k1
+            # Each side also decodes the halo line just across the cut
+            first_cost = cost((before + lines[positions]) / k1 + 1)
+            second_cost = cost((after + lines[positions - 1]) / k2 + 1)
+            score = np.maximum(first_cost, second_cost)
+            choice, i = np.unravel_index(int(np.argmin(score)), score.shape)
+            if best is None or score[choice, i] < best[0]:
+                best = (score[choice, i], axis, int(positions[i]), int(k1[choice, i]))
+
+        _, axis, cut, k1 = best
+        k2 = k - k1
+        if axis == 0:
+            boxes.append((row_start, row_start + cut, col_start, col_stop, k1, first))
+            boxes.append((row_start + cut, row_stop, col_start, col_stop, k2, first + k1))
+        else:
+            boxes.append((row_start, row_stop, col_start, col_start + cut, k1, first))
+            boxes.append((row_start, row_stop, col_start + cut, col_stop, k2, first + k1))
+
+    return labels.ravel()
+
+def halo_entries(lattice, labels):
+    """
+    Find the nodes duplicated into neighbouring partitions.
+
+    A node is copied into every partition that owns one of its four neighbours,
+    once per such neighbour, exactly as ``partition_lattice`` appends them.
+
+    Returns:
+        tuple: (partition labels, flat node indices) of every halo entry.
+    """
+    grid = labels.reshape(lattice.rows, lattice.cols)
+    flat = np.arange(lattice.num_nodes, dtype=np.int64).reshape(lattice.rows, lattice.cols)
+    halo_labels = []
+    halo_nodes = []
+    for d_row, d_col in NEIGHBOR_OFFSETS:
+        # Slices of the nodes that have a neighbour in this direction, and of those neighbours
+        src = (slice(max(-d_row, 0), lattice.rows - max(d_row, 0)), slice(max(-d_col, 0), lattice.cols - max(d_col, 0)))
+        dst = (slice(max(d_row, 0), lattice.rows - max(-d_row, 0)), slice(max(d_col, 0), lattice.cols - max(-d_col, 0)))
+        crossing = grid[src] != grid[dst]
+        halo_labels.append(grid[dst][crossing])
+        halo_nodes.append(flat[src][crossing])
+    return np.concatenate(halo_labels), np.concatenate(halo_nodes)
+
+def partition_arrays(lattice, num_partitions, labels=None):
+    """
+    Compute partition membership, halo nodes and node counts with whole-array operations.
+
+    The spatial hash assigns the nodes unless precomputed ``labels`` are given.
+
+    Returns:
+        tuple: (labels, members, node_counts) where ``labels`` is the owning partition of
+        each node, ``members[i]`` is the sorted unique index array of partition ``i``
+        including its halo, and ``node_counts[i]`` is the number of node entries of
+        partition ``i`` counting halo duplicates.
+    """
+    if labels is None:
+        labels = partition_labels(lattice, num_partitions)
+    halo_labels, halo_nodes = halo_entries(lattice, labels)
+
+    all_labels = np.concatenate([labels, halo_labels])
+    all_nodes = np.concatenate([np.arange(lattice.num_nodes, dtype=np.int64), halo_nodes])
+    node_counts = np.bincount(all_labels, minlength=num_partitions)
+
+    # Sort entries by (partition, node) and drop duplicates, then split per partition
+    keys = sorted_unique(all_labels * lattice.num_nodes + all_nodes)
+    key_labels, key_nodes = np.divmod(keys, lattice.num_nodes)
+    bounds = np.searchsorted(key_labels, np.arange(num_partitions + 1))
+    members = [key_nodes[bounds[i]:bounds[i + 1]] for i in range(num_partitions)]
+
+    return labels, members, node_counts
+
+def region_boundary(lattice, index):
+    """
+    Find the boundary nodes of a region with shifted-array operations.
+
+    A boundary node is a node of the region with at least one lattice neighbour outside it.
+    The work is confined to the region's bounding box, padded by one cell.
+
+    Args:
+        lattice (GridLattice): The lattice the region belongs to.
+        index (np.ndarray): Sorted flat indices of the region's nodes.
+
+    Returns:
+        np.ndarray: Sorted flat indices of the boundary nodes.
+    """
+    if len(index) == 0:
+        return np.empty(0, dtype=np.int64)
+    rows, cols = np.divmod(index, lattice.cols)
+    row_min, row_max = int(rows.min()), int(rows.max()) + 1
+    col_min, col_max = int(cols.min()), int(cols.max()) + 1
+
+    mask = np.zeros((row_max - row_min + 2, col_max - col_min + 2), dtype=bool)
+    mask[rows - row_min + 1, cols - col_min + 1] = True
+
+    # Padding cells outside the lattice count as inside, so they never make a node a boundary node
+    if row_min == 0:
+        mask[0, :] = True
+    if row_max == lattice.rows:
+        mask[-1, :] = True
+    if col_min == 0:
+        mask[:, 0] = True
+    if col_max == lattice.cols:
+        mask[:, -1] = True
+
+    interior = mask[:-2, 1:-1] & mask[2:, 1:-1] & mask[1:-1, :-2] & mask[1:-1, 2:]
+    boundary_rows, boundary_cols = np.nonzero(mask[1:-1, 1:-1] & ~interior)
+    return (boundary_rows + row_min) * lattice.cols + (boundary_cols + col_min)
+
+def merged_boundary(lattice, index, boundary1, boundary2):
+    """
+    Update the boundary of the union of two regions from the boundaries of both regions.
+
+    Every boundary node of the union is a boundary node of one of the two regions, so only
+    those candidates are re-checked against the union instead of rescanning all of its nodes.
+
+    Args:
+        lattice (GridLattice): The lattice the regions belong to.
+        index (np.ndarray): Sorted flat indices of the union of both regions.
+        boundary1 (np.ndarray): Sorted boundary node indices of the first region.
+        boundary2 (np.ndarray): Sorted boundary node indices of the second region.
+
+    Returns:
+        np.ndarray: Sorted flat indices of the boundary nodes of the union.
+    """
+    candidates = union_sorted(boundary1, boundary2)
+    if len(candidates) == 0:
+        return candidates
+    rows, cols = np.divmod(candidates, lattice.cols)
+    exposed = np.zeros(len(candidates), dtype=bool)
+    for d_row, d_col in NEIGHBOR_OFFSETS:
+        neighbor_rows = rows + d_row
+        neighbor_cols = cols + d_col
+        valid = (neighbor_rows >= 0) & (neighbor_rows < lattice.rows) & (neighbor_cols >= 0) & (neighbor_cols < lattice.cols)
+        neighbors = neighbor_rows * lattice.cols + neighbor_cols
+        positions = np.minimum(np.searchsorted(index, neighbors), len(index) - 1)
+        exposed |= valid & (index[positions] != neighbors)
+    return candidates[exposed]
+
+def region_overlaps(indices):
+    """
+    Count the nodes shared by every pair of overlapping regions.
+
+    Neighbouring partitions share their halo nodes, so the overlap of two partitions measures
+    the boundary a merge of the two resolves; partitions that do not touch share nothing.
+
+    Args:
+        indices (list): Sorted flat node index arrays of the regions.
+
+    Returns:
+        dict: (i, j) -> number of shared nodes, with i < j, for every pair that shares a node.
+    """
+    labels = np.repeat(np.arange(len(indices)), [len(index) for index in indices])
+    nodes = np.concatenate(indices) if indices else np.empty(0, dtype=np.int64)
+    order = np.argsort(nodes * len(indices) + labels, kind='stable')
+    nodes = nodes[order]
+    labels = labels[order]
+
+    # Entries of the same node are consecutive; pair every entry with each later one of its node
+    overlaps = {}
+    for offset in range(1, len(indices)):
+        same = nodes[offset:] == nodes[:-offset]
+        if not same.any():
+            break
+        keys = labels[:-offset][same] * len(indices) + labels[offset:][same]
+        for key, count in zip(*np.unique(keys, return_counts=True)):
+            pair = tuple(int(i) for i in divmod(key, len(indices)))
+            overlaps[pair] = overlaps.get(pair, 0) + int(count)
+    return overlaps
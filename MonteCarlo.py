@@ -0,0 +1,185 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+import Sweep
+
+# Quantiles reported for every estimator
+QUANTILES = (0.5, 0.9, 0.99)
+
+class OnlineEstimator:
+    """
+    Running mean, variance and quantiles of a stream of samples.
+
+    The mean and variance are updated with Welford's algorithm. Quantile estimates and their
+    distribution-free confidence intervals come from the order statistics of the samples.
+    """
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the running mean
+        self.samples = []
+
+    def update(self, value):
+        value = float(value)
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.samples.append(value)
+
+    @property
+    def std(self):
+        """Sample standard deviation; 0 until there are two samples."""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def half_width(self, z):
+        """Half width of the normal-approximation confidence interval of the mean."""
+        return z * self.std / math.sqrt(self.n) if self.n else float('inf')
+
+    def quantile_interval(self, q, z):
+        """
+        Estimate of quantile ``q`` and its confidence interval.
+
+        The number of samples below the true quantile is Binomial(n, q), so the interval spans
+        the order statistics at ranks n*q -/+ z*sqrt(n*q*(1 - q)).
+
+        Returns:
+            tuple: (estimate, low, high).
+        """
+        ordered = np.sort(self.samples)
+        spread = z * math.sqrt(self.n * q * (1 - q))
+        low = ordered[max(int(math.floor(self.n * q - spread)), 0)]
+        high = ordered[min(int(math.ceil(self.n * q + spread)), self.n - 1)]
+        return float(np.quantile(ordered, q)), float(low), float(high)
+
+    def summary(self, z):
+        summary = {'runs': self.n, 'mean': self.mean, 'std': self.std, 'half_width': self.half_width(z)}
+        for q in QUANTILES:
+            estimate, low, high = self.quantile_interval(q, z)
+            summary[f"p{q * 100:g}"] = estimate
+            summary[f"p{q * 100:g}_interval"] = [low, high]
+        return summary
+
+class PointState:
+    """The estimators of one configuration and whether it has stopped."""
+    def __init__(self, params):
+        self.params = params
+        self.makespan = OnlineEstimator()
+        self.accuracy = OnlineEstimator()
+        self.stopped = False
+
+    def runs_needed(self, z, rel_tol, abs_tol):
+        """Runs at which both confidence intervals are predicted to be tight enough."""
+        makespan_tol = rel_tol * abs(self.makespan.mean)
+        needed = 0.0
+        if self.makespan.std > 0:
+            needed = (z * self.makespan.std / makespan_tol) ** 2 if makespan_tol > 0 else float('inf')
+        if self.accuracy.std > 0:
+            needed = max(needed, (z * self.accuracy.std / abs_tol) ** 2)
+        return needed
+
+    def is_tight(self, z, rel_tol, abs_tol):
+        return (self.makespan.half_width(z) <= rel_tol * abs(self.makespan.mean)
+                and self.accuracy.half_width(z) <= abs_tol)
+
+def run_seed(params, seed, repeat):
+    """Seed of one repeat of a point, derived from the run seed and the point's parameters."""
+    return Sweep.point_seed(params, [seed, repeat])
+
+def next_batch(state, z, rel_tol, abs_tol, min_runs, max_runs):
+    """
+    Number of further runs to schedule for a point: enough to reach ``min_runs``, then the runs
+    its current variance predicts it still needs, at most doubling its runs per round.
+    """
+    n = state.makespan.n
+    if n < min_runs:
+        return min_runs - n
+    needed = state.runs_needed(z, rel_tol, abs_tol)
+    return int(max(1, min(math.ceil(needed) - n, n, max_runs - n)))
+
+def run_adaptive(grid, seed=0, rel_tol=0.05, abs_tol=0.5, confidence=0.95, min_runs=10, max_runs=1000, processes=None,
+                 cache_dir=Sweep.DEFAULT_CACHE_DIR, use_cache=True, verbose=True):
+    """
+    Repeat every point of a parameter grid until its estimates are tight enough.
+
+    Points are run in rounds across a ``Sweep.PointRunner``, each repeat with its own seed. After every
+    round, the makespan (``max_time_taken``) and net accuracy of every repeat are streamed into
+    the point's online estimators. A point stops once the confidence interval of its mean
+    makespan is within ``rel_tol`` of the mean and that of its mean accuracy within ``abs_tol``
+    percentage points, or after ``max_runs`` repeats. Otherwise its next round gets the number
+    of runs its variance predicts it needs, so compute goes to the noisy points. Every repeat is
+    cached like a sweep point.
+
+    Args:
+        grid (list): Parameter dicts, e.g. from ``Sweep.parameter_grid``.
+        seed (int): Run seed; repeats get seeds derived from it and their point's parameters.
+        rel_tol (float): Target half width of the makespan interval relative to its mean.
+        abs_tol (float): Target half width of the accuracy interval, in percentage points.
+        confidence (float): Confidence level of the intervals.
+        min_runs (int): Repeats of every point before it may stop.
+        max_runs (int): Repeats after which a point stops regardless.
+        processes (int, optional): Maximum number of repeats run at once. Defaults to the CPU count.
+        cache_dir (str): Directory holding the cached results.
+        use_cache (bool): Whether to read and write the cache.
+        verbose (bool): Whether to print progress after every round.
+
+    Returns:
+        list: One dict per grid point, in grid order, with the mean ``max_time_taken`` and
+        ``net_accuracy`` (as returned by ``Sweep.run_sweep``), the number of ``runs``, whether it
+        ``converged``, and ``makespan`` and ``accuracy`` summaries with quantiles and intervals.
+    """
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    version = Sweep.code_version()
+    states = [PointState(params) for params in grid]
+
+    with Sweep.PointRunner(processes) as runner:
+        round_index = 0
+        while True:
+            work = []
+            for i, state in enumerate(states):
+                if state.stopped:
+                    continue
+                first = state.makespan.n
+                for repeat in range(first, first + next_batch(state, z, rel_tol, abs_tol, min_runs, max_runs)):
+                    run_seed_value = run_seed(state.params, seed, repeat)
+                    work.append((i, Sweep.point_key(state.params, run_seed_value, version), run_seed_value))
+            if not work:
+                break
+
+            cached = {}
+            missing = []
+            for i, key, run_seed_value in work:
+                result = Sweep.load_cached(cache_dir, key) if use_cache else None
+                if result is not None:
+                    cached[key] = result
+                else:
+                    missing.append((key, states[i].params, run_seed_value))
+            computed = dict(runner.run(missing))
+            if use_cache:
+                for key, params, run_seed_value in missing:
+                    Sweep.store_cached(cache_dir, key, params, run_seed_value, version, computed[key])
+
+            # Stream the round's results into the estimators in repeat order
+            for i, key, _ in work:
+                result = cached[key] if key in cached else computed[key]
+                states[i].makespan.update(result['max_time_taken'])
+                states[i].accuracy.update(result['net_accuracy'])
+            for state in states:
+                if not state.stopped and state.makespan.n >= min_runs:
+                    state.stopped = state.is_tight(z, rel_tol, abs_tol) or state.makespan.n >= max_runs
+
+            round_index += 1
+            if verbose:
+                print(f"Monte Carlo round {round_index}: {len(work)} runs ({len(work) - len(missing)} cached), "
+                      f"{sum(state.stopped for state in states)}/{len(states)} points stopped.")
+
+    return [{
+        'max_time_taken': state.makespan.mean,
+        'net_accuracy': state.accuracy.mean,
+        'runs': state.makespan.n,
+        'converged': state.is_tight(z, rel_tol, abs_tol),
+        'makespan': state.makespan.summary(z),
+        'accuracy': state.accuracy.summary(z),
+    } for state in states]
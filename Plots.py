@@ -0,0 +1,48 @@
+# matplotlib is imported by the functions that draw, so importing this module (and Experiments)
+# costs nothing until the first chart
+
+def plot_series(x, y, xlabel, ylabel, title, yerr=None):
+    """
+    Plot ``y`` against ``x`` as a line with optional error bars and show it.
+
+    Args:
+        x (list): Values on the x axis.
+        y (list): Values on the y axis.
+        xlabel (str): Label of the x axis.
+        ylabel (str): Label of the y axis.
+        title (str): Title of the chart.
+        yerr (list, optional): Half widths of the error bars, e.g. the confidence intervals of
+            ``MonteCarlo.run_adaptive``.
+    """
+    import matplotlib.pyplot as plt
+
+    plt.errorbar(x, y, yerr=yerr, capsize=3)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.show()
+
+def plot_grid_scatter(x, y, values, xlabel, ylabel, title, value_label, cmap='viridis'):
+    """
+    Scatter the points (``x``, ``y``) colored by ``values`` with a colorbar and show it.
+
+    Args:
+        x (list): Values on the x axis.
+        y (list): Values on the y axis.
+        values (list): Value of every point, which sets its color.
+        xlabel (str): Label of the x axis.
+        ylabel (str): Label of the y axis.
+        title (str): Title of the chart.
+        value_label (str): Label of the colorbar.
+        cmap (str): Name of the matplotlib colormap.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    scatter = ax.scatter(x, y, c=values, cmap=cmap)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    cbar = fig.colorbar(scatter)
+    cbar.set_label(value_label)
+    plt.show()
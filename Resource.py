@@ -1,19 +1,30 @@
+import heapq
+import itertools
 from collections import deque
 
+import numpy as np
+
+from Lattice import RegionNodes
+
 class Resource:
-    def __init__(self, id, max_complexity, type):
+    def __init__(self, id, max_complexity, type, decoder=None, cost_model=None):
         self.id = id
         self.max_complexity = max_complexity
         self.type = type
+        self.decoder = decoder  # Optional Decoders backend; processing is measured instead of estimated
+        self.cost_model = cost_model  # Optional calibrated CostModel over task complexity
+        self.reset()
+
+    def reset(self):
+        """Drop all queued and processed tasks so the resource can be reused for another shot."""
         self.load = 0
         self.queue = deque()
         self.processing_time = 0
         self.start_time = None
-        self.tasks =[]
-        self.utilization_time = 0  # New attribute to store the utilization time
+        self.tasks = []
+        self.utilization_time = 0  # Total processing time of the processed tasks
         self.max_time_taken = 0  # New attribute to store the maximum time taken
-        self.processed_tasks = set()  # Add a set to keep track of processed tasks
-        self.processing_times = []  # Store processing times for each task
+        self.num_processed = 0  # Number of queued tasks already processed
 
     def can_handle(self, complexity):
         return complexity <= self.max_complexity
@@ -23,68 +34,157 @@ class Resource:
         self.load += task.complexity
 
     def estimate_processing_time(self, task):
-        if self.type == 'high':
+        if self.cost_model is not None:
+            processing_time = self.cost_model(task.complexity)  # Calibrated on this machine
+        elif self.type == 'high':
             if task.complexity <= self.max_complexity:
                 processing_time = (task.complexity ** 3) * (10 ** -9)  # O(n^3) complexity for high-complexity resources (MWPM)
         else:
             processing_time = (2 * task.complexity) * (10 ** -9)  # O(2n) complexity for low-complexity resources (Union Find)
 
-        self.processing_times.append(processing_time)
         return processing_time
 
-    def process_queue(self):
+    def estimate_processing_times(self, complexities):
+        """``estimate_processing_time`` of an array of task complexities in one vectorized call."""
+        complexities = np.asarray(complexities, dtype=float)
+        if self.cost_model is not None:
+            return self.cost_model(complexities)
+        if self.type == 'high':
+            return (complexities ** 3) * (10 ** -9)
+        return (2 * complexities) * (10 ** -9)
+
+    def measure_processing(self, task):
+        # Decode the partition's real defect set and time it
+        result = self.decoder.decode(task.lattice, task.index, task.defects, task.left_flips)
+        task.logical_error = result.logical_error
+        accuracy = 0 if result.logical_error else 100
+        return result.decode_time, accuracy
+
+    def process_queue(self, batch_size=0, batch_decoder=None):
+        if batch_size and self.type == 'low':
+            return self.process_batches(batch_size, batch_decoder)
         start_time = 0
         processed_tasks = []
-        for task in self.queue:
-            if task not in self.processed_tasks:  # Check if the task has already been processed
+        # Tasks before num_processed were handled by an earlier call
+        for task in itertools.islice(self.queue, self.num_processed, None):
+            if self.decoder is not None and task.defects is not None:
+                processing_time, accuracy = self.measure_processing(task)
+            else:
                 processing_time = self.estimate_processing_time(task)
-                end_time = start_time + processing_time
-                self.tasks.append((start_time, end_time, task))
-                start_time = end_time
                 accuracy = task.accuracy
                 if self.type == 'low':
                     accuracy -= 5  # Reduce accuracy by 5% if processed by a low-complexity resource
-                processed_tasks.append((task, processing_time, accuracy))
-                self.processed_tasks.add(task)  # Mark the task as processed
+            end_time = start_time + processing_time
+            self.tasks.append((start_time, end_time, task))
+            start_time = end_time
+            processed_tasks.append((task, processing_time, accuracy))
+            self.utilization_time += processing_time
 
-        self.utilization_time = sum(self.processing_times)
+        self.num_processed = len(self.queue)
         return processed_tasks
 
+    def batch_processing(self, tasks, batch_size, batch_decoder=None):
+        """
+        Processing times and accuracies of ``tasks`` on this resource, a batch at a time.
+
+        Estimated tasks get their processing times from one ``estimate_processing_times`` call
+        per batch of ``batch_size`` tasks. In measured mode, tasks that ``batch_decoder`` can
+        decode are decoded in padded batches and take their share of the batch's time; larger
+        defect sets are decoded one at a time. The tasks need not be queued on the resource, so
+        the tasks of many shots can share batches. Nothing is recorded on the resource.
+
+        Returns:
+            tuple: (processing_times, accuracies) with one entry per task.
+        """
+        measured = [self.decoder is not None and task.defects is not None for task in tasks]
+        if batch_decoder is not None:
+            batch_decoder.decode_tasks([task for task, is_measured in zip(tasks, measured)
+                                        if is_measured and batch_decoder.can_decode(task)], batch_size)
+
+        processing_times = np.zeros(len(tasks))
+        accuracies = [task.accuracy for task in tasks]
+        estimated = np.flatnonzero(~np.array(measured, dtype=bool))
+        for start in range(0, len(estimated), batch_size):
+            batch = estimated[start:start + batch_size]
+            complexities = np.fromiter((tasks[i].complexity for i in batch), dtype=float, count=len(batch))
+            processing_times[batch] = self.estimate_processing_times(complexities)
+        if self.type == 'low':
+            for i in estimated:
+                accuracies[i] -= 5  # Reduce accuracy by 5% if processed by a low-complexity resource
+        for i in np.flatnonzero(measured):
+            task = tasks[i]
+            if batch_decoder is not None and batch_decoder.can_decode(task):
+                processing_times[i] = task.decode_time
+                accuracies[i] = 0 if task.logical_error else 100
+            else:
+                processing_times[i], accuracies[i] = self.measure_processing(task)
+        return processing_times, accuracies
+
+    def process_batches(self, batch_size, batch_decoder=None):
+        """
+        Process the queue like ``process_queue``, with ``batch_processing``. Tasks keep their
+        queue order on the resource's timeline.
+
+        Returns:
+            list: (task, processing_time, accuracy) tuples, as returned by ``process_queue``.
+        """
+        pending = list(itertools.islice(self.queue, self.num_processed, None))
+        processing_times, accuracies = self.batch_processing(pending, batch_size, batch_decoder)
+        ends = np.cumsum(processing_times)
+        starts = ends - processing_times
+        self.tasks.extend(zip(starts.tolist(), ends.tolist(), pending))
+        self.utilization_time += float(processing_times.sum())
+        self.num_processed = len(self.queue)
+        return list(zip(pending, processing_times.tolist(), accuracies))
+
 def dynamic_load_balancing(partitions, high_complexity_resources, low_complexity_resources):
     # Sort partitions by complexity in descending order
     partitions.sort(key=lambda x: x[1], reverse=True)
 
+    # Index of partition_index -> resource id for every assigned partition
+    assignments = {}
+
     # Assign high-complexity partitions to high-complexity resources
     high_complexity_partitions = [(partition, complexity, partition_index) for partition, complexity, partition_index in partitions
                                   if complexity > low_complexity_resources[0].max_complexity]
-    high_resources = least_loaded(high_complexity_partitions, high_complexity_resources, max_complexity=float('inf'))
+    high_resources = least_loaded(high_complexity_partitions, high_complexity_resources, max_complexity=float('inf'), assignments=assignments)
 
     # Assign remaining partitions to available low-complexity resources
     remaining_partitions = [(partition, complexity, partition_index) for partition, complexity, partition_index in partitions
-                            if (partition, complexity, partition_index) not in [task for resource in high_resources for task in resource.queue]]
-    remaining_resources = least_loaded(remaining_partitions, low_complexity_resources, max_complexity=low_complexity_resources[0].max_complexity)
+                            if partition_index not in assignments]
+    remaining_resources = least_loaded(remaining_partitions, low_complexity_resources, max_complexity=low_complexity_resources[0].max_complexity, assignments=assignments)
 
     # Combine high-complexity and remaining resources
     combined_resources = high_resources + remaining_resources
     return combined_resources
 
-def least_loaded(partitions, resources, max_complexity):
+def least_loaded(partitions, resources, max_complexity, assignments=None):
     # Sort partitions by complexity in ascending order (shortest job first)
     partitions.sort(key=lambda x: x[1])
 
+    # Priority queue keyed by (load, queue length, position); the position keeps ties
+    # resolving to the earliest resource in the list
+    heap = [(r.load, len(r.queue), position, r) for position, r in enumerate(resources)]
+    heapq.heapify(heap)
+
     for partition, complexity, partition_index in partitions:
-        compatible_resources = [r for r in resources if r.can_handle(complexity)]
-        if not compatible_resources:
+        # Pop until the least loaded resource that can handle the partition is found
+        skipped = []
+        while heap and not heap[0][3].can_handle(complexity):
+            skipped.append(heapq.heappop(heap))
+        if not heap:
+            for entry in skipped:
+                heapq.heappush(heap, entry)
             continue  # Skip partitions that cannot be handled by any resource
 
-        # Find the least loaded resource among compatible resources
-        least_loaded = min(compatible_resources, key=lambda r: r.load)
-
-        # If there are multiple least loaded resources, choose the one with the smallest queue
-        if sum(r.load == least_loaded.load for r in compatible_resources) > 1:
-            least_loaded = min(compatible_resources, key=lambda r: (r.load, len(r.queue)))
-
+        _, _, position, least_loaded = heapq.heappop(heap)
         least_loaded.assign_task(Partition(partition, complexity, partition_index))
+        if assignments is not None:
+            assignments[partition_index] = least_loaded.id
+
+        heapq.heappush(heap, (least_loaded.load, len(least_loaded.queue), position, least_loaded))
+        for entry in skipped:
+            heapq.heappush(heap, entry)
 
     return resources
 
@@ -116,11 +216,31 @@ def least_loaded(partitions, resources, max_complexity):
 #     return high_resources, low_resources
 
 class Partition:
+    """
+    A scheduled partition.
+
+    Only the node count and, for LatticeRegion subgraphs, the lattice and the partition's flat
+    node index array are kept, so a task does not hold on to the subgraph it was built from.
+    """
+    __slots__ = ('partition_index', 'num_nodes', 'complexity', 'accuracy', 'lattice', 'index',
+                 'defects', 'left_flips', 'logical_error', 'decode_time')
+
     def __init__(self, subgraph, complexity, partition_index):
-        self.nodes = subgraph.nodes
-        self.complexity = complexity
         self.partition_index = partition_index
+        self.num_nodes = len(subgraph)
+        self.complexity = complexity
         self.accuracy = 100  # Initialize accuracy to 100%
+        self.lattice = getattr(subgraph, 'lattice', None)
+        self.index = getattr(subgraph, 'index', None)  # Sorted flat node indices, a view into the partitioning arrays
+        self.defects = getattr(subgraph, 'defects', None)  # Flat indices of the partition's defects, if sampled
+        self.left_flips = getattr(subgraph, 'left_flips', 0)
+        self.logical_error = None  # Set when a decoder backend processes the partition
+        self.decode_time = None  # Set when a batch decoder decodes the partition
+
+    @property
+    def nodes(self):
+        """Set-like (row, col) view of the partition's nodes, built on demand."""
+        return RegionNodes(self.lattice, self.index)
 
     def __len__(self):
-        return len(self.nodes)
\ No newline at end of file
+        return self.num_nodes
\ No newline at end of file
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import sys
+
+import numpy as np
+
+from Syndrome import summarize_samples
+
+# Fields of a per-task record, in CSV column order
+TASK_RECORD_FIELDS = ['resource', 'resource_type', 'partition', 'nodes', 'complexity', 'start', 'end', 'accuracy']
+
+class RunResult:
+    """
+    Structured result of one ``simulate.main_func`` run.
+
+    Iterating over it yields the legacy (combined_resources, partitions, args, max_time_taken,
+    net_accuracy) tuple, so ``a, b, c, d, e = main_func(args)`` keeps working.
+    """
+    def __init__(self, combined_resources, partitions, args, max_time_taken, net_accuracy,
+                 scheduling_overhead, comb_latency, timeline, task_records, schedule_report=None,
+                 shot_makespans=None, shot_net_accuracies=None, shot_dropped=None):
+        self.combined_resources = combined_resources
+        self.partitions = partitions
+        self.args = args
+        self.max_time_taken = max_time_taken
+        self.net_accuracy = net_accuracy
+        self.scheduling_overhead = scheduling_overhead
+        self.comb_latency = comb_latency
+        self.timeline = timeline
+        self.task_records = task_records  # One dict per processed task, keyed by TASK_RECORD_FIELDS
+        self.schedule_report = schedule_report  # Scheduling.ScheduleReport of the policy used
+        # Per-shot arrays of --shots runs (None for a single shot): makespan, net accuracy and
+        # number of partitions the scheduler left unassigned
+        self.shot_makespans = shot_makespans
+        self.shot_net_accuracies = shot_net_accuracies
+        self.shot_dropped = shot_dropped
+
+    def __iter__(self):
+        return iter((self.combined_resources, self.partitions, self.args, self.max_time_taken, self.net_accuracy))
+
+    def summary(self):
+        summary = {
+            'max_time_taken': self.max_time_taken,
+            'net_accuracy': self.net_accuracy,
+            'scheduling_overhead': self.scheduling_overhead,
+            'comb_latency': self.comb_latency,
+            'num_tasks': len(self.task_records),
+            'scheduler': self.schedule_report.policy if self.schedule_report else None,
+        }
+        if self.shot_makespans is not None:
+            summary['shots'] = {
+                'count': len(self.shot_makespans),
+                'makespan': summarize_samples(self.shot_makespans),
+                'net_accuracy': summarize_samples(self.shot_net_accuracies),
+                'shots_with_drops': int(np.count_nonzero(self.shot_dropped)),
+            }
+        return summary
+
+class StreamResult:
+    """Structured result of a streaming ``simulate.main_func`` run (``--rounds``). Times are in seconds."""
+    def __init__(self, num_rounds, num_windows, round_time, mean_window_time, max_window_time,
+                 mean_latency, max_latency, max_backlog, final_backlog, keeps_up):
+        self.num_rounds = num_rounds
+        self.num_windows = num_windows
+        self.round_time = round_time
+        self.mean_window_time = mean_window_time  # Decode and merge makespan of a window
+        self.max_window_time = max_window_time
+        self.mean_latency = mean_latency  # From a window's last round arriving to its decode finishing
+        self.max_latency = max_latency
+        self.max_backlog = max_backlog  # Longest wait of a ready window for the previous one
+        self.final_backlog = final_backlog
+        self.keeps_up = keeps_up
+
+    def summary(self):
+        return {
+            'num_rounds': self.num_rounds,
+            'num_windows': self.num_windows,
+            'mean_window_time': self.mean_window_time,
+            'max_window_time': self.max_window_time,
+            'mean_latency': self.mean_latency,
+            'max_latency': self.max_latency,
+            'max_backlog': self.max_backlog,
+            'final_backlog': self.final_backlog,
+            'keeps_up': self.keeps_up,
+        }
+
+def format_task_records(records, fmt):
+    """Render task records as one CSV or JSON-lines string."""
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=TASK_RECORD_FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+    else:
+        buffer.writelines(json.dumps(record) + '\n' for record in records)
+    return buffer.getvalue()
+
+def write_task_records(records, path, fmt=None):
+    """
+    Write task records to ``path`` in one buffered write. ``-`` writes to stdout.
+
+    The format is CSV for ``.csv`` paths and JSON lines otherwise, unless ``fmt`` is given.
+    """
+    if fmt is None:
+        fmt = 'csv' if path.endswith('.csv') else 'jsonl'
+    text = format_task_records(records, fmt)
+    if path == '-':
+        sys.stdout.write(text)
+        sys.stdout.flush()
+    else:
+        with open(path, 'w', newline='') as f:
+            f.write(text)
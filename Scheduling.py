@@ -0,0 +1,343 @@
+import bisect
+import heapq
+
+import numpy as np
+
+from Events import merge_tree_makespans
+from Resource import Partition, dynamic_load_balancing
+
+# Accuracy lost by a partition processed on a low-complexity resource, as in Resource.process_queue
+LOW_ACCURACY_PENALTY = 5
+
+class ScheduleReport:
+    """The tradeoff a scheduling policy made: predicted decode makespan against accuracy."""
+    def __init__(self, policy, predicted_makespan, num_partitions, low_tasks, downgraded, dropped, time_limit=float('inf'), notes='',
+                 decode_makespan=None):
+        self.policy = policy
+        self.predicted_makespan = predicted_makespan  # Predicted critical path of decodes and the merges given to the policy
+        # Largest predicted resource finish time, merges excluded
+        self.decode_makespan = predicted_makespan if decode_makespan is None else decode_makespan
+        self.num_partitions = num_partitions
+        self.low_tasks = low_tasks  # Number of partitions on low-complexity resources
+        self.downgraded = downgraded  # Partition indices above thresh_compl placed on low-complexity resources
+        self.dropped = dropped  # Partition indices no resource was assigned
+        self.time_limit = time_limit
+        self.notes = notes
+
+    @property
+    def accuracy_cost(self):
+        """Net accuracy points given up by processing partitions on low-complexity resources."""
+        if self.num_partitions == 0:
+            return 0.0
+        return self.low_tasks * LOW_ACCURACY_PENALTY / self.num_partitions
+
+    @property
+    def meets_time_limit(self):
+        return self.predicted_makespan <= self.time_limit
+
+    def describe(self):
+        if self.predicted_makespan == self.decode_makespan:
+            text = f"Scheduling policy '{self.policy}': predicted decode makespan {self.predicted_makespan:.10f} seconds, "
+        else:
+            text = (f"Scheduling policy '{self.policy}': predicted makespan {self.predicted_makespan:.10f} seconds "
+                    f"(decoding {self.decode_makespan:.10f}, then merges on the critical path), ")
+        text += (f"{self.low_tasks} partitions on low-complexity resources (accuracy cost {self.accuracy_cost:.2f}%)")
+        if self.downgraded:
+            text += f", {len(self.downgraded)} downgraded above the threshold"
+        if self.dropped:
+            text += f", {len(self.dropped)} dropped"
+        if self.time_limit != float('inf'):
+            text += f"; time limit {'met' if self.meets_time_limit else 'missed'}"
+        if self.notes:
+            text += f". {self.notes}"
+        return text + "."
+
+def predicted_finish(resource):
+    """Predicted time for ``resource`` to process everything in its queue."""
+    return sum(resource.estimate_processing_time(task) for task in resource.queue)
+
+def predicted_makespan(resources, merges=(), leaf_partitions=()):
+    """
+    Predicted critical-path makespan of the queued tasks of ``resources`` followed by ``merges``.
+
+    Merge latency does not depend on the schedule, so the merge records can be computed before
+    scheduling. Every task is predicted to finish at the running sum of the estimates of its
+    resource's queue, and the merge tree is evaluated as ``Events.simulate_timeline`` would.
+    Without merges this is the latest predicted resource finish.
+
+    Args:
+        resources (list): Resources with queued tasks.
+        merges (list): (merge_id, left_id, right_id, latency) records of the merge tree.
+        leaf_partitions (list): Partition index of every leaf id used in ``merges``.
+    """
+    if not merges:
+        return max((predicted_finish(resource) for resource in resources), default=0.0)
+    leaf_of = {partition_index: leaf for leaf, partition_index in enumerate(leaf_partitions)}
+    leaf_finish = np.full((1, len(leaf_partitions)), np.nan)
+    for resource in resources:
+        finish = 0.0
+        for task in resource.queue:
+            finish += resource.estimate_processing_time(task)
+            leaf_finish[0, leaf_of[task.partition_index]] = finish
+    return float(merge_tree_makespans(leaf_finish, merges)[0])
+
+def split_by_threshold(partitions, high_complexity_resources, low_complexity_resources):
+    """
+    Split partitions into the high- and low-complexity classes of ``dynamic_load_balancing``.
+
+    If one class has no resources its partitions go to the other class instead of being dropped;
+    high-complexity partitions placed on low-complexity resources are downgraded.
+    """
+    threshold = low_complexity_resources[0].max_complexity if low_complexity_resources else float('inf')
+    high = [partition for partition in partitions if partition[1] > threshold]
+    low = [partition for partition in partitions if partition[1] <= threshold]
+    if not high_complexity_resources:
+        low, high = low + high, []
+    elif not low_complexity_resources:
+        high, low = high + low, []
+    return high, low
+
+def lpt_assign(tasks, resources):
+    """
+    Longest processing time first: every task, longest first, goes to the resource on which it
+    would finish earliest. Tasks are placed regardless of ``can_handle``.
+
+    Returns:
+        list: The predicted finish time of every resource.
+    """
+    finish = [predicted_finish(resource) for resource in resources]
+    if not resources:
+        return finish
+    durations = {}
+    for task in tasks:
+        durations[task] = [resource.estimate_processing_time(task) for resource in resources]
+    for task in sorted(tasks, key=lambda task: max(durations[task]), reverse=True):
+        r = min(range(len(resources)), key=lambda r: (finish[r] + durations[task][r], r))
+        resources[r].assign_task(task)
+        finish[r] += durations[task][r]
+    return finish
+
+def improve_by_local_search(resources, finish, max_moves=1000, max_evaluations=10**6):
+    """
+    Move or swap tasks away from the busiest resource while that lowers its finish time.
+
+    Every step takes the resource with the latest predicted finish and applies the single move
+    of one of its tasks to another resource, or swap with one of that resource's tasks, that
+    most reduces the later finish time of the pair. Within a complexity class a task takes the
+    same time on every resource, so the pair's finish ``max(busiest - d, other + d)`` is lowest
+    when the time ``d`` shifted between them is closest to half their gap. Moves therefore only
+    go to the earliest-finishing resource, and for every task of the busiest resource the swap
+    partners on each other resource are found by bisecting that resource's sorted task times,
+    so a step costs O(T log T) rather than O(T^2 R) for T tasks on R resources. Stops when no
+    move helps, after ``max_moves`` moves, or once ``max_evaluations`` candidate pairs have
+    been evaluated.
+
+    Returns:
+        int: The number of moves made.
+    """
+    if len(resources) < 2:
+        return 0
+    # Task times of every resource in ascending order, with the tasks in the same order
+    times = []
+    tasks = []
+    for resource in resources:
+        ordered = sorted(resource.queue, key=resource.estimate_processing_time)
+        times.append([resource.estimate_processing_time(task) for task in ordered])
+        tasks.append(ordered)
+
+    moves = 0
+    evaluations = 0
+    while moves < max_moves and evaluations < max_evaluations:
+        busiest = max(range(len(resources)), key=lambda r: finish[r])
+        best = None
+
+        def consider(pair, task, other, other_task):
+            nonlocal best
+            if pair < finish[busiest] and (best is None or pair < best[0]):
+                best = (pair, task, other, other_task)
+
+        # Move the task whose time is closest to half the gap to the earliest-finishing resource
+        target = min((r for r in range(len(resources)) if r != busiest), key=lambda r: finish[r])
+        half_gap = (finish[busiest] - finish[target]) / 2
+        position = bisect.bisect_left(times[busiest], half_gap)
+        for i in range(max(position - 1, 0), min(position + 1, len(times[busiest]))):
+            task = tasks[busiest][i]
+            consider(max(finish[busiest] - times[busiest][i], finish[target] + resources[target].estimate_processing_time(task)),
+                     task, target, None)
+            evaluations += 1
+
+        # Swap a task with the shorter task of another resource that shifts closest to half their gap
+        for other in range(len(resources)):
+            if other == busiest or not times[other]:
+                continue
+            half_gap = (finish[busiest] - finish[other]) / 2
+            for task_time, task in zip(times[busiest], tasks[busiest]):
+                position = bisect.bisect_left(times[other], task_time - half_gap)
+                other_time = resources[other].estimate_processing_time(task)
+                for j in range(max(position - 1, 0), min(position + 1, len(times[other]))):
+                    other_task = tasks[other][j]
+                    consider(max(finish[busiest] - task_time + resources[busiest].estimate_processing_time(other_task),
+                                 finish[other] + other_time - times[other][j]),
+                             task, other, other_task)
+                    evaluations += 1
+
+        if best is None:
+            break
+        _, task, other, other_task = best
+        move_task(resources, finish, task, busiest, other, times, tasks)
+        if other_task is not None:
+            move_task(resources, finish, other_task, other, busiest, times, tasks)
+        moves += 1
+    return moves
+
+def move_task(resources, finish, task, source, target, times=None, tasks=None):
+    """Move ``task`` between resources, keeping the sorted ``times``/``tasks`` of local search in step."""
+    resources[source].queue.remove(task)
+    resources[source].load -= task.complexity
+    finish[source] -= resources[source].estimate_processing_time(task)
+    resources[target].assign_task(task)
+    finish[target] += resources[target].estimate_processing_time(task)
+    if times is not None:
+        i = next(i for i, queued in enumerate(tasks[source]) if queued is task)
+        del times[source][i], tasks[source][i]
+        target_time = resources[target].estimate_processing_time(task)
+        i = bisect.bisect_right(times[target], target_time)
+        times[target].insert(i, target_time)
+        tasks[target].insert(i, task)
+
+def report_schedule(policy, partitions, high_complexity_resources, low_complexity_resources, time_limit=float('inf'), notes='',
+                    merges=(), leaf_partitions=()):
+    """
+    Build the ScheduleReport of resources that have been assigned their partitions. With
+    ``merges``, the predicted makespan and whether it meets ``time_limit`` include the merges.
+    """
+    assigned = set()
+    low_tasks = 0
+    downgraded = []
+    threshold = low_complexity_resources[0].max_complexity if low_complexity_resources else float('inf')
+    for resource in high_complexity_resources + low_complexity_resources:
+        for task in resource.queue:
+            assigned.add(task.partition_index)
+            if resource.type == 'low':
+                low_tasks += 1
+                if task.complexity > threshold:
+                    downgraded.append(task.partition_index)
+    dropped = [partition_index for _, _, partition_index in partitions if partition_index not in assigned]
+    resources = high_complexity_resources + low_complexity_resources
+    decode_makespan = max((predicted_finish(resource) for resource in resources), default=0.0)
+    makespan = predicted_makespan(resources, merges, leaf_partitions) if merges else decode_makespan
+    return ScheduleReport(policy, makespan, len(partitions), low_tasks, sorted(downgraded), dropped, time_limit, notes, decode_makespan)
+
+def greedy_schedule(partitions, high_complexity_resources, low_complexity_resources, time_limit=float('inf'), merges=(), leaf_partitions=()):
+    """The original policy: ``dynamic_load_balancing``'s least-loaded assignment per class."""
+    combined_resources = dynamic_load_balancing(partitions, high_complexity_resources, low_complexity_resources)
+    return combined_resources, report_schedule('greedy', partitions, high_complexity_resources, low_complexity_resources, time_limit,
+                                               merges=merges, leaf_partitions=leaf_partitions)
+
+def lpt_schedule(partitions, high_complexity_resources, low_complexity_resources, time_limit=float('inf'), merges=(), leaf_partitions=()):
+    """LPT within each complexity class, on predicted processing times instead of complexity sums."""
+    high, low = split_by_threshold(partitions, high_complexity_resources, low_complexity_resources)
+    lpt_assign([Partition(*partition) for partition in high], high_complexity_resources or low_complexity_resources)
+    lpt_assign([Partition(*partition) for partition in low], low_complexity_resources or high_complexity_resources)
+    return (high_complexity_resources + low_complexity_resources,
+            report_schedule('lpt', partitions, high_complexity_resources, low_complexity_resources, time_limit,
+                            merges=merges, leaf_partitions=leaf_partitions))
+
+def local_search_schedule(partitions, high_complexity_resources, low_complexity_resources, time_limit=float('inf'), merges=(),
+                          leaf_partitions=(), max_moves=1000):
+    """LPT followed by a bounded move/swap local search on the makespan of each complexity class."""
+    lpt_schedule(partitions, high_complexity_resources, low_complexity_resources)
+    total_moves = 0
+    lpt_makespan = max((predicted_finish(r) for r in high_complexity_resources + low_complexity_resources), default=0.0)
+    for resources in (high_complexity_resources, low_complexity_resources):
+        finish = [predicted_finish(resource) for resource in resources]
+        total_moves += improve_by_local_search(resources, finish, max_moves)
+    report = report_schedule('local_search', partitions, high_complexity_resources, low_complexity_resources, time_limit,
+                             merges=merges, leaf_partitions=leaf_partitions)
+    report.notes = f"{total_moves} local search moves from the LPT makespan of {lpt_makespan:.10f} seconds"
+    return high_complexity_resources + low_complexity_resources, report
+
+def deadline_schedule(partitions, high_complexity_resources, low_complexity_resources, time_limit=float('inf'), merges=(),
+                      leaf_partitions=()):
+    """
+    Meet ``time_limit`` with as few downgrades to low-complexity resources as possible.
+
+    Starts from the LPT schedule. While the predicted decode makespan exceeds a decode target
+    and the busiest resource is a high-complexity one, its partition whose move to the
+    earliest-finishing low-complexity resource most lowers the later finish time of the two is
+    downgraded, accepting the accuracy penalty. The target starts at the limit; whenever the
+    decodes fit it but ``predicted_makespan`` with the ``merges`` on the critical path does
+    not, it is lowered by the excess and downgrading resumes. Stops as soon as the limit is met
+    with the merges included, or no downgrade helps.
+    """
+    lpt_schedule(partitions, high_complexity_resources, low_complexity_resources)
+    resources = high_complexity_resources + low_complexity_resources
+    finish = [predicted_finish(resource) for resource in resources]
+    low_positions = range(len(high_complexity_resources), len(resources))
+
+    # Heap of the low-complexity resources by predicted finish time
+    low_heap = [(finish[r], r) for r in low_positions]
+    heapq.heapify(low_heap)
+    target = time_limit
+    while True:
+        while low_heap and max(finish) > target:
+            busiest = max(range(len(resources)), key=lambda r: finish[r])
+            if resources[busiest].type != 'high':
+                break
+            _, low_target = low_heap[0]
+            best = None
+            for task in resources[busiest].queue:
+                pair = max(finish[busiest] - resources[busiest].estimate_processing_time(task),
+                           finish[low_target] + resources[low_target].estimate_processing_time(task))
+                if pair < finish[busiest] and (best is None or pair < best[0]):
+                    best = (pair, task)
+            if best is None:
+                break
+            move_task(resources, finish, best[1], busiest, low_target)
+            heapq.heapreplace(low_heap, (finish[low_target], low_target))
+        if max(finish) > target or time_limit == float('inf'):
+            break
+        makespan = predicted_makespan(resources, merges, leaf_partitions)
+        if makespan <= time_limit:
+            break
+        # The merges after the decodes overrun the limit: aim the decodes lower by the overrun
+        target -= makespan - time_limit
+
+    report = report_schedule('deadline', partitions, high_complexity_resources, low_complexity_resources, time_limit,
+                             merges=merges, leaf_partitions=leaf_partitions)
+    if time_limit == float('inf'):
+        report.notes = "No time limit, so nothing was downgraded"
+    elif not report.meets_time_limit:
+        report.notes = "No further downgrade shortens the critical path enough"
+    return resources, report
+
+SCHEDULERS = {
+    'greedy': greedy_schedule,
+    'lpt': lpt_schedule,
+    'local_search': local_search_schedule,
+    'deadline': deadline_schedule,
+}
+
+def schedule(policy, partitions, high_complexity_resources, low_complexity_resources, time_limit=float('inf'), merges=(),
+             leaf_partitions=None):
+    """
+    Assign partitions to resources with a named policy.
+
+    Args:
+        policy (str): A key of SCHEDULERS.
+        partitions (list): (subgraph, complexity, partition_index) tuples.
+        high_complexity_resources (list): High-complexity resources.
+        low_complexity_resources (list): Low-complexity resources.
+        time_limit (float): Makespan the 'deadline' policy aims for; with ``merges``, including them.
+        merges (list): (merge_id, left_id, right_id, latency) records of the merge tree, so the
+            predicted makespan and the time limit account for merges on the critical path.
+        leaf_partitions (list, optional): Partition index of every leaf id used in ``merges``.
+            Defaults to the order of ``partitions`` before scheduling.
+
+    Returns:
+        tuple: (combined_resources, ScheduleReport).
+    """
+    if leaf_partitions is None:
+        leaf_partitions = [partition_index for _, _, partition_index in partitions]
+    return SCHEDULERS[policy](partitions, high_complexity_resources, low_complexity_resources, time_limit,
+                              merges=merges, leaf_partitions=leaf_partitions)
@@ -0,0 +1,325 @@
+import argparse
+import asyncio
+import collections
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+import simulate
+from Lattice import GridLattice, LatticeRegion, partition_arrays
+from Syndrome import make_rng, sample_defects, summarize_samples
+
+# A request is a header followed by ``num_defects`` defect indices and ``num_left_flips`` row
+# indices of flipped left-boundary edges, all big-endian uint32
+REQUEST_HEADER = struct.Struct('!BQdII')  # kind, frame id, send time, defects, left flips
+RESPONSE_HEADER = struct.Struct('!BQdH')  # kind, frame id, server latency, logical errors
+STATS_HEADER = struct.Struct('!BI')  # kind, JSON length
+FRAME = 0
+STATS = 1
+ERROR = 2  # Response kind of a frame that was rejected or failed to decode
+# Logical error count of a response when the decoder does not decode, i.e. with --decoder estimate
+LOGICAL_ERRORS_UNAVAILABLE = 0xFFFF
+
+# simulate options that only apply to simulate.py runs; the service processes every frame
+# once, sequentially and with its own partitions, so it rejects them rather than ignore them
+UNSUPPORTED_OPTIONS = ['shots', 'quiet', 'gantt', 'records', 'trace', 'merge_mode', 'merge_tree', 'partitioner',
+                       'execution', 'work_stealing', 'batch_size', 'rounds', 'window', 'commit', 'round_time']
+
+LATENCY_QUANTILES = (0.5, 0.99, 0.999)
+
+class ServiceStats:
+    """Throughput counters and a bounded window of end-to-end latencies."""
+    def __init__(self, latency_window=100000, logical_errors=True):
+        self.start = time.perf_counter()
+        self.frames_received = 0
+        self.frames_decoded = 0
+        self.logical_errors = 0 if logical_errors else None  # None when the decoder only estimates times
+        self.bytes_received = 0
+        self.frames_rejected = 0  # Frames with out-of-range defect or row indices
+        self.frames_failed = 0  # Frames whose decoding raised
+        self.backpressure_waits = 0  # Frames that had to wait for room in the pending queue
+        self.max_pending = 0
+        self.latencies = collections.deque(maxlen=latency_window)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        summary = {
+            'frames_received': self.frames_received,
+            'frames_decoded': self.frames_decoded,
+            'frames_rejected': self.frames_rejected,
+            'frames_failed': self.frames_failed,
+            'logical_errors': self.logical_errors,
+            'bytes_received': self.bytes_received,
+            'backpressure_waits': self.backpressure_waits,
+            'max_pending': self.max_pending,
+            'elapsed': elapsed,
+            'throughput': self.frames_decoded / elapsed if elapsed > 0 else 0.0,
+        }
+        if self.latencies:
+            summary['latency'] = summarize_samples(self.latencies, LATENCY_QUANTILES)
+        return summary
+
+class DecodingService:
+    """
+    Decode syndrome frames received over a socket with the simulation's scheduler and resources.
+
+    The lattice is partitioned once. Every frame's defects are attached to the partitions,
+    which ``simulate.schedule_partitions`` assigns to the (reset) resources and
+    ``simulate.process_partitions`` processes in a worker thread, so the event loop keeps
+    accepting frames meanwhile. Frames wait in a queue of at most ``max_pending`` entries; when
+    it is full, connections stop being read until there is room, which pushes back on senders
+    through the socket. Only ``--decoder measured`` decodes the frames; with estimated decoding
+    the logical error count of a response is LOGICAL_ERRORS_UNAVAILABLE and the stats report
+    it as None. Frames with out-of-range indices, or frames whose decoding raises, are
+    answered with an ERROR response; a header announcing more defects or flips than the
+    lattice has closes the connection, since its body cannot be trusted.
+    """
+    def __init__(self, args, max_pending=64):
+        self.args = args
+        self.lattice = GridLattice(args.size[0], args.size[1])
+        _, members, _ = partition_arrays(self.lattice, args.partitions)
+        self.partitions = [(LatticeRegion(self.lattice, index), 1, i) for i, index in enumerate(members)]
+        self.high_complexity_resources, self.low_complexity_resources = simulate.create_resources(args)
+        self.pending = asyncio.Queue(maxsize=max_pending)
+        self.stats = ServiceStats(logical_errors=args.decoder == 'measured')
+
+    def decode_frame(self, defects, left_flip_rows):
+        """
+        Schedule and process one frame.
+
+        Returns:
+            int: The number of partitions with a logical error, or None with estimated decoding.
+        """
+        left_flips = np.zeros(self.lattice.rows, dtype=bool)
+        left_flips[left_flip_rows] = True
+        partitions = simulate.sample_partition_defects(self.partitions, syndrome=(defects, left_flips))
+        for resource in self.high_complexity_resources + self.low_complexity_resources:
+            resource.reset()
+        combined_resources, _, _ = simulate.schedule_partitions(partitions, self.high_complexity_resources, self.low_complexity_resources,
+                                                                self.args.scheduler, self.args.time_limit)
+        simulate.process_partitions(combined_resources, verbose=False)
+        if self.args.decoder != 'measured':
+            return None
+        return sum(1 for resource in combined_resources for _, _, task in resource.tasks if task.logical_error)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(REQUEST_HEADER.size)
+                kind, frame_id, _, num_defects, num_left_flips = REQUEST_HEADER.unpack(header)
+                if kind == STATS:
+                    payload = json.dumps(self.stats.summary()).encode()
+                    writer.write(STATS_HEADER.pack(STATS, len(payload)) + payload)
+                    await writer.drain()
+                    continue
+
+                if kind != FRAME or num_defects > self.lattice.num_nodes or num_left_flips > self.lattice.rows:
+                    print(f"Closing connection after invalid frame {frame_id}: kind {kind}, {num_defects} defects, "
+                          f"{num_left_flips} left flips on a {self.lattice.rows}x{self.lattice.cols} lattice")
+                    break
+                body = await reader.readexactly(4 * (num_defects + num_left_flips))
+                received = time.perf_counter()
+                values = np.frombuffer(body, dtype='>u4').astype(np.int64)
+                self.stats.frames_received += 1
+                self.stats.bytes_received += len(header) + len(body)
+                if (values[:num_defects] >= self.lattice.num_nodes).any() or (values[num_defects:] >= self.lattice.rows).any():
+                    self.stats.frames_rejected += 1
+                    writer.write(RESPONSE_HEADER.pack(ERROR, frame_id, time.perf_counter() - received, 0))
+                    continue
+                if self.pending.full():
+                    self.stats.backpressure_waits += 1
+                await self.pending.put((frame_id, received, values[:num_defects], values[num_defects:], writer))
+                self.stats.max_pending = max(self.stats.max_pending, self.pending.qsize())
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self):
+        """Decode pending frames in arrival order and answer each with its latency."""
+        loop = asyncio.get_running_loop()
+        while True:
+            frame_id, received, defects, left_flip_rows, writer = await self.pending.get()
+            try:
+                logical_errors = await loop.run_in_executor(None, self.decode_frame, defects, left_flip_rows)
+                kind = FRAME
+                self.stats.frames_decoded += 1
+                if logical_errors is None:
+                    logical_errors = LOGICAL_ERRORS_UNAVAILABLE
+                else:
+                    self.stats.logical_errors += logical_errors
+            except Exception as error:
+                # One bad frame must not stop the dispatcher
+                print(f"Decoding frame {frame_id} failed: {error!r}")
+                logical_errors = 0
+                kind = ERROR
+                self.stats.frames_failed += 1
+            latency = time.perf_counter() - received
+            if kind == FRAME:
+                self.stats.latencies.append(latency)
+            if not writer.is_closing():
+                writer.write(RESPONSE_HEADER.pack(kind, frame_id, latency, logical_errors))
+            self.pending.task_done()
+
+    async def start(self, host='127.0.0.1', port=0, unix_path=None):
+        """Start listening and dispatching. Returns the asyncio server."""
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        self.dispatcher = asyncio.create_task(self.dispatch())
+        return server
+
+async def open_service_connection(host='127.0.0.1', port=None, unix_path=None):
+    if unix_path is not None:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+def encode_frame(frame_id, defects, left_flip_rows):
+    header = REQUEST_HEADER.pack(FRAME, frame_id, time.perf_counter(), len(defects), len(left_flip_rows))
+    return header + np.concatenate([defects, left_flip_rows]).astype('>u4').tobytes()
+
+async def request_stats(reader, writer):
+    writer.write(REQUEST_HEADER.pack(STATS, 0, time.perf_counter(), 0, 0))
+    await writer.drain()
+    _, length = STATS_HEADER.unpack(await reader.readexactly(STATS_HEADER.size))
+    return json.loads(await reader.readexactly(length))
+
+async def run_load_generator(shape, rate, num_frames, error_rate, seed=None, host='127.0.0.1', port=None, unix_path=None,
+                             syndromes=None):
+    """
+    Replay syndrome frames to a service at ``rate`` frames per second.
+
+    Frames are sampled with ``sample_defects`` on a lattice of ``shape``, or replayed in order
+    (wrapping around) from a ``syndromes`` SyndromeReader, and sent on a fixed schedule;
+    sending blocks whenever the service applies backpressure. The end-to-end latency of every
+    frame is measured from its scheduled send time to its response.
+
+    Returns:
+        dict: Offered and achieved rates, client-side latency quantiles and the service's stats.
+    """
+    lattice = GridLattice(*shape)
+    rng = make_rng(seed)
+    reader, writer = await open_service_connection(host, port, unix_path)
+    scheduled = {}
+    latencies = []
+
+    async def receive():
+        for _ in range(num_frames):
+            kind, frame_id, _, _ = RESPONSE_HEADER.unpack(await reader.readexactly(RESPONSE_HEADER.size))
+            latencies.append(time.perf_counter() - scheduled.pop(frame_id))
+
+    receiver = asyncio.create_task(receive())
+    start = time.perf_counter()
+    for frame_id in range(num_frames):
+        send_at = start + frame_id / rate
+        delay = send_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if syndromes is not None:
+            defects, left_flips = syndromes[frame_id % len(syndromes)]
+        else:
+            defects, left_flips = sample_defects(lattice, error_rate, rng)
+        scheduled[frame_id] = send_at
+        writer.write(encode_frame(frame_id, defects, np.flatnonzero(left_flips)))
+        await writer.drain()
+    await receiver
+    elapsed = time.perf_counter() - start
+
+    service_stats = await request_stats(reader, writer)
+    writer.close()
+    await writer.wait_closed()
+    return {
+        'offered_rate': rate,
+        'achieved_rate': num_frames / elapsed,
+        'latency': summarize_samples(latencies, LATENCY_QUANTILES),
+        'service': service_stats,
+    }
+
+def print_report(report):
+    print(f"Offered {report['offered_rate']:.1f} frames/s, achieved {report['achieved_rate']:.1f} frames/s.")
+    for name, value in report['latency'].items():
+        print(f"  client latency {name}: {value * 1e3:.3f} ms")
+    service = report['service']
+    print(f"Service decoded {service['frames_decoded']} frames at {service['throughput']:.1f} frames/s "
+          f"({service['frames_rejected']} rejected, {service['frames_failed']} failed), "
+          f"{service['backpressure_waits']} backpressure waits, max {service['max_pending']} pending.")
+    if service['logical_errors'] is None:
+        print("  logical errors: unavailable with --decoder estimate")
+    else:
+        print(f"  logical errors: {service['logical_errors']}")
+    for name, value in service.get('latency', {}).items():
+        print(f"  service latency {name}: {value * 1e3:.3f} ms")
+
+async def serve(args, sim_args):
+    service = DecodingService(sim_args, args.max_pending)
+    server = await service.start(args.host, args.port, args.unix)
+    print(f"Decoding service listening on {args.unix or '%s:%d' % server.sockets[0].getsockname()[:2]}")
+    async with server:
+        while True:
+            await asyncio.sleep(args.stats_interval)
+            print(json.dumps(service.stats.summary()))
+
+async def bench(args, sim_args, syndromes=None):
+    """Run the service and the load generator in one event loop."""
+    service = DecodingService(sim_args, args.max_pending)
+    server = await service.start(args.host, 0, args.unix)
+    port = None if args.unix else server.sockets[0].getsockname()[1]
+    async with server:
+        report = await run_load_generator(sim_args.size, args.rate, args.frames, sim_args.error_rate, sim_args.seed,
+                                          args.host, port, args.unix, syndromes)
+        # Let the connection handler see the generator hang up
+        await asyncio.sleep(0.01)
+    service.dispatcher.cancel()
+    return report
+
+def parse_arguments(args_list=None):
+    """
+    Parse the service options. Any remaining options are ``simulate`` options that configure
+    the lattice, partitions, resources and scheduler, e.g. ``--size 50 50 --scheduler lpt``;
+    the simulate options in UNSUPPORTED_OPTIONS are rejected.
+    """
+    parser = argparse.ArgumentParser(description="Real-time decoding service and load generator.")
+    parser.add_argument("command", choices=['serve', 'loadgen', 'bench'],
+                        help="Run the service, replay frames to a running service, or run both in one process")
+    parser.add_argument("--host", default='127.0.0.1', help="TCP host to listen on or connect to")
+    parser.add_argument("--port", type=int, default=7070, help="TCP port to listen on or connect to")
+    parser.add_argument("--unix", default=None, help="Unix socket path to use instead of TCP")
+    parser.add_argument("--max_pending", type=int, default=64, help="Frames queued before the service applies backpressure")
+    parser.add_argument("--stats_interval", type=float, default=5.0, help="Seconds between stats lines of the service")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Frames per second sent by the load generator")
+    parser.add_argument("--frames", type=int, default=1000, help="Frames sent by the load generator")
+    args, sim_args_list = parser.parse_known_args(args_list)
+    sim_args = simulate.parse_arguments(sim_args_list)
+    defaults = simulate.parse_arguments([])
+    for name in UNSUPPORTED_OPTIONS:
+        if getattr(sim_args, name) != getattr(defaults, name):
+            parser.error(f"--{name} is a simulate.py option that the service does not support")
+    return args, sim_args
+
+def main(args_list=None):
+    args, sim_args = parse_arguments(args_list)
+    # A --syndromes file sets the lattice size, and the load generator replays its shots
+    syndromes = simulate.open_syndromes(sim_args, verbose=False)
+    if args.command == 'serve':
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+        try:
+            asyncio.run(serve(args, sim_args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.command == 'loadgen':
+        report = asyncio.run(run_load_generator(sim_args.size, args.rate, args.frames, sim_args.error_rate, sim_args.seed,
+                                                args.host, args.port, args.unix, syndromes))
+    else:
+        report = asyncio.run(bench(args, sim_args, syndromes))
+    print_report(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+from collections import deque
+
+import numpy as np
+
+from Lattice import LatticeRegion, partition_arrays
+from Syndrome import DEFAULT_ERROR_RATE, make_rng, sample_defects
+
+def sample_rounds(lattice, num_rounds, error_rate=DEFAULT_ERROR_RATE, rng=None):
+    """
+    Generate the detection events of a stream of syndrome rounds, one round at a time.
+
+    Every round adds fresh edge errors as in ``sample_defects`` and every syndrome measurement
+    is wrong with probability ``error_rate``. A node has a detection event when its measured
+    syndrome differs from the previous round's, so a measurement error shows up in two
+    consecutive rounds.
+
+    Args:
+        lattice (GridLattice): The 2D lattice measured every round.
+        num_rounds (int): Number of rounds to generate.
+        error_rate (float): Physical and measurement error rate.
+        rng (np.random.Generator or int, optional): Generator or seed to draw from.
+
+    Yields:
+        np.ndarray: A boolean mask over the lattice's flat node indices for every round.
+    """
+    rng = make_rng(rng)
+    previous_flips = np.zeros(lattice.num_nodes, dtype=bool)
+    for _ in range(num_rounds):
+        events = np.zeros(lattice.num_nodes, dtype=bool)
+        defects, _ = sample_defects(lattice, error_rate, rng)
+        events[defects] = True
+        measurement_flips = rng.random(lattice.num_nodes) < error_rate
+        events ^= measurement_flips ^ previous_flips
+        previous_flips = measurement_flips
+        yield events
+
+def time_windows(rounds, window, commit):
+    """
+    Group a stream of rounds into overlapping time windows.
+
+    Each window holds ``window`` rounds and commits its first ``commit`` of them; the remaining
+    rounds are duplicated into the next window, the time analogue of the halo nodes that
+    ``partition_lattice`` duplicates into neighbouring partitions. At most ``window`` rounds are
+    held at once. When the stream ends, the uncommitted rounds form a final, shorter window.
+
+    Args:
+        rounds (iterable): Per-round detection event masks, e.g. from ``sample_rounds``.
+        window (int): Rounds per window.
+        commit (int): Rounds committed per window, between 1 and ``window``.
+
+    Yields:
+        tuple: (first_round, num_committed, events) where ``events`` is a rounds x nodes array.
+    """
+    buffer = deque()
+    first_round = 0
+    for events in rounds:
+        buffer.append(events)
+        if len(buffer) == window:
+            yield first_round, commit, np.stack(buffer)
+            for _ in range(commit):
+                buffer.popleft()
+            first_round += commit
+    if buffer:
+        yield first_round, len(buffer), np.stack(buffer)
+
+def window_partitions(windows, lattice, num_partitions):
+    """
+    Partition every time window of a space-time lattice.
+
+    A window covers rows x cols x rounds nodes and is split spatially with the same spatial hash
+    and halo as ``partition_lattice``, so partition ``i`` of a window is partition ``i`` of the
+    2D lattice extended over the window's rounds. Its complexity is its number of detection
+    events in the window plus one. Only the 2D partitions are built; the 3D window is never
+    materialized as a graph.
+
+    Args:
+        windows (iterable): (first_round, num_committed, events) tuples from ``time_windows``.
+        lattice (GridLattice): The 2D lattice measured every round.
+        num_partitions (int): Number of spatial partitions.
+
+    Yields:
+        tuple: (first_round, num_committed, num_rounds, partitions) where ``partitions`` holds
+        (subgraph, complexity, partition_index) tuples as returned by ``partition_lattice``.
+    """
+    _, members, _ = partition_arrays(lattice, num_partitions)
+    regions = [LatticeRegion(lattice, index) for index in members]
+    member_nodes = np.concatenate(members)
+    member_labels = np.repeat(np.arange(num_partitions), [len(index) for index in members])
+
+    for first_round, num_committed, events in windows:
+        node_events = events.sum(axis=0)
+        counts = np.bincount(member_labels, weights=node_events[member_nodes], minlength=num_partitions)
+        partitions = [(regions[i], int(counts[i]) + 1, i) for i in range(num_partitions)]
+        yield first_round, num_committed, len(events), partitions
@@ -0,0 +1,209 @@
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+
+import simulate
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sweep_cache')
+
+# Modules whose source determines the result of a sweep point
+SIMULATION_MODULES = ['simulate.py', 'Resource.py', 'Lattice.py', 'Syndrome.py', 'Events.py', 'Decoders.py', 'CostModel.py', 'Stream.py', 'Scheduling.py', 'Workers.py', 'SyndromeFile.py']
+
+def code_version():
+    """Hash of the simulation source, so cached results are invalidated when the code changes."""
+    digest = hashlib.sha256()
+    root = os.path.dirname(os.path.abspath(__file__))
+    for name in SIMULATION_MODULES:
+        with open(os.path.join(root, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def parameter_grid(**axes):
+    """
+    Expand keyword axes into a list of parameter dicts (the cartesian product).
+
+    Example:
+        parameter_grid(size=[[50, 50], [100, 100]], partitions=[4, 8])
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+
+def to_arguments(params):
+    """Turn a parameter dict into a ``simulate.parse_arguments`` argument list."""
+    args_list = []
+    for name, value in params.items():
+        args_list.append(f"--{name}")
+        if isinstance(value, (list, tuple)):
+            args_list.extend(str(v) for v in value)
+        else:
+            args_list.append(str(value))
+    return args_list
+
+# Options that start processes of their own, which the daemonic workers of a sweep cannot do
+PARENT_OPTIONS = {'merge_mode': 'parallel', 'execution': 'concurrent'}
+
+def runs_in_parent(params):
+    """Whether a point needs child processes, so it has to run in the sweep's own process."""
+    return any(params.get(name) == value for name, value in PARENT_OPTIONS.items())
+
+# Options whose value is a file the result depends on, so its content is part of the cache key
+FILE_OPTIONS = ['cost_profile', 'syndromes']
+
+# Content hashes of the files seen by this process, keyed by (path, size, modification time)
+_file_hashes = {}
+
+def file_hash(path):
+    """Hash of the content of ``path``, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    cache_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if cache_key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _file_hashes[cache_key] = digest.hexdigest()
+    return _file_hashes[cache_key]
+
+def option_files(params):
+    """
+    Paths of the file-valued options of a point, given as keys of ``params`` or inside a
+    ``simulate`` argument list value (as the tuner passes them).
+    """
+    paths = [params[name] for name in FILE_OPTIONS if params.get(name) is not None]
+    for value in params.values():
+        if isinstance(value, (list, tuple)):
+            for flag, path in zip(value, value[1:]):
+                if flag in [f"--{name}" for name in FILE_OPTIONS]:
+                    paths.append(path)
+    return paths
+
+def point_key(params, seed, version):
+    """
+    Cache key of a point: its parameters, seed and the code version, plus the content of the
+    files its options point to, so recalibrating a cost profile or re-recording syndromes at
+    the same path does not return stale results.
+    """
+    files = {path: file_hash(path) for path in option_files(params)}
+    payload = json.dumps({'params': params, 'seed': seed, 'version': version, 'files': files}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def point_seed(params, seed):
+    """Derive a reproducible per-point seed from the sweep seed and the point's parameters."""
+    payload = json.dumps({'params': params, 'seed': seed}, sort_keys=True)
+    return int(hashlib.sha256(payload.encode()).hexdigest()[:8], 16)
+
+def run_point(params, seed, merge_pool=None):
+    """Run ``simulate.main_func`` headless for one point, merging on ``merge_pool`` if given."""
+    args = simulate.parse_arguments(to_arguments(params) + ['--seed', str(seed), '--quiet'])
+    result = simulate.main_func(args, merge_pool)
+    return {'max_time_taken': result.max_time_taken, 'net_accuracy': result.net_accuracy}
+
+def _run_point_star(item):
+    key, params, seed = item
+    return key, run_point(params, seed)
+
+class PointRunner:
+    """
+    Run sweep points across a process pool that is reused by every ``run`` call.
+
+    Points that start processes of their own (``PARENT_OPTIONS``) cannot run in the pool's
+    daemonic workers. They run in this process after the pooled points of the same call, so
+    ``--execution concurrent`` timings do not compete with the pool, and all
+    ``--merge_mode parallel`` points share one persistent MergePool. Both pools are started
+    when first needed.
+    """
+    def __init__(self, processes=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.pool = None
+        self.merge_pool = None
+
+    def run(self, work):
+        """
+        Run (key, params, seed) work items.
+
+        Yields:
+            tuple: (key, result) of every item, pooled items first in completion order.
+        """
+        pooled = [item for item in work if not runs_in_parent(item[1])]
+        if pooled:
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(self.processes)
+            yield from self.pool.imap_unordered(_run_point_star, pooled)
+        for key, params, seed in work:
+            if runs_in_parent(params):
+                if self.merge_pool is None and params.get('merge_mode') == 'parallel':
+                    self.merge_pool = simulate.MergePool()
+                yield key, run_point(params, seed, self.merge_pool)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+        if self.merge_pool is not None:
+            self.merge_pool.close()
+
+def load_cached(cache_dir, key):
+    path = os.path.join(cache_dir, f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)['result']
+
+def store_cached(cache_dir, key, params, seed, version, result):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'params': params, 'seed': seed, 'version': version, 'result': result}, f)
+    os.replace(tmp_path, path)
+
+def run_sweep(grid, seed=0, processes=None, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    """
+    Run every point of a parameter grid across a process pool, reusing cached results.
+
+    Results are cached on disk keyed by the point's parameters, its seed and the code version,
+    so re-plotting or extending a sweep only computes the missing points. Points with options
+    that start processes of their own run in this process (see ``PointRunner``).
+
+    Args:
+        grid (list): Parameter dicts, e.g. from ``parameter_grid``. Keys are ``simulate`` option names.
+        seed (int): Sweep seed; every point gets a seed derived from it and its parameters.
+        processes (int, optional): Maximum number of points run at once. Defaults to the CPU count.
+        cache_dir (str): Directory holding the cached results.
+        use_cache (bool): Whether to read and write the cache.
+
+    Returns:
+        list: One result dict per grid point, in grid order.
+    """
+    version = code_version()
+    results = [None] * len(grid)
+    missing = {}
+    for i, params in enumerate(grid):
+        params_seed = point_seed(params, seed)
+        key = point_key(params, params_seed, version)
+        cached = load_cached(cache_dir, key) if use_cache else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            missing.setdefault(key, (params, params_seed, []))[2].append(i)
+
+    print(f"Sweep: {len(grid) - sum(len(positions) for _, _, positions in missing.values())} cached, {len(missing)} to run.")
+    if missing:
+        work = [(key, params, params_seed) for key, (params, params_seed, _) in missing.items()]
+        processes = min(processes or os.cpu_count() or 1, len(work))
+        with PointRunner(processes) as runner:
+            for key, result in runner.run(work):
+                params, params_seed, positions = missing[key]
+                if use_cache:
+                    store_cached(cache_dir, key, params, params_seed, version, result)
+                for i in positions:
+                    results[i] = result
+
+    return results
@@ -0,0 +1,80 @@
+import numpy as np
+
+DEFAULT_ERROR_RATE = 0.001
+
+def make_rng(seed=None):
+    """Return a NumPy Generator, passing existing generators through unchanged."""
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+def sample_error_counts(node_counts, num_shots=1, error_rate=DEFAULT_ERROR_RATE, rng=None):
+    """
+    Sample the number of activated nodes of every partition for many shots at once.
+
+    Each node flips independently with probability ``error_rate``, so the number of
+    activated nodes of a partition with ``n`` nodes is Binomial(n, error_rate).
+
+    Args:
+        node_counts (array-like): Number of nodes in each partition.
+        num_shots (int): Number of independent shots to draw.
+        error_rate (float): Physical error rate per node.
+        rng (np.random.Generator or int, optional): Generator or seed to draw from.
+
+    Returns:
+        np.ndarray: An integer matrix of shape (num_shots, num_partitions).
+    """
+    node_counts = np.asarray(node_counts, dtype=np.int64)
+    rng = make_rng(rng)
+    return rng.binomial(node_counts, error_rate, size=(num_shots, len(node_counts)))
+
+def sample_complexities(node_counts, num_shots=1, error_rate=DEFAULT_ERROR_RATE, rng=None):
+    """
+    Sample a complexity matrix of shots x partitions.
+
+    The complexity of a partition is its number of activated nodes plus one, as in
+    ``simulate.partition_lattice``.
+    """
+    return sample_error_counts(node_counts, num_shots, error_rate, rng) + 1
+
+def summarize_samples(values, quantiles=(0.5, 0.9, 0.99)):
+    """Return the mean, standard deviation and the requested quantiles of a sample."""
+    values = np.asarray(values, dtype=float)
+    summary = {'mean': float(values.mean()), 'std': float(values.std())}
+    for q, value in zip(quantiles, np.quantile(values, quantiles)):
+        summary[f"p{q * 100:g}"] = float(value)
+    return summary
+
+def sample_defects(lattice, error_rate=DEFAULT_ERROR_RATE, rng=None):
+    """
+    Sample one shot of edge errors on a planar code and return its syndrome.
+
+    Every lattice edge flips with probability ``error_rate``. The left and right columns also
+    have an edge to a virtual boundary node, which flips with the same probability. A node is a
+    defect when an odd number of its edges flipped.
+
+    Args:
+        lattice (GridLattice): The lattice to sample on.
+        error_rate (float): Physical error rate per edge.
+        rng (np.random.Generator or int, optional): Generator or seed to draw from.
+
+    Returns:
+        tuple: (defects, left_flips) where ``defects`` is the sorted flat index array of defect
+        nodes and ``left_flips`` marks, per row, whether the edge to the left boundary flipped.
+    """
+    rng = make_rng(rng)
+    rows, cols = lattice.shape
+    horizontal = rng.random((rows, cols - 1)) < error_rate
+    vertical = rng.random((rows - 1, cols)) < error_rate
+    left_flips = rng.random(rows) < error_rate
+    right_flips = rng.random(rows) < error_rate
+
+    parity = np.zeros((rows, cols), dtype=bool)
+    parity[:, :-1] ^= horizontal
+    parity[:, 1:] ^= horizontal
+    parity[:-1, :] ^= vertical
+    parity[1:, :] ^= vertical
+    parity[:, 0] ^= left_flips
+    parity[:, -1] ^= right_flips
+
+    return np.flatnonzero(parity), left_flips
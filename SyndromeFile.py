@@ -0,0 +1,160 @@
+import argparse
+import struct
+import sys
+
+import numpy as np
+
+from Lattice import GridLattice
+from Syndrome import DEFAULT_ERROR_RATE, make_rng, sample_defects
+
+# File layout: a fixed header, then one fixed-size record per shot. A record is the bit-packed
+# defect mask of the lattice (row-major, ceil(rows * cols / 8) bytes) followed by the bit-packed
+# left-boundary flips of every row (ceil(rows / 8) bytes).
+MAGIC = b'QECSYND\x00'
+VERSION = 1
+HEADER = struct.Struct('<8sHIIQdI')  # magic, version, rows, cols, shots, error rate, record bytes
+
+def record_layout(rows, cols):
+    """Return the (defect mask, left flips) byte counts of one shot record."""
+    return (rows * cols + 7) // 8, (rows + 7) // 8
+
+class SyndromeWriter:
+    """
+    Append syndrome shots to a dataset file.
+
+    Use as a context manager, or call ``close`` to write the final shot count into the header.
+    """
+    def __init__(self, path, shape, error_rate=DEFAULT_ERROR_RATE):
+        self.path = path
+        self.rows, self.cols = int(shape[0]), int(shape[1])
+        self.error_rate = float(error_rate)
+        self.mask_bytes, self.flip_bytes = record_layout(self.rows, self.cols)
+        self.num_shots = 0
+        self.file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.rows, self.cols, self.num_shots, self.error_rate,
+                                    self.mask_bytes + self.flip_bytes))
+
+    def write(self, defects, left_flips):
+        """Append one shot given its defect flat indices and its per-row left-boundary flips."""
+        mask = np.zeros(self.rows * self.cols, dtype=bool)
+        mask[defects] = True
+        self.write_masks(mask[None, :], np.asarray(left_flips, dtype=bool)[None, :])
+
+    def write_masks(self, masks, left_flips):
+        """Append a batch of shots given as (shots, rows * cols) and (shots, rows) boolean arrays."""
+        records = np.concatenate([np.packbits(masks, axis=1), np.packbits(left_flips, axis=1)], axis=1)
+        self.file.write(records.tobytes())
+        self.num_shots += len(records)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._write_header()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class SyndromeReader:
+    """
+    Read syndrome shots from a dataset file through a memory map.
+
+    Only the records that are accessed are paged in, so shots can be streamed from files larger
+    than memory. Indexing returns the (defects, left_flips) pair of ``Syndrome.sample_defects``.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is not a syndrome dataset")
+        magic, version, rows, cols, num_shots, error_rate, record_bytes = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a syndrome dataset")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported syndrome dataset version {version}")
+        self.shape = (rows, cols)
+        self.num_nodes = rows * cols
+        self.error_rate = error_rate
+        self.mask_bytes, self.flip_bytes = record_layout(rows, cols)
+        if record_bytes != self.mask_bytes + self.flip_bytes:
+            raise ValueError(f"{path} has a corrupt header")
+        self.records = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER.size, shape=(num_shots, record_bytes))
+
+    def __len__(self):
+        return len(self.records)
+
+    def defect_masks(self, start, stop):
+        """Boolean defect masks of shots [start, stop), shape (shots, rows * cols)."""
+        return np.unpackbits(self.records[start:stop, :self.mask_bytes], axis=1, count=self.num_nodes).astype(bool)
+
+    def left_flips(self, start, stop):
+        """Boolean left-boundary flips of shots [start, stop), shape (shots, rows)."""
+        return np.unpackbits(self.records[start:stop, self.mask_bytes:], axis=1, count=self.shape[0]).astype(bool)
+
+    def __getitem__(self, shot):
+        if not -len(self) <= shot < len(self):
+            raise IndexError(shot)
+        shot %= len(self)
+        return np.flatnonzero(self.defect_masks(shot, shot + 1)[0]), self.left_flips(shot, shot + 1)[0]
+
+    def iter_chunks(self, chunk_size=1024):
+        """Yield (defect masks, left flips) arrays of up to ``chunk_size`` shots at a time."""
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            yield self.defect_masks(start, stop), self.left_flips(start, stop)
+
+    def __iter__(self):
+        for masks, flips in self.iter_chunks():
+            for mask, left_flips in zip(masks, flips):
+                yield np.flatnonzero(mask), left_flips
+
+def record_syndromes(path, shape, num_shots, error_rate=DEFAULT_ERROR_RATE, seed=None):
+    """Sample ``num_shots`` shots with ``sample_defects`` and write them to a dataset file."""
+    lattice = GridLattice(*shape)
+    rng = make_rng(seed)
+    with SyndromeWriter(path, shape, error_rate) as writer:
+        for _ in range(num_shots):
+            defects, left_flips = sample_defects(lattice, error_rate, rng)
+            writer.write(defects, left_flips)
+    return path
+
+def parse_arguments(args_list=None):
+    parser = argparse.ArgumentParser(description="Record or inspect syndrome datasets for simulate.py --syndromes.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help="Sample shots and write them to a dataset file")
+    record_parser.add_argument("--size", type=int, nargs=2, default=[5, 5], help="Size of the lattice grid (rows, cols)")
+    record_parser.add_argument("--shots", type=int, default=1000, help="Number of shots to record")
+    record_parser.add_argument("--error_rate", type=float, default=DEFAULT_ERROR_RATE, help="Physical error rate per edge")
+    record_parser.add_argument("--seed", type=int, default=None, help="Seed for syndrome sampling")
+    record_parser.add_argument("--output", default='syndromes.bin', help="Path of the dataset file")
+
+    info_parser = subparsers.add_parser('info', help="Print the header and defect statistics of a dataset file")
+    info_parser.add_argument("path", help="Path of the dataset file")
+
+    return parser.parse_args(args_list)
+
+def main(args_list=None):
+    args = parse_arguments(args_list)
+    if args.command == 'record':
+        record_syndromes(args.output, args.size, args.shots, args.error_rate, args.seed)
+        print(f"Recorded {args.shots} shots to {args.output}")
+        return 0
+
+    reader = SyndromeReader(args.path)
+    defect_counts = np.concatenate([masks.sum(axis=1) for masks, _ in reader.iter_chunks()]) if len(reader) else np.zeros(0)
+    print(f"{args.path}: {len(reader)} shots on a {reader.shape[0]}x{reader.shape[1]} lattice, error rate {reader.error_rate}")
+    if len(reader):
+        print(f"Defects per shot: mean {defect_counts.mean():.2f}, max {defect_counts.max()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
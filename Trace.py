@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+
+class Span:
+    """Context manager recording one complete ('X') event on a Tracer."""
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        self.tracer.add_complete(self.name, self.start, end, self.args)
+        return False
+
+class Tracer:
+    """
+    Collects spans and counters and exports them as a Chrome-trace/Perfetto JSON file.
+
+    Spans time a stage with ``with tracer.span("name"):``. Counters accumulate named values,
+    e.g. tasks per resource, and are exported as counter ('C') events.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self.counters = {}
+
+    def span(self, name, **args):
+        return Span(self, name, args)
+
+    def add_complete(self, name, start, end, args=None):
+        self.events.append({
+            'name': name,
+            'ph': 'X',
+            'ts': (start - self.origin) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': args or {},
+        })
+
+    def count(self, name, key, value=1):
+        counter = self.counters.setdefault(name, {})
+        counter[key] = counter.get(key, 0) + value
+
+    def to_chrome_trace(self):
+        end = (time.perf_counter() - self.origin) * 1e6
+        counter_events = [{'name': name, 'ph': 'C', 'ts': end, 'pid': self.pid, 'tid': 0, 'args': dict(values)}
+                          for name, values in self.counters.items()]
+        return {'traceEvents': self.events + counter_events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class NullTracer:
+    """Tracer used when instrumentation is disabled; every call is a no-op."""
+    enabled = False
+
+    def span(self, name, **args):
+        return _NULL_SPAN
+
+    def add_complete(self, name, start, end, args=None):
+        pass
+
+    def count(self, name, key, value=1):
+        pass
+
+NULL_TRACER = NullTracer()
+
+_tracer = NULL_TRACER
+
+def get_tracer():
+    return _tracer
+
+def set_tracer(tracer):
+    """Install ``tracer`` as the active tracer and return the previous one. Pass None to disable."""
+    global _tracer
+    previous = _tracer
+    _tracer = tracer if tracer is not None else NULL_TRACER
+    return previous
@@ -0,0 +1,208 @@
+import argparse
+import itertools
+import json
+import sys
+
+import numpy as np
+
+import simulate
+import Sweep
+from Lattice import GridLattice
+from Syndrome import make_rng
+
+class ConfigEvaluator:
+    """
+    Simulates resource configurations on shared shots and memoizes the results.
+
+    Every configuration is evaluated on the same partitions and sampled shots for a given shot
+    budget, so configurations are compared on identical syndromes. Results are memoized in
+    memory and in the sweep cache of ``Sweep.py``, keyed by the simulation options, the
+    configuration, the shot budget, the seed and the code version.
+    """
+    def __init__(self, sim_args_list, seed=0, cache_dir=Sweep.DEFAULT_CACHE_DIR, use_cache=True):
+        self.sim_args_list = list(sim_args_list)
+        self.base_args = simulate.parse_arguments(self.sim_args_list)
+        self.syndromes = simulate.open_syndromes(self.base_args, verbose=False)
+        self.seed = seed
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self.version = Sweep.code_version()
+        self.memo = {}
+        self.samples = {}
+        self.num_simulated = 0  # Evaluations that were not memoized
+
+    def max_shots(self, shots):
+        """Shot budgets are capped by the number of recorded shots when replaying --syndromes."""
+        return min(shots, len(self.syndromes)) if self.syndromes is not None else shots
+
+    def shot_samples(self, shots):
+        """Partitions, complexity matrix, merge records and batch decoder of a shot budget."""
+        if shots not in self.samples:
+            args = self.base_args
+            lattice = GridLattice(args.size[0], args.size[1])
+            partitions, complexities = simulate.partition_lattice_shots(lattice, args.partitions, shots, args.error_rate, make_rng(self.seed),
+                                                                        args.partitioner, simulate.partition_cost(args), None, self.syndromes)
+            subgraphs = [subgraph for subgraph, _, _ in partitions]
+            profile = simulate.get_cost_profile(args.cost_profile)
+            merges = []
+            simulate.combine_partitions_incremental(subgraphs, lattice, merges, merge_cost=profile.merge if profile else None,
+                                                    plan=simulate.build_merge_plan(subgraphs, lattice, args.merge_tree))
+            batch_decoder = simulate.create_batch_decoder(args, lattice, partitions)
+            self.samples[shots] = (partitions, complexities, merges, batch_decoder)
+        return self.samples[shots]
+
+    def evaluate(self, num_hr, num_lr, thresh_compl, shots):
+        """
+        Simulate ``shots`` shots of one configuration.
+
+        Returns:
+            dict: The p99 and mean makespan (the critical path of decodes and merges, which
+            ``simulate.py`` checks ``--time_limit`` against), the mean net accuracy and the fraction of shots in which
+            the scheduler left partitions unassigned (``drop_rate``).
+        """
+        shots = self.max_shots(shots)
+        config = (num_hr, num_lr, thresh_compl, shots)
+        if config in self.memo:
+            return self.memo[config]
+
+        params = {'simulate': self.sim_args_list, 'num_hr': num_hr, 'num_lr': num_lr, 'thresh_compl': thresh_compl, 'shots': shots}
+        key = Sweep.point_key(params, self.seed, self.version)
+        result = Sweep.load_cached(self.cache_dir, key) if self.use_cache else None
+        if result is None:
+            args = argparse.Namespace(**vars(self.base_args))
+            args.num_hr, args.num_lr, args.thresh_compl, args.shots = num_hr, num_lr, thresh_compl, shots
+            partitions, complexities, merges, batch_decoder = self.shot_samples(shots)
+            # The same generator seed for every configuration, so measured decoding sees the same defects
+            makespans, net_accuracies, dropped = simulate.simulate_shots(partitions, complexities, args, make_rng(self.seed + 1),
+                                                                         self.syndromes, batch_decoder, merges)
+            result = {
+                'p99_makespan': float(np.quantile(makespans, 0.99)),
+                'mean_makespan': float(makespans.mean()),
+                'net_accuracy': float(net_accuracies.mean()),
+                'drop_rate': float(np.count_nonzero(dropped) / len(dropped)),
+            }
+            self.num_simulated += 1
+            if self.use_cache:
+                Sweep.store_cached(self.cache_dir, key, params, self.seed, self.version, result)
+        self.memo[config] = result
+        return result
+
+def resource_cost(num_hr, num_lr, hr_cost=2.0, lr_cost=1.0):
+    return num_hr * hr_cost + num_lr * lr_cost
+
+def is_feasible(result, time_limit=float('inf')):
+    """
+    Whether a configuration meets the time limit at the p99 makespan without dropping partitions.
+    A resource mix that leaves partitions unassigned (e.g. no high-complexity resources under the
+    greedy scheduler) finishes early only because it skips work.
+    """
+    return result['p99_makespan'] <= time_limit and result['drop_rate'] == 0
+
+def rank_key(config, result, time_limit=float('inf'), hr_cost=2.0, lr_cost=1.0):
+    """
+    Order configurations best first: feasible ones (see ``is_feasible``) come first, cheapest
+    resource mix first and then by accuracy; the rest by how rarely they drop partitions and
+    then by how close they come to the limit.
+    """
+    num_hr, num_lr, _ = config
+    cost = resource_cost(num_hr, num_lr, hr_cost, lr_cost)
+    if is_feasible(result, time_limit):
+        return (0, cost, -result['net_accuracy'], result['p99_makespan'])
+    return (1, result['drop_rate'], result['p99_makespan'], cost, -result['net_accuracy'])
+
+def successive_halving(evaluator, configs, min_shots=20, max_shots=640, eta=3, time_limit=float('inf'), hr_cost=2.0, lr_cost=1.0):
+    """
+    Search configurations with successive halving over the number of simulated shots.
+
+    All configurations are simulated on ``min_shots`` shots; the best ``1 / eta`` of them by
+    ``rank_key`` go on to ``eta`` times as many shots, until one configuration is left or the
+    budget reaches ``max_shots``.
+
+    Args:
+        evaluator (ConfigEvaluator): Simulates and memoizes configurations.
+        configs (list): (num_hr, num_lr, thresh_compl) tuples to search.
+        min_shots (int): Shots per configuration in the first rung.
+        max_shots (int): Shots per configuration in the last rung.
+        eta (int): Reduction factor between rungs.
+        time_limit (float): Limit on the p99 makespan.
+        hr_cost (float): Cost of a high-complexity resource.
+        lr_cost (float): Cost of a low-complexity resource.
+
+    Returns:
+        list: One (shots, [(config, result), ...]) rung per budget, each ranked best first.
+    """
+    rungs = []
+    shots = evaluator.max_shots(min_shots)
+    while True:
+        evaluated = [(config, evaluator.evaluate(*config, shots)) for config in configs]
+        evaluated.sort(key=lambda item: rank_key(item[0], item[1], time_limit, hr_cost, lr_cost))
+        rungs.append((shots, evaluated))
+        next_shots = evaluator.max_shots(min(shots * eta, max_shots))
+        if len(configs) == 1 or next_shots <= shots:
+            return rungs
+        configs = [config for config, _ in evaluated[:max(1, len(configs) // eta)]]
+        shots = next_shots
+
+def describe(config, result, time_limit=float('inf'), hr_cost=2.0, lr_cost=1.0):
+    num_hr, num_lr, thresh_compl = config
+    text = (f"--num_hr {num_hr} --num_lr {num_lr} --thresh_compl {thresh_compl}: cost {resource_cost(num_hr, num_lr, hr_cost, lr_cost):g}, "
+            f"p99 makespan {result['p99_makespan']:.10f} seconds, net accuracy {result['net_accuracy']:.2f}%")
+    if result['drop_rate'] > 0:
+        text += f", drops partitions in {result['drop_rate'] * 100:.1f}% of shots"
+    if time_limit != float('inf'):
+        text += f", time limit {'met' if result['p99_makespan'] <= time_limit else 'missed'}"
+    return text
+
+def parse_arguments(args_list=None):
+    """
+    Parse the tuner options. Any remaining options are ``simulate`` options that fix the rest of
+    the run, e.g. ``--size 100 100 --partitions 16 --time_limit 2e-6 --scheduler lpt``.
+    """
+    parser = argparse.ArgumentParser(description="Search num_hr, num_lr and thresh_compl for the cheapest resource mix that meets --time_limit.")
+    parser.add_argument("--hr_range", type=int, nargs=2, default=[1, 6], help="Smallest and largest number of high-complexity resources")
+    parser.add_argument("--lr_range", type=int, nargs=2, default=[1, 6], help="Smallest and largest number of low-complexity resources")
+    parser.add_argument("--thresh_range", type=int, nargs=2, default=[1, 8], help="Smallest and largest thresh_compl")
+    parser.add_argument("--hr_cost", type=float, default=2.0, help="Cost of one high-complexity resource")
+    parser.add_argument("--lr_cost", type=float, default=1.0, help="Cost of one low-complexity resource")
+    parser.add_argument("--min_shots", type=int, default=20, help="Shots per configuration in the first successive halving rung")
+    parser.add_argument("--max_shots", type=int, default=640, help="Shots per configuration in the last rung")
+    parser.add_argument("--eta", type=int, default=3, help="Fraction 1/eta of the configurations kept per rung")
+    parser.add_argument("--tune_seed", type=int, default=0, help="Seed of the shared shots")
+    parser.add_argument("--no_cache", action='store_true', help="Do not read or write the sweep cache")
+    parser.add_argument("--output", default=None, help="Write every rung's ranked results to this JSON file")
+    args, sim_args_list = parser.parse_known_args(args_list)
+    if args.eta < 2:
+        parser.error("--eta must be at least 2")
+    if not 1 <= args.min_shots <= args.max_shots:
+        parser.error("--min_shots must be between 1 and --max_shots")
+    if args.hr_range[0] < 0 or args.lr_range[0] < 1:
+        parser.error("--lr_range must start at 1 or more and --hr_range at 0 or more")
+    return args, sim_args_list
+
+def main(args_list=None):
+    args, sim_args_list = parse_arguments(args_list)
+    evaluator = ConfigEvaluator(sim_args_list, args.tune_seed, use_cache=not args.no_cache)
+    time_limit = evaluator.base_args.time_limit
+    configs = list(itertools.product(range(args.hr_range[0], args.hr_range[1] + 1), range(args.lr_range[0], args.lr_range[1] + 1),
+                                     range(args.thresh_range[0], args.thresh_range[1] + 1)))
+
+    rungs = successive_halving(evaluator, configs, args.min_shots, args.max_shots, args.eta, time_limit, args.hr_cost, args.lr_cost)
+    for shots, evaluated in rungs:
+        print(f"{len(evaluated)} configurations on {shots} shots; best: {describe(*evaluated[0], time_limit, args.hr_cost, args.lr_cost)}")
+    print(f"{evaluator.num_simulated} configurations simulated, {sum(len(evaluated) for _, evaluated in rungs) - evaluator.num_simulated} memoized.")
+
+    best_config, best_result = rungs[-1][1][0]
+    if is_feasible(best_result, time_limit):
+        print(f"Cheapest configuration that meets the time limit: {describe(best_config, best_result, time_limit, args.hr_cost, args.lr_cost)}")
+    else:
+        print(f"No configuration meets the time limit without dropping partitions; closest: {describe(best_config, best_result, time_limit, args.hr_cost, args.lr_cost)}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump([{'shots': shots, 'results': [{'num_hr': config[0], 'num_lr': config[1], 'thresh_compl': config[2], **result}
+                                                    for config, result in evaluated]}
+                       for shots, evaluated in rungs], f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import multiprocessing
+import queue
+import time
+import traceback
+
+# Seconds between checks that no worker has died while the results are collected
+RESULT_POLL_INTERVAL = 1.0
+
+def _take_task(position, queues, heads, tails, lock, siblings):
+    """
+    Take the next task id for the worker at ``position``, or None when there is no work left.
+
+    A worker takes from the head of its own queue. With work stealing, an idle worker takes
+    from the tail of the sibling queue with the most remaining tasks.
+    """
+    with lock:
+        if heads[position] < tails[position]:
+            task_id = queues[position][heads[position]]
+            heads[position] += 1
+            return task_id
+        victims = [s for s in siblings[position] if heads[s] < tails[s]]
+        if not victims:
+            return None
+        victim = max(victims, key=lambda s: tails[s] - heads[s])
+        tails[victim] -= 1
+        return queues[victim][tails[victim]]
+
+def _run_worker(position, resource, tasks, queues, heads, tails, lock, siblings, results, origin):
+    """
+    Decode tasks until every reachable queue is empty, reporting each one on ``results``. If
+    decoding raises, the worker reports (None, position, traceback) instead and stops.
+    """
+    try:
+        while True:
+            task_id = _take_task(position, queues, heads, tails, lock, siblings)
+            if task_id is None:
+                break
+            task = tasks[task_id]
+            start = time.perf_counter() - origin
+            processing_time, accuracy = resource.measure_processing(task)
+            end = time.perf_counter() - origin
+            results.put((task_id, position, start, end, processing_time, accuracy, task.logical_error))
+    except Exception:
+        results.put((None, position, traceback.format_exc()))
+
+def _collect_results(results, workers, count):
+    """
+    Get ``count`` task results from the workers.
+
+    Raises:
+        RuntimeError: If a worker reports an error or exits abnormally before all results arrive.
+    """
+    finished = []
+    while len(finished) < count:
+        try:
+            item = results.get(timeout=RESULT_POLL_INTERVAL)
+        except queue.Empty:
+            dead = [worker for worker in workers if worker.exitcode not in (None, 0)]
+            if dead:
+                raise RuntimeError(f"Worker process {dead[0].name} exited with code {dead[0].exitcode} before finishing its tasks")
+            continue
+        if item[0] is None:
+            raise RuntimeError(f"Worker for resource position {item[1]} failed:\n{item[2]}")
+        finished.append(item)
+    return finished
+
+def run_concurrent(resources, work_stealing=False):
+    """
+    Process every resource's queue at once, with one worker process per resource.
+
+    Workers pull tasks from their resource's queue concurrently, decode them with the resource's
+    decoder and record wall-clock start and end times relative to the start of the run. Only
+    measured decoding (``simulate.py --decoder measured``) is run this way: an estimated task
+    would be timed evaluating its cost formula instead. With ``work_stealing``, a worker whose queue is
+    empty takes queued tasks from resources of the same type. Every task is recorded in the
+    ``tasks`` of the resource that actually ran it, so a stolen task moves to the thief's
+    timeline and the Gantt chart shows the real execution.
+
+    Args:
+        resources (list): Scheduled resources. Tasks already processed are skipped.
+        work_stealing (bool): Whether idle workers take tasks from same-type resources.
+
+    Returns:
+        dict: resource id -> (task, processing_time, accuracy) tuples of the tasks the resource
+        ran, in start order, as returned by ``Resource.process_queue``.
+
+    Raises:
+        ValueError: If a pending task has no decoder or defect set to measure.
+        RuntimeError: If a worker fails; the remaining workers are terminated.
+    """
+    tasks = []
+    queues = []
+    for resource in resources:
+        pending = list(resource.queue)[resource.num_processed:]
+        if pending and (resource.decoder is None or any(task.defects is None for task in pending)):
+            raise ValueError(f"Resource {resource.id} has tasks without a decoder or defects; concurrent execution needs measured decoding")
+        queues.append(list(range(len(tasks), len(tasks) + len(pending))))
+        tasks.extend(pending)
+
+    siblings = []
+    for position, resource in enumerate(resources):
+        if work_stealing:
+            siblings.append([s for s, other in enumerate(resources) if s != position and other.type == resource.type])
+        else:
+            siblings.append([])
+
+    heads = multiprocessing.Array('i', [0] * len(resources), lock=False)
+    tails = multiprocessing.Array('i', [len(queue) for queue in queues], lock=False)
+    lock = multiprocessing.Lock()
+    results = multiprocessing.Queue()
+    origin = time.perf_counter()
+    workers = [multiprocessing.Process(target=_run_worker,
+                                       args=(position, resource, tasks, queues, heads, tails, lock, siblings, results, origin))
+               for position, resource in enumerate(resources) if queues[position] or siblings[position]]
+    for worker in workers:
+        worker.start()
+
+    try:
+        finished = _collect_results(results, workers, len(tasks))
+    except RuntimeError:
+        for worker in workers:
+            worker.terminate()
+        raise
+    finally:
+        for worker in workers:
+            worker.join()
+
+    processed = {resource.id: [] for resource in resources}
+    for task_id, position, start, end, processing_time, accuracy, logical_error in sorted(finished, key=lambda item: item[2]):
+        resource = resources[position]
+        task = tasks[task_id]
+        task.logical_error = logical_error
+        resource.tasks.append((start, end, task))
+        resource.utilization_time += end - start
+        processed[resource.id].append((task, processing_time, accuracy))
+    for resource in resources:
+        resource.num_processed = len(resource.queue)
+    return processed
@@ -1,12 +1,21 @@
-import networkx as nx
-import random
 import multiprocessing
 import argparse
-import math
 import time
-import matplotlib.pyplot as plt
 import numpy as np
 from Resource import *
+from Lattice import (GridLattice, LatticeRegion, as_grid_lattice, bisection_labels, cubic_cost, halo_entries, merged_boundary,
+                     partition_arrays, region_boundary, region_overlaps, union_sorted)
+from CostModel import load_cost_profile
+from Decoders import BatchMatcher, MWPMDecoder, UnionFindDecoder
+from Events import merge_tree_makespans, simulate_timeline
+from Gantt import render_gantt
+from Scheduling import SCHEDULERS, schedule
+from Results import RunResult, StreamResult, write_task_records
+from SyndromeFile import SyndromeReader
+from Stream import sample_rounds, time_windows, window_partitions
+from Workers import run_concurrent
+from Trace import Tracer, get_tracer, set_tracer
+from Syndrome import DEFAULT_ERROR_RATE, make_rng, sample_complexities, sample_defects, summarize_samples
 
 def spatial_hash(node_position, grid_size, lattice_size, num_partitions):
     x, y = node_position
@@ -15,120 +24,358 @@ def spatial_hash(node_position, grid_size, lattice_size, num_partitions):
     partition_index = (grid_x + grid_y * (lattice_size // grid_size)) % num_partitions
     return int(partition_index)
 
-def partition_lattice(lattice, num_partitions):
-    num_nodes = len(lattice.nodes)
-    lattice_size = int(math.sqrt(num_nodes))
-
-    partitions = [[] for _ in range(num_partitions)]
-
-    # Start with an initial grid size
-    grid_size = lattice_size / math.sqrt(num_partitions)
-
-    for node in lattice.nodes:
-        row, col = node
-        node_position = (row, col)
-        partition_index = spatial_hash(node_position, grid_size, lattice_size, num_partitions)
+def partition_lattice_shots(lattice, num_partitions, num_shots=1, error_rate=DEFAULT_ERROR_RATE, rng=None,
+                            partitioner='spatial_hash', cost=cubic_cost, activated=None, syndromes=None):
+    """
+    Partition the lattice and sample the complexity of every partition for many shots.
 
-        # Add the current node to the partition
-        partitions[partition_index].append(node)
+    Args:
+        lattice (GridLattice): The lattice to partition.
+        num_partitions (int): Number of partitions to create.
+        num_shots (int): Number of syndrome shots to sample.
+        error_rate (float): Physical error rate per node.
+        rng (np.random.Generator or int, optional): Generator or seed for syndrome sampling.
+        partitioner (str): 'spatial_hash', or 'bisection' to balance the predicted decode cost
+            of the first shot's activated nodes with ``bisection_labels``.
+        cost (callable): Cost curve over complexity that the 'bisection' partitioner balances.
+        activated (np.ndarray, optional): Boolean mask of the first shot's activated nodes for
+            the 'bisection' partitioner. Sampled per node if not given.
+        syndromes (SyndromeReader, optional): Recorded shots to use instead of sampling; the
+            complexity of a partition in shot ``s`` is the number of defects of recorded shot
+            ``s`` on its nodes and halo copies, plus one.
 
-        # Add neighboring nodes to the same partition
-        neighbors = [(row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)]
-        for neighbor in neighbors:
-            if neighbor in lattice.nodes:
-                neighbor_partition_index = spatial_hash((neighbor[0], neighbor[1]), grid_size, lattice_size, num_partitions)
-                if neighbor_partition_index != partition_index:
-                    partitions[neighbor_partition_index].append(node)
+    Returns:
+        tuple: A list of (subgraph, complexity, partition_index) tuples carrying the first
+        shot's complexities, and the full shots x partitions complexity matrix.
+    """
+    lattice = as_grid_lattice(lattice)
+    rng = make_rng(rng)
+    if syndromes is not None and activated is None:
+        activated = syndromes.defect_masks(0, 1)[0]
+
+    if partitioner == 'bisection':
+        # Sample where the first shot's activated nodes are, then cut the lattice around them;
+        # the expected density keeps defect-free regions from being lumped together
+        if activated is None:
+            activated = rng.random(lattice.num_nodes) < error_rate
+        labels = bisection_labels(lattice, num_partitions, activated + error_rate, cost)
+    else:
+        labels = None
+
+    # Partition labels, halo (neighbour-duplicated) nodes and node counts for all partitions at once
+    labels, members, node_counts = partition_arrays(lattice, num_partitions, labels)
+
+    # Set the complexity equal to the number of activated nodes (plus one) for every shot
+    if syndromes is not None:
+        # Stream the recorded shots through in chunks, keeping only their complexities
+        complexities = np.empty((num_shots, num_partitions), dtype=np.int64)
+        shot = 0
+        for masks, _ in syndromes.iter_chunks():
+            for mask in masks[:num_shots - shot]:
+                complexities[shot] = count_activated(lattice, labels, num_partitions, mask) + 1
+                shot += 1
+            if shot == num_shots:
+                break
+    else:
+        complexities = sample_complexities(node_counts, num_shots, error_rate, rng)
+        if activated is not None:
+            # The first shot is the one the partitions were cut for
+            complexities[0] = count_activated(lattice, labels, num_partitions, activated) + 1
 
     # Create subgraphs from the partitions
     subgraphs = []
-    partition_index = 0
-    for nodes in partitions:
-        subgraph = lattice.subgraph(set(nodes))
-        n = len(nodes)
+    for partition_index in range(num_partitions):
+        subgraph = LatticeRegion(lattice, members[partition_index])
+        complexity = int(complexities[0, partition_index])
+        subgraphs.append((subgraph, complexity, partition_index))
 
-        # Calculate the number of activated nodes based on the physical error rate
-        num_error_nodes = sum(random.random() <= 0.001 for _ in range(n))
+    return subgraphs, complexities
 
-        # Set the complexity equal to the number of activated nodes
-        complexity = num_error_nodes + 1
+def count_activated(lattice, labels, num_partitions, activated):
+    """Number of activated nodes of every partition, counting its halo copies."""
+    halo_labels, halo_nodes = halo_entries(lattice, labels)
+    return np.bincount(np.concatenate([labels, halo_labels]), weights=np.concatenate([activated, activated[halo_nodes]]),
+                       minlength=num_partitions).astype(np.int64)
 
-        subgraphs.append((subgraph, complexity, partition_index))
-        partition_index += 1
+def sample_partition_defects(partitions, error_rate=DEFAULT_ERROR_RATE, rng=None, syndrome=None):
+    """
+    Sample one shot of edge errors and attach each partition's real defect set.
+
+    ``syndrome`` is an already sampled (defects, left_flips) pair from ``sample_defects``.
 
+    Returns:
+        list: (subgraph, complexity, partition_index) tuples whose subgraphs carry ``defects``
+        and ``left_flips``, with the complexity set to the number of defects plus one.
+    """
+    lattice = partitions[0][0].lattice
+    defects, left_flips = syndrome if syndrome is not None else sample_defects(lattice, error_rate, rng)
+    defect_mask = np.zeros(lattice.num_nodes, dtype=bool)
+    defect_mask[defects] = True
+
+    sampled = []
+    for subgraph, _, partition_index in partitions:
+        index = subgraph.index
+        partition_defects = index[defect_mask[index]]
+        left_rows = index[index % lattice.cols == 0] // lattice.cols
+        region = LatticeRegion(lattice, index, partition_defects, int(left_flips[left_rows].sum()))
+        sampled.append((region, len(partition_defects) + 1, partition_index))
+    return sampled
+
+def partition_lattice(lattice, num_partitions, error_rate=DEFAULT_ERROR_RATE, rng=None, partitioner='spatial_hash', cost=cubic_cost):
+    subgraphs, _ = partition_lattice_shots(lattice, num_partitions, 1, error_rate, rng, partitioner, cost)
     return subgraphs
 
-def combine_partitions(subgraph1, subgraph2, original_lattice):
-    combined_nodes = set(subgraph1.nodes) | set(subgraph2.nodes)
-    combined_graph = original_lattice.subgraph(combined_nodes)
+def boundary_latency(num_boundary_nodes1, num_boundary_nodes2, merge_cost=None):
+    if merge_cost is not None:
+        # Calibrated cost curve over the total number of boundary nodes
+        return merge_cost(num_boundary_nodes1 + num_boundary_nodes2)
 
-    # Remove duplicate nodes and count shared nodes
-    node_positions = set()
-    nodes_to_remove = set()
-    for node in combined_graph.nodes():
-        if node in node_positions:
-            nodes_to_remove.add(node)
-        else:
-            node_positions.add(node)
+    total_boundary_nodes = (num_boundary_nodes1 + num_boundary_nodes2)/10
 
-    # Remove duplicate nodes from the combined graph
-    for node in nodes_to_remove:
-        combined_graph.remove_node(node)
+    # Calculate latency based on the total number of boundary nodes
+    return total_boundary_nodes * (10 ** -10)
+
+def combine_partitions(subgraph1, subgraph2, original_lattice, merge_cost=None):
+    lattice = as_grid_lattice(original_lattice)
+    index1 = lattice.to_index(subgraph1.nodes)
+    index2 = lattice.to_index(subgraph2.nodes)
+
+    # The union of two sorted index arrays has no duplicate nodes
+    combined_graph = LatticeRegion(lattice, union_sorted(index1, index2))
 
     # Calculate the total number of boundary nodes in both subgraphs
-    boundary_nodes_subgraph1 = set()
-    boundary_nodes_subgraph2 = set()
+    latency = boundary_latency(len(region_boundary(lattice, index1)), len(region_boundary(lattice, index2)), merge_cost)
 
-    for node in subgraph1.nodes:
-        row, col = node
-        neighbors = [(row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)]
-        for neighbor in neighbors:
-            if neighbor not in subgraph1.nodes and neighbor in original_lattice.nodes:
-                boundary_nodes_subgraph1.add(node)
+    return combined_graph, latency
 
-    for node in subgraph2.nodes:
-        row, col = node
-        neighbors = [(row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)]
-        for neighbor in neighbors:
-            if neighbor not in subgraph2.nodes and neighbor in original_lattice.nodes:
-                boundary_nodes_subgraph2.add(node)
+def merge_plan(num_subgraphs):
+    """
+    Pairwise merge order used to combine partitions.
 
-    total_boundary_nodes = (len(boundary_nodes_subgraph1) + len(boundary_nodes_subgraph2))/10
+    Subgraphs are paired by list position. When a round has an odd number of subgraphs, the
+    last two are merged first in a round of their own.
 
-    # Calculate latency based on the total number of boundary nodes
-    latency = total_boundary_nodes * (10 ** -10)
+    Args:
+        num_subgraphs (int): Number of subgraphs to combine.
 
-    return combined_graph, latency
+    Returns:
+        list: Rounds of (merge_id, left_id, right_id) merges. Ids 0..num_subgraphs-1 are the
+        subgraphs' positions and each merge gets the next free id.
+    """
+    ids = list(range(num_subgraphs))
+    next_id = num_subgraphs
+    rounds = []
+    while len(ids) > 1:
+        if len(ids) % 2 != 0:
+            # If there is an odd number of subgraphs, combine the last subgraph with the second-to-last subgraph
+            rounds.append([(next_id, ids[-2], ids[-1])])
+            ids[-2] = next_id
+            ids.pop()
+            next_id += 1
+
+        merge_round = []
+        for i in range(0, len(ids), 2):
+            merge_round.append((next_id, ids[i], ids[i + 1]))
+            next_id += 1
+        rounds.append(merge_round)
+        ids = [merge_id for merge_id, _, _ in merge_round]
+    return rounds
+
+def adjacency_merge_plan(num_subgraphs, overlaps):
+    """
+    Merge order that only combines neighbouring subgraphs.
+
+    Every round greedily matches pairs of currently adjacent subgraphs, heaviest shared
+    boundary first, and merged subgraphs inherit the adjacency of their children, so the tree
+    follows the lattice's geometry and stays about log2(num_subgraphs) rounds deep. Subgraphs
+    left without a neighbour (e.g. empty partitions) are paired by position once no adjacent
+    pair remains.
 
-def combine_partitions_parallel(subgraphs, original_lattice):
+    Args:
+        num_subgraphs (int): Number of subgraphs to combine.
+        overlaps (dict): (i, j) -> shared node count of adjacent subgraphs, from ``region_overlaps``.
+
+    Returns:
+        list: Rounds of (merge_id, left_id, right_id) merges in the format of ``merge_plan``.
     """
-    Combine all subgraphs in parallel by combining pairs of subgraphs using a pool of workers.
+    neighbours = {i: {} for i in range(num_subgraphs)}
+    for (i, j), shared in overlaps.items():
+        neighbours[i][j] = neighbours[j][i] = shared
+
+    ids = list(range(num_subgraphs))
+    next_id = num_subgraphs
+    rounds = []
+    while len(ids) > 1:
+        candidates = sorted((-shared, a, b) for a in ids for b, shared in neighbours[a].items() if a < b)
+        matched = set()
+        pairs = []
+        for _, a, b in candidates:
+            if a not in matched and b not in matched:
+                matched.update((a, b))
+                pairs.append((a, b))
+        if not pairs:
+            pairs = [(ids[i], ids[i + 1]) for i in range(0, len(ids) - 1, 2)]
+            matched.update(node for pair in pairs for node in pair)
+
+        merge_round = []
+        for a, b in pairs:
+            merged = {}
+            for child in (a, b):
+                for other, shared in neighbours.pop(child).items():
+                    del neighbours[other][child]
+                    if other not in (a, b):
+                        merged[other] = merged.get(other, 0) + shared
+            neighbours[next_id] = merged
+            for other, shared in merged.items():
+                neighbours[other][next_id] = shared
+            merge_round.append((next_id, a, b))
+            next_id += 1
+        rounds.append(merge_round)
+        ids = [i for i in ids if i not in matched] + [merge_id for merge_id, _, _ in merge_round]
+    return rounds
+
+def build_merge_plan(subgraphs, original_lattice, merge_tree='position'):
+    """The merge rounds of ``subgraphs`` for a ``--merge_tree`` choice."""
+    if merge_tree == 'adjacency':
+        lattice = as_grid_lattice(original_lattice)
+        return adjacency_merge_plan(len(subgraphs), region_overlaps([lattice.to_index(subgraph.nodes) for subgraph in subgraphs]))
+    return merge_plan(len(subgraphs))
+
+def combine_partitions_incremental(subgraphs, original_lattice, merges=None, merge_cost=None, plan=None):
+    """
+    Combine all subgraphs in merge plan order while updating boundaries incrementally.
+
+    Leaf boundaries are computed once with shifted-array operations; every merged boundary is
+    derived from its children's boundaries, so no region is rescanned at later merge levels.
+    The latency of every merge matches ``combine_partitions``.
 
     Args:
         subgraphs (list): A list of subgraphs to be combined.
-        original_lattice (nx.Graph): The original lattice graph.
+        original_lattice (GridLattice): The original lattice.
+        merges (list, optional): If given, a (merge_id, left_id, right_id, latency) record is
+            appended for every pairwise merge.
+        merge_cost (CostModel, optional): Calibrated merge cost curve; the default per-boundary-node
+            factor is used if not given.
+        plan (list, optional): Merge rounds, e.g. from ``adjacency_merge_plan``. Defaults to
+            ``merge_plan``'s pairing by list position.
 
     Returns:
         tuple: A tuple containing the combined subgraph and the total latency.
     """
+    lattice = as_grid_lattice(original_lattice)
+    if plan is None:
+        plan = merge_plan(len(subgraphs))
+    indices = {i: lattice.to_index(subgraph.nodes) for i, subgraph in enumerate(subgraphs)}
+    boundaries = {i: region_boundary(lattice, index) for i, index in indices.items()}
     total_latency = 0
 
-    with multiprocessing.Pool() as pool:
-        while len(subgraphs) > 1:
-            if len(subgraphs) % 2 != 0:
-                # If there is an odd number of subgraphs, combine the last subgraph with the second-to-last subgraph
-                subgraph, latency = combine_partitions(subgraphs[-2], subgraphs[-1], original_lattice)
-                subgraphs[-2] = subgraph
-                total_latency += latency
-                subgraphs.pop()
+    tracer = get_tracer()
+    for level, merge_round in enumerate(plan):
+        with tracer.span("merge level", level=level, merges=len(merge_round)):
+            round_latencies = []
+            for merge_id, left, right in merge_round:
+                latency = boundary_latency(len(boundaries[left]), len(boundaries[right]), merge_cost)
+                indices[merge_id] = union_sorted(indices.pop(left), indices.pop(right))
+                boundaries[merge_id] = merged_boundary(lattice, indices[merge_id], boundaries.pop(left), boundaries.pop(right))
+                if merges is not None:
+                    merges.append((merge_id, left, right, latency))
+                round_latencies.append(latency)
+            total_latency += sum(round_latencies)
+
+    (index,) = indices.values()
+    return LatticeRegion(lattice, index), total_latency
+
+# Lattices known to this process, keyed by shape. Pool workers fill it once through the
+# initializer, so merge tasks only need to carry the shape and two node index arrays.
+_worker_lattices = {}
+
+def _init_merge_worker(lattice=None):
+    if lattice is not None:
+        _worker_lattices[lattice.shape] = lattice
+
+def _worker_lattice(shape):
+    lattice = _worker_lattices.get(shape)
+    if lattice is None:
+        lattice = _worker_lattices[shape] = GridLattice(*shape)
+    return lattice
+
+def _combine_indices(shape, index1, index2, merge_cost=None):
+    lattice = _worker_lattice(shape)
+    combined_graph, latency = combine_partitions(LatticeRegion(lattice, index1), LatticeRegion(lattice, index2), lattice, merge_cost)
+    return combined_graph.index, latency
+
+class MergePool:
+    """
+    A persistent pool of merge workers that can be reused across runs and sweeps.
+
+    Workers receive the lattice once through the pool initializer and partitions travel as
+    compact node index arrays, so no merge task pickles the lattice.
+    """
+    def __init__(self, processes=None, lattice=None):
+        self.pool = multiprocessing.Pool(processes, initializer=_init_merge_worker, initargs=(lattice,))
+
+    def combine(self, subgraphs, original_lattice, merges=None, merge_cost=None, plan=None):
+        return combine_partitions_parallel(subgraphs, original_lattice, merges, merge_pool=self, merge_cost=merge_cost, plan=plan)
 
-            pairs = [(subgraphs[i], subgraphs[i + 1], original_lattice) for i in range(0, len(subgraphs), 2)]
-            results = pool.starmap(combine_partitions, pairs)
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.pool.terminate()
+        self.pool.join()
+
+def combine_partitions_parallel(subgraphs, original_lattice, merges=None, merge_pool=None, merge_cost=None, plan=None):
+    """
+    Combine all subgraphs in parallel by combining pairs of subgraphs using a pool of workers.
 
-            subgraphs = [result[0] for result in results]
+    Args:
+        subgraphs (list): A list of subgraphs to be combined.
+        original_lattice (GridLattice): The original lattice.
+        merges (list, optional): If given, a (merge_id, left_id, right_id, latency) record is
+            appended for every pairwise merge. Ids 0..len(subgraphs)-1 refer to positions in
+            ``subgraphs``; each merge gets the next free id.
+        merge_pool (MergePool, optional): A persistent pool to run the merges on. A temporary
+            pool is created for this call if not given.
+        merge_cost (CostModel, optional): Calibrated merge cost curve; the default per-boundary-node
+            factor is used if not given.
+        plan (list, optional): Merge rounds, e.g. from ``adjacency_merge_plan``. Defaults to
+            ``merge_plan``'s pairing by list position.
+
+    Returns:
+        tuple: A tuple containing the combined subgraph and the total latency.
+    """
+    if merge_pool is None:
+        with MergePool(lattice=as_grid_lattice(original_lattice)) as merge_pool:
+            return combine_partitions_parallel(subgraphs, original_lattice, merges, merge_pool, merge_cost, plan)
+
+    lattice = as_grid_lattice(original_lattice)
+    if plan is None:
+        plan = merge_plan(len(subgraphs))
+    total_latency = 0
+    indices = {i: lattice.to_index(subgraph.nodes) for i, subgraph in enumerate(subgraphs)}
+
+    tracer = get_tracer()
+    for level, merge_round in enumerate(plan):
+        with tracer.span("merge level", level=level, merges=len(merge_round)):
+            pairs = [(lattice.shape, indices.pop(left), indices.pop(right), merge_cost) for _, left, right in merge_round]
+            if len(pairs) == 1:
+                # A single merge is cheaper to run here than to ship to a worker
+                results = [_combine_indices(*pairs[0])]
+            else:
+                results = merge_pool.pool.starmap(_combine_indices, pairs)
+
+            for (merge_id, left, right), (index, latency) in zip(merge_round, results):
+                indices[merge_id] = index
+                if merges is not None:
+                    merges.append((merge_id, left, right, latency))
             total_latency += sum(result[1] for result in results)
 
-    return subgraphs[0], total_latency
+    (index,) = indices.values()
+    return LatticeRegion(lattice, index), total_latency
 
 def parse_arguments(args_list=None):
     parser = argparse.ArgumentParser(description="Surface code lattice partitioning and processing.")
@@ -138,142 +385,523 @@ def parse_arguments(args_list=None):
     parser.add_argument("--num_lr", type=int, default=3, help="Number of low-complexity resources")
     parser.add_argument("--thresh_compl", type=int, default=2, help="Number of low-complexity resources")
     parser.add_argument("--time_limit", type=float, default=float('inf'), help="Time limit for running the partitions (in seconds)")
-
-    if args_list:
+    parser.add_argument("--error_rate", type=float, default=DEFAULT_ERROR_RATE, help="Physical error rate per node")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for syndrome sampling")
+    parser.add_argument("--shots", type=int, default=1, help="Number of syndrome shots to sample")
+    parser.add_argument("--decoder", choices=['estimate', 'measured'], default='estimate',
+                        help="Estimate decode times from complexity, or run MWPM/Union-Find decoders on sampled defects and measure them")
+    parser.add_argument("--cost_profile", default=None,
+                        help="Calibrated cost profile (from Calibration.py) used for decode time estimates and merge latency")
+    parser.add_argument("--quiet", action='store_true', help="Headless mode: suppress the per-task output and the Gantt chart")
+    parser.add_argument("--gantt", default=None,
+                        help="Write the Gantt chart to this path instead of showing it: .png/.svg/.pdf, or .html for an interactive timeline")
+    parser.add_argument("--records", default=None,
+                        help="Write per-task records to this path as CSV (.csv) or JSON lines (anything else, '-' for stdout)")
+    parser.add_argument("--trace", default=None, help="Write a Chrome-trace/Perfetto JSON file of the run's stages to this path")
+    parser.add_argument("--merge_mode", choices=['incremental', 'parallel'], default='incremental',
+                        help="Combine partitions serially with incremental boundary updates, or on a pool of workers")
+    parser.add_argument("--merge_tree", choices=['position', 'adjacency'], default='position',
+                        help="Pair partitions for merging by list position, or build the merge tree from spatially adjacent partitions")
+    parser.add_argument("--partitioner", choices=['spatial_hash', 'bisection'], default='spatial_hash',
+                        help="Assign nodes with the spatial hash, or by recursive bisection balancing the predicted decode cost of the sampled defects")
+    parser.add_argument("--scheduler", choices=list(SCHEDULERS), default='greedy',
+                        help="Scheduling policy: greedy least-loaded, LPT, LPT plus local search, or deadline-aware downgrading to meet --time_limit")
+    parser.add_argument("--execution", choices=['sequential', 'concurrent'], default='sequential',
+                        help="Process resources one after another, or run every resource on its own worker process with wall-clock task times")
+    parser.add_argument("--work_stealing", action='store_true',
+                        help="In concurrent execution, let idle workers take queued partitions from resources of the same type")
+    parser.add_argument("--batch_size", type=int, default=0,
+                        help="Process low-complexity resources' queues in vectorized batches of this many partitions (0: one at a time)")
+    parser.add_argument("--syndromes", default=None,
+                        help="Replay recorded syndrome shots from this dataset file (see SyndromeFile.py) instead of sampling them")
+    parser.add_argument("--rounds", type=int, default=0,
+                        help="Stream this many syndrome rounds through sliding time windows instead of decoding one snapshot")
+    parser.add_argument("--window", type=int, default=10, help="Rounds per time window in streaming mode")
+    parser.add_argument("--commit", type=int, default=None,
+                        help="Rounds committed per time window in streaming mode (default: half the window)")
+    parser.add_argument("--round_time", type=float, default=1e-6, help="Time between syndrome rounds in streaming mode (in seconds)")
+
+    if args_list is not None:
         args = parser.parse_args(args_list)
     else:
         args = parser.parse_args()
 
+    if args.commit is None:
+        args.commit = max(args.window // 2, 1)
+    if args.rounds and not 1 <= args.commit <= args.window:
+        parser.error("--commit must be between 1 and --window")
+    if args.rounds and args.syndromes:
+        parser.error("streaming mode (--rounds) samples its own rounds and cannot replay --syndromes")
+    if args.rounds and args.decoder == 'measured':
+        parser.error("streaming mode (--rounds) only supports --decoder estimate")
+    if args.rounds and args.partitioner != 'spatial_hash':
+        parser.error("streaming mode (--rounds) partitions every window with the spatial hash and cannot use --partitioner bisection")
+    if args.rounds and args.execution == 'concurrent':
+        parser.error("streaming mode (--rounds) processes resources sequentially and cannot use --execution concurrent")
+    if args.rounds and args.shots > 1:
+        parser.error("streaming mode (--rounds) decodes one stream of rounds and cannot be combined with --shots")
+    if args.batch_size < 0:
+        parser.error("--batch_size must not be negative")
+    if args.execution == 'concurrent' and args.decoder != 'measured':
+        parser.error("--execution concurrent times real decodes on worker processes and needs --decoder measured")
+    if args.batch_size and args.execution == 'concurrent':
+        parser.error("--batch_size batches the sequential execution of low-complexity resources and cannot be combined with --execution concurrent")
+
     return args
 
+# Cost profiles loaded by this process, keyed by path
+_cost_profiles = {}
+
+def get_cost_profile(path):
+    """Load the calibrated cost profile at ``path`` once per process. Returns None if path is None."""
+    if path is None:
+        return None
+    if path not in _cost_profiles:
+        _cost_profiles[path] = load_cost_profile(path)
+    return _cost_profiles[path]
+
+def partition_cost(args):
+    """Cost curve the load-aware partitioner balances: the calibrated high-resource curve if given."""
+    profile = get_cost_profile(args.cost_profile)
+    if profile and 'high' in profile.decode:
+        return profile.decode['high']
+    return cubic_cost
+
 def create_resources(args):
-    high_complexity_resources = [Resource(i, max_complexity=float('inf'), type='high') for i in range(args.num_hr)]
-    low_complexity_resources = [Resource(i + args.num_hr, max_complexity=args.thresh_compl, type='low') for i in range(args.num_lr)]
+    if args.decoder == 'measured':
+        high_decoder, low_decoder = MWPMDecoder(), UnionFindDecoder()
+    else:
+        high_decoder = low_decoder = None
+    profile = get_cost_profile(args.cost_profile)
+    high_cost = profile.decode.get('high') if profile else None
+    low_cost = profile.decode.get('low') if profile else None
+    high_complexity_resources = [Resource(i, max_complexity=float('inf'), type='high', decoder=high_decoder, cost_model=high_cost) for i in range(args.num_hr)]
+    low_complexity_resources = [Resource(i + args.num_hr, max_complexity=args.thresh_compl, type='low', decoder=low_decoder, cost_model=low_cost) for i in range(args.num_lr)]
     return high_complexity_resources, low_complexity_resources
 
+def create_batch_decoder(args, lattice, partitions):
+    """The BatchMatcher of batched measured decoding, or None when it is not used."""
+    if args.batch_size and args.decoder == 'measured':
+        return BatchMatcher(lattice, partitions)
+    return None
+
 def print_partition_details(partitions):
     print("\nAll Partitions:")
     for subgraph, complexity, partition_index in partitions:
         print(f"Partition {partition_index}: Complexity = {complexity}")
 
-def schedule_partitions(partitions, high_complexity_resources, low_complexity_resources):
+def schedule_partitions(partitions, high_complexity_resources, low_complexity_resources, policy='greedy', time_limit=float('inf'), merges=()):
     start_time = time.time()
-    combined_resources = dynamic_load_balancing(partitions, high_complexity_resources, low_complexity_resources)
+    combined_resources, schedule_report = schedule(policy, partitions, high_complexity_resources, low_complexity_resources, time_limit, merges)
     end_time = time.time()
     scheduling_overhead = end_time - start_time
-    return combined_resources, scheduling_overhead
+    return combined_resources, scheduling_overhead, schedule_report
 
-def process_partitions(combined_resources):
+def process_partitions(combined_resources, verbose=True, records=None, execution='sequential', work_stealing=False,
+                       batch_size=0, batch_decoder=None):
     max_time_taken = 0
     total_accuracy = 0
 
-    print("\nPartition Processing:")
+    if execution == 'concurrent':
+        # Real worker processes decode all queues at once and record wall-clock task times
+        concurrent_tasks = run_concurrent(combined_resources, work_stealing)
+
+    if verbose:
+        print("\nPartition Processing:")
     for resource in combined_resources:
-        processed_tasks = resource.process_queue()
+        if execution == 'concurrent':
+            processed_tasks = concurrent_tasks[resource.id]
+        else:
+            processed_tasks = resource.process_queue(batch_size, batch_decoder)
         resource_processing_time = resource.utilization_time
-        print(f"Resource {resource.id} ({resource.type}) estimated processing time: {resource_processing_time:.10f}")
+        if verbose:
+            print(f"Resource {resource.id} ({resource.type}) estimated processing time: {resource_processing_time:.10f}")
         max_time_taken = max(max_time_taken, resource_processing_time)
-        for task, processing_time, accuracy in processed_tasks:
-            print(f"Resource {resource.id} ({resource.type}) processing Partition {task.partition_index}")
-            print(f"  Partition {task.partition_index} with {len(task.nodes)} nodes (syndrome graph size {task.complexity})")
-            print(f"  Accuracy: {accuracy}%")
+        # The tasks processed by this call are the last entries of the resource's timeline
+        task_times = resource.tasks[len(resource.tasks) - len(processed_tasks):]
+        for (task, processing_time, accuracy), (task_start, task_end, _) in zip(processed_tasks, task_times):
+            if verbose:
+                print(f"Resource {resource.id} ({resource.type}) processing Partition {task.partition_index}")
+                print(f"  Partition {task.partition_index} with {task.num_nodes} nodes (syndrome graph size {task.complexity})")
+                print(f"  Accuracy: {accuracy}%")
+            if records is not None:
+                records.append({'resource': resource.id, 'resource_type': resource.type, 'partition': task.partition_index,
+                                'nodes': task.num_nodes, 'complexity': task.complexity,
+                                'start': task_start, 'end': task_end, 'accuracy': accuracy})
             total_accuracy += accuracy
-        print("\n")
+        if verbose:
+            print("\n")
 
     return max_time_taken, total_accuracy
 
-def check_time_limit(args, max_time_taken, combined_resources):
+def check_time_limit(args, max_time_taken, combined_resources, timeline=None):
     if max_time_taken > args.time_limit:
         print(f"Total time exceeds the specified time limit of {args.time_limit:.10f} seconds.")
-        exceeded_resources = [resource for resource in combined_resources if resource.utilization_time > args.time_limit]
+        if timeline is not None:
+            # Resource finish times from the event simulation, which include waiting on arrivals
+            finish_times = {resource.id: timeline.finish_time[resource.id] for resource in combined_resources}
+        else:
+            finish_times = {resource.id: resource.utilization_time for resource in combined_resources}
+        exceeded_resources = [resource for resource in combined_resources if finish_times[resource.id] > args.time_limit]
         if exceeded_resources:
             print("Resources that exceeded the time limit:")
             for resource in exceeded_resources:
-                print(f"Resource {resource.id} ({resource.type}) took {resource.utilization_time:.10f} seconds")
+                print(f"Resource {resource.id} ({resource.type}) took {finish_times[resource.id]:.10f} seconds")
         else:
-            print("No resource exceeded the time limit individually, but the maximum processing time exceeds the limit.")
+            print("No resource exceeded the time limit individually, but merge latency on the critical path exceeds the limit.")
     else:
         print("All partitions processed within the specified time limit.")
 
-def calculate_net_accuracy(total_accuracy, num_partitions):
+def print_timeline_summary(timeline, combined_resources):
+    print(f"\nCritical-path makespan: {timeline.makespan:.10f} seconds ({timeline.num_events} events).")
+    print("Critical path:")
+    for step in timeline.critical_path:
+        if step[0] == 'decode':
+            _, partition_index, resource_id, start, end = step
+            print(f"  Decode Partition {partition_index} on Resource {resource_id}: {start:.10f} -> {end:.10f}")
+        else:
+            _, merge_id, start, end = step
+            print(f"  Merge {merge_id}: {start:.10f} -> {end:.10f}")
+    for resource in combined_resources:
+        print(f"Resource {resource.id} ({resource.type}) idle time: {timeline.idle_time[resource.id]:.10f}")
+
+def calculate_net_accuracy(total_accuracy, num_partitions, verbose=True):
     net_accuracy = total_accuracy / num_partitions
-    print(f"\nNet accuracy across all partitions: {net_accuracy:.2f}%")
+    if verbose:
+        print(f"\nNet accuracy across all partitions: {net_accuracy:.2f}%")
     return net_accuracy
 
 def generate_gantt_chart(combined_resources, partitions, args):
-    fig, ax = plt.subplots(figsize=(12, 8))
-    unique_resources = list(set(combined_resources))
-    num_colors = len(partitions)
-    colors = plt.colormaps['rainbow'](np.linspace(0, 1, num_colors))
-    y_ticks = []
-    y_labels = []
-
-    for i, resource in enumerate(unique_resources):
-        for task_start, task_end, task in resource.tasks:
-            partition_index = task.partition_index
-            ax.broken_barh([(task_start, task_end - task_start)], (i - 0.4, 0.8), color=colors[partition_index % num_colors])
-            ax.text(task_start + (task_end - task_start) / 2, i, f"P{partition_index}", ha='center', va='center', color='black', fontsize=10)
-
-        y_ticks.append(i)
-        y_labels.append(f"Resource {resource.id} ({resource.type})")
-
-    ax.set_ylim(-0.5, len(unique_resources) - 0.5)
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels(y_labels)
-    ax.set_xlabel('Time')
-    ax.set_title('Partition Execution Gantt Chart')
-    ax.grid(True)
-
-    # Add legend
-    partition_indices = [partition_index for _, _, partition_index in partitions]
-    legend_labels = [f"Partition {index}" for index in partition_indices]
-    legend_handles = [plt.Rectangle((0, 0), 1, 1, color=colors[index % num_colors]) for index in partition_indices]
-    ax.legend(legend_handles, legend_labels, loc='upper right', title='Partitions', ncol=2)
-
-    # Add vertical line at time limit if not infinity
-    if args.time_limit != float('inf'):
-        ax.axvline(x=args.time_limit, linestyle='--', color='r', label='Time Limit')
-        ax.legend()
-
-    plt.tight_layout()
-    plt.show()
-
-def main_func(args):
-    # Create a sample lattice
-    lattice = nx.grid_2d_graph(args.size[0], args.size[1])
-
-    partitions = partition_lattice(lattice, args.partitions)
-     
-    # Add partition index to each partition
-    for i, (subgraph, complexity, partition_index) in enumerate(partitions):
-        partitions[i] = (subgraph, complexity, partition_index)
-
-    print_partition_details(partitions)
+    """Show the Gantt chart of a run, or write it to ``args.gantt`` (PNG/SVG/PDF or interactive HTML)."""
+    render_gantt(combined_resources, len(partitions), args.gantt, args.time_limit)
 
-    high_complexity_resources, low_complexity_resources = create_resources(args)
+def simulate_shots(partitions, complexities, args, rng=None, syndromes=None, batch_decoder=None, merges=()):
+    """
+    Schedule and process every sampled shot without printing per-task details.
 
-    combined_resources, scheduling_overhead = schedule_partitions(partitions, high_complexity_resources, low_complexity_resources)
-    print(f"\nScheduling overhead on this system: {scheduling_overhead:.10f} seconds.")
+    The makespan of a shot is the critical path of its decodes and the ``merges`` of the merge
+    tree, as ``Events.simulate_timeline`` computes it for a single run, so the time limit is
+    judged the same way for one shot and for many. With ``--batch_size``, the partitions queued
+    on low-complexity resources in all shots are processed together with
+    ``Resource.batch_processing``, so the same partitions of many shots share each vectorized batch.
 
-    max_time_taken, total_accuracy = process_partitions(combined_resources)
-    print(f"Maximum time taken by any resource: {max_time_taken:.10f}")
-    
-    # Combine all partitions in parallel
-    all_partitions = [subgraph for subgraph, _, _ in partitions]
-    combined_lattice, comb_latency = combine_partitions_parallel(all_partitions, lattice)
-    print(f"Combined lattice has {len(combined_lattice.nodes)} nodes.")
-    print(f"Total latency during partition combination: {comb_latency:.10f} seconds.")
+    Args:
+        partitions (list): (subgraph, complexity, partition_index) tuples from partition_lattice.
+        complexities (np.ndarray): Complexity matrix of shape (shots, partitions).
+        args (argparse.Namespace): Parsed simulation arguments.
+        rng (np.random.Generator, optional): Generator for the per-shot defects of measured decoding.
+        syndromes (SyndromeReader, optional): Recorded shots to decode in measured mode instead of sampling.
+        batch_decoder (BatchMatcher, optional): Decoder of the batched small partitions in measured mode.
+        merges (list): (merge_id, left_id, right_id, latency) records of the merge tree, with leaf
+            ids in the order of ``partitions``. Without merges the makespan is the slowest resource.
 
-    max_time_taken += comb_latency
-    print(f"Total time: {max_time_taken:.10f}")
+    Returns:
+        tuple: Arrays of the critical-path makespan, the net accuracy and the number of partitions
+        the scheduler assigned to no resource, of every shot.
+    """
+    num_shots = complexities.shape[0]
+    leaf_of = {partition_index: leaf for leaf, (_, _, partition_index) in enumerate(partitions)}
+    # Decode finish time of every partition in every shot; NaN while no resource decoded it
+    leaf_finish = np.full((num_shots, len(partitions)), np.nan)
+    total_accuracies = np.zeros(num_shots)
+    dropped = np.zeros(num_shots, dtype=np.int64)
+    high_complexity_resources, low_complexity_resources = create_resources(args)
+    batched = args.batch_size and low_complexity_resources
+    batch_tasks = []
+    batch_slots = []  # shot * num_lr + low-complexity resource position of every batched task
+    batch_shots = []
+
+    for shot in range(num_shots):
+        if args.decoder == 'measured':
+            # Measured decoding needs every shot's real defect set, not just its defect count
+            syndrome = syndromes[shot] if syndromes is not None else None
+            shot_partitions = sample_partition_defects(partitions, args.error_rate, rng, syndrome)
+        else:
+            shot_partitions = [(subgraph, int(complexities[shot, partition_index]), partition_index)
+                               for subgraph, _, partition_index in partitions]
+        # Reuse the resources across shots instead of rebuilding them
+        for resource in high_complexity_resources + low_complexity_resources:
+            resource.reset()
+        combined_resources, schedule_report = schedule(args.scheduler, shot_partitions, high_complexity_resources, low_complexity_resources,
+                                                       args.time_limit, merges)
+        dropped[shot] = len(schedule_report.dropped)
+
+        for resource in combined_resources:
+            if batched and resource.type == 'low':
+                batch_tasks.extend(resource.queue)
+                batch_slots.extend([shot * args.num_lr + resource.id - args.num_hr] * len(resource.queue))
+                batch_shots.extend([shot] * len(resource.queue))
+                continue
+            for task, processing_time, accuracy in resource.process_queue():
+                total_accuracies[shot] += accuracy
+            for _, end_time, task in resource.tasks:
+                leaf_finish[shot, leaf_of[task.partition_index]] = end_time
+
+    if batched and batch_tasks:
+        processing_times, accuracies = low_complexity_resources[0].batch_processing(batch_tasks, args.batch_size, batch_decoder)
+        slots = np.array(batch_slots, dtype=np.int64)
+        # Every slot's tasks are contiguous and in queue order, so their finish times are the
+        # running sums of the processing times restarted at every slot
+        group_starts = np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]])
+        running = np.cumsum(processing_times)
+        offsets = np.r_[0.0, running][group_starts]
+        finish = running - np.repeat(offsets, np.diff(np.r_[group_starts, len(slots)]))
+        leaves = np.fromiter((leaf_of[task.partition_index] for task in batch_tasks), dtype=np.int64, count=len(batch_tasks))
+        leaf_finish[np.array(batch_shots, dtype=np.int64), leaves] = finish
+        total_accuracies += np.bincount(slots // args.num_lr, weights=accuracies, minlength=num_shots)
+
+    return merge_tree_makespans(leaf_finish, merges), total_accuracies / args.partitions, dropped
+
+def print_shot_summary(max_times, net_accuracies, dropped=None):
+    time_summary = summarize_samples(max_times)
+    accuracy_summary = summarize_samples(net_accuracies)
+    if dropped is not None and dropped.any():
+        print(f"\nWarning: {np.count_nonzero(dropped)} of {len(dropped)} shots left partitions unassigned "
+              f"({dropped.sum()} partitions in total); they count as failed decodes.")
+    print(f"\nLatency distribution over {len(max_times)} shots:")
+    for name, value in time_summary.items():
+        print(f"  {name}: {value:.10f}")
+    print(f"Net accuracy distribution over {len(net_accuracies)} shots:")
+    for name, value in accuracy_summary.items():
+        print(f"  {name}: {value:.2f}%")
+
+def stream_merge_sizes(partitions, lattice, merge_tree='position'):
+    """
+    Merge records of the spatial partitions with the total boundary node count of each merge in
+    place of its latency, so the latency can be evaluated for windows of any number of rounds.
+    """
+    merges = []
+    # A cost curve that returns its input records the boundary node counts
+    subgraphs = [subgraph for subgraph, _, _ in partitions]
+    combine_partitions_incremental(subgraphs, lattice, merges, merge_cost=lambda nodes: nodes,
+                                   plan=build_merge_plan(subgraphs, lattice, merge_tree))
+    return merges
+
+def run_stream(args):
+    """
+    Decode a stream of syndrome rounds in sliding time windows.
 
-    check_time_limit(args, max_time_taken, combined_resources) #TODO factor in combine latency here
+    Rounds are sampled, grouped into windows and partitioned by a chain of generators, so only
+    one window of rounds is held at a time. Every window is scheduled on the same (reset)
+    resources and its decode and merge makespan comes from the event simulation. A window can
+    start once its last round has arrived and the previous window has finished; the wait is the
+    backlog. Decoding keeps up when a window takes no longer than its committed rounds.
 
-    net_accuracy = calculate_net_accuracy(total_accuracy, args.partitions)
+    Returns:
+        StreamResult: Window latency, backlog and throughput statistics.
+    """
+    tracer = get_tracer()
+    verbose = not args.quiet
+    lattice = GridLattice(args.size[0], args.size[1])
+    rng = make_rng(args.seed)
+    profile = get_cost_profile(args.cost_profile)
+    merge_cost = profile.merge if profile else None
+    high_complexity_resources, low_complexity_resources = create_resources(args)
+
+    rounds = sample_rounds(lattice, args.rounds, args.error_rate, rng)
+    windows = window_partitions(time_windows(rounds, args.window, args.commit), lattice, args.partitions)
+
+    merge_sizes = None
+    finish = 0.0
+    num_windows = 0
+    total_window_time = max_window_time = 0.0
+    total_latency = max_latency = 0.0
+    max_backlog = backlog = 0.0
+    with tracer.span("stream", rounds=args.rounds, window=args.window, commit=args.commit):
+        for first_round, num_committed, num_rounds, partitions in windows:
+            if merge_sizes is None:
+                merge_sizes = stream_merge_sizes(partitions, lattice, args.merge_tree)
+            # Boundaries of a window extend over all of its rounds
+            merges = [(merge_id, left, right, boundary_latency(nodes * num_rounds, 0, merge_cost))
+                      for merge_id, left, right, nodes in merge_sizes]
+
+            for resource in high_complexity_resources + low_complexity_resources:
+                resource.reset()
+            combined_resources, _ = schedule(args.scheduler, partitions, high_complexity_resources, low_complexity_resources, args.time_limit,
+                                             merges, list(range(args.partitions)))
+            for resource in combined_resources:
+                resource.process_queue(args.batch_size)
+            window_time = simulate_timeline(combined_resources, merges, list(range(args.partitions))).makespan
+
+            ready = (first_round + num_rounds) * args.round_time
+            start = max(ready, finish)
+            finish = start + window_time
+            backlog = start - ready
+
+            num_windows += 1
+            total_window_time += window_time
+            max_window_time = max(max_window_time, window_time)
+            total_latency += finish - ready
+            max_latency = max(max_latency, finish - ready)
+            max_backlog = max(max_backlog, backlog)
+            tracer.count("stream windows", "windows")
+            if backlog > 0:
+                tracer.count("stream windows", "backlogged")
+
+    mean_window_time = total_window_time / num_windows if num_windows else 0.0
+    # Decoding keeps up if a full window takes no longer than the rounds it commits
+    keeps_up = mean_window_time <= args.commit * args.round_time
+    result = StreamResult(args.rounds, num_windows, args.round_time, mean_window_time, max_window_time,
+                          total_latency / num_windows if num_windows else 0.0, max_latency, max_backlog, backlog, keeps_up)
+    if verbose:
+        print_stream_summary(result, args)
+    return result
+
+def print_stream_summary(result, args):
+    print(f"\nStreamed {result.num_rounds} rounds in {result.num_windows} windows "
+          f"({args.window} rounds per window, {args.commit} committed).")
+    print(f"Window decode time: mean {result.mean_window_time:.10f}, max {result.max_window_time:.10f} seconds "
+          f"(budget {args.commit * args.round_time:.10f} per window).")
+    print(f"Window latency: mean {result.mean_latency:.10f}, max {result.max_latency:.10f} seconds.")
+    print(f"Backlog: max {result.max_backlog / args.round_time:.2f} rounds, final {result.final_backlog / args.round_time:.2f} rounds.")
+    if result.keeps_up:
+        print("Decoding keeps up with the round rate.")
+    else:
+        print("Decoding falls behind the round rate; the backlog grows without bound.")
 
-    return (combined_resources, partitions, args, max_time_taken, net_accuracy)
+def run_mode(args, merge_pool=None):
+    # Streaming mode decodes a sequence of rounds instead of a single snapshot
+    if args.rounds:
+        return run_stream(args)
+    return run_pipeline(args, merge_pool)
+
+def open_syndromes(args, verbose=True):
+    """
+    Open the ``--syndromes`` dataset, if any. The run takes its lattice size and error rate from
+    the file and uses at most as many shots as it holds.
+    """
+    if args.syndromes is None:
+        return None
+    syndromes = SyndromeReader(args.syndromes)
+    if len(syndromes) == 0:
+        raise ValueError(f"{args.syndromes} holds no shots")
+    if verbose and (tuple(args.size) != syndromes.shape or args.error_rate != syndromes.error_rate):
+        print(f"Using the lattice size {syndromes.shape[0]}x{syndromes.shape[1]} and error rate "
+              f"{syndromes.error_rate} recorded in {args.syndromes}.")
+    args.size = list(syndromes.shape)
+    args.error_rate = syndromes.error_rate
+    args.shots = min(args.shots, len(syndromes))
+    return syndromes
+
+def main_func(args, merge_pool=None):
+    if not args.trace:
+        return run_mode(args, merge_pool)
+
+    # Collect spans and counters for this run and export them as a Chrome trace
+    tracer = Tracer()
+    previous_tracer = set_tracer(tracer)
+    try:
+        result = run_mode(args, merge_pool)
+    finally:
+        set_tracer(previous_tracer)
+    tracer.export_chrome_trace(args.trace)
+    if not args.quiet:
+        print(f"Trace written to {args.trace}")
+    return result
+
+def run_pipeline(args, merge_pool=None):
+    tracer = get_tracer()
+    verbose = not args.quiet
+
+    with tracer.span("partition"):
+        syndromes = open_syndromes(args, verbose)
+
+        # Create a sample lattice
+        lattice = GridLattice(args.size[0], args.size[1])
+
+        rng = make_rng(args.seed)
+        syndrome = activated = None
+        if args.decoder == 'measured' and syndromes is not None:
+            syndrome = syndromes[0]
+        elif args.decoder == 'measured' and args.partitioner == 'bisection':
+            # Cut the partitions around the defects that will be decoded
+            syndrome = sample_defects(lattice, args.error_rate, rng)
+        if syndrome is not None:
+            activated = np.zeros(lattice.num_nodes, dtype=bool)
+            activated[syndrome[0]] = True
+        partitions, complexities = partition_lattice_shots(lattice, args.partitions, args.shots, args.error_rate, rng,
+                                                           args.partitioner, partition_cost(args), activated, syndromes)
+        if args.decoder == 'measured':
+            partitions = sample_partition_defects(partitions, args.error_rate, rng, syndrome)
+
+    if tracer.enabled:
+        for subgraph, _, partition_index in partitions:
+            tracer.count("nodes per partition", f"Partition {partition_index}", len(subgraph))
+
+    if verbose:
+        print_partition_details(partitions)
+
+    # Combine all partitions in parallel. Merge latency does not depend on the schedule, so the
+    # merges are known before scheduling and the policies can account for them
+    all_partitions = [subgraph for subgraph, _, _ in partitions]
+    merges = []
+    profile = get_cost_profile(args.cost_profile)
+    merge_cost = profile.merge if profile else None
+    with tracer.span("merge", mode=args.merge_mode, tree=args.merge_tree):
+        plan = build_merge_plan(all_partitions, lattice, args.merge_tree)
+        if args.merge_mode == 'parallel':
+            combined_lattice, comb_latency = combine_partitions_parallel(all_partitions, lattice, merges, merge_pool, merge_cost, plan)
+        else:
+            combined_lattice, comb_latency = combine_partitions_incremental(all_partitions, lattice, merges, merge_cost, plan)
+
+    with tracer.span("schedule"):
+        high_complexity_resources, low_complexity_resources = create_resources(args)
+
+        # Schedule a copy, so the partitions keep the leaf order of the merge records
+        combined_resources, scheduling_overhead, schedule_report = schedule_partitions(
+            list(partitions), high_complexity_resources, low_complexity_resources, args.scheduler, args.time_limit, merges)
+    if verbose:
+        print(f"\nScheduling overhead on this system: {scheduling_overhead:.10f} seconds.")
+        print(schedule_report.describe())
+
+    if tracer.enabled:
+        for resource in combined_resources:
+            tracer.count("tasks per resource", f"Resource {resource.id} ({resource.type})", len(resource.queue))
+
+    task_records = []
+    with tracer.span("process"):
+        batch_decoder = create_batch_decoder(args, lattice, partitions)
+        max_time_taken, total_accuracy = process_partitions(combined_resources, verbose, task_records, args.execution, args.work_stealing,
+                                                            args.batch_size, batch_decoder)
+    if verbose:
+        print(f"Maximum time taken by any resource: {max_time_taken:.10f}")
+
+    if verbose:
+        print(f"Combined lattice has {len(combined_lattice.nodes)} nodes.")
+        print(f"Total latency during partition combination: {comb_latency:.10f} seconds.")
+
+    # Replay decode and merge work on an event queue to get the critical-path makespan
+    with tracer.span("timeline"):
+        timeline = simulate_timeline(combined_resources, merges, [partition_index for _, _, partition_index in partitions])
+
+    max_time_taken = timeline.makespan
+    if verbose:
+        print_timeline_summary(timeline, combined_resources)
+        # Merges start as soon as both of their inputs are done instead of after the last decode
+        phased_time = max(timeline.finish_time.values(), default=0.0) + comb_latency
+        print(f"Decoding then merging would take {phased_time:.10f} seconds; overlapping them saves {phased_time - max_time_taken:.10f}.")
+        print(f"Total time: {max_time_taken:.10f}")
+        check_time_limit(args, max_time_taken, combined_resources, timeline)
+
+    net_accuracy = calculate_net_accuracy(total_accuracy, args.partitions, verbose)
+
+    shot_makespans = shot_net_accuracies = shot_dropped = None
+    if args.shots > 1:
+        with tracer.span("shots", shots=args.shots):
+            shot_makespans, shot_net_accuracies, shot_dropped = simulate_shots(partitions, complexities, args, rng, syndromes, batch_decoder,
+                                                                               merges)
+        if verbose:
+            print_shot_summary(shot_makespans, shot_net_accuracies, shot_dropped)
+
+    if args.records:
+        write_task_records(task_records, args.records)
+
+    return RunResult(combined_resources, partitions, args, max_time_taken, net_accuracy,
+                     scheduling_overhead, comb_latency, timeline, task_records, schedule_report,
+                     shot_makespans, shot_net_accuracies, shot_dropped)
 
 if __name__ == "__main__":
     args = parse_arguments()
-    combined_resources, partitions, args, max_time_taken, net_accuracy = main_func(args)
-    generate_gantt_chart(combined_resources, partitions, args)
\ No newline at end of file
+    result = main_func(args)
+    if (args.gantt or not args.quiet) and not args.rounds:
+        generate_gantt_chart(result.combined_resources, result.partitions, args)
\ No newline at end of file
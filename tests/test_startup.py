@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Benchmark
+
+@pytest.mark.parametrize('module', Benchmark.STARTUP_MODULES)
+def test_startup_within_budget(module):
+    record = Benchmark.measure_startup(module, repeats=3)
+    assert record['loaded'] == [], f"importing {module} loaded {record['loaded']}"
+    assert record['import'] <= Benchmark.STARTUP_BUDGET, f"importing {module} took {record['import']:.3f}s"
+
+def test_mwpm_match_without_decode():
+    import numpy as np
+    from Decoders import MWPMDecoder
+    from Lattice import GridLattice
+
+    lattice = GridLattice(5, 5)
+    assert MWPMDecoder().match(lattice, np.arange(lattice.num_nodes), np.array([0, 6, 12])) in (0, 1, 2, 3)